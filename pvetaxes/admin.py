@@ -1,6 +1,13 @@
 from django.contrib import admin
 
-from .models import AdminCharacter, Character, Settings
+from .models import (
+    AdminCharacter,
+    Character,
+    Settings,
+    TaxRate,
+    TaxRules,
+    TaxSystemOverride,
+)
 
 
 @admin.register(AdminCharacter)
@@ -12,15 +19,40 @@ class AdminCharacterAdmin(admin.ModelAdmin):
 
 @admin.register(Character)
 class CharacterAdmin(admin.ModelAdmin):
-    list_display = ("eve_character", "life_credits", "life_taxes", "created_at")
-    list_filter = ("created_at",)
+    list_display = (
+        "eve_character",
+        "life_credits",
+        "life_taxes",
+        "update_failure_count",
+        "update_paused_until",
+        "created_at",
+    )
+    list_filter = ("created_at", "update_paused_until")
     search_fields = ("eve_character__character_name",)
-    readonly_fields = ("life_credits", "life_taxes", "created_at")
+    readonly_fields = ("life_credits", "life_taxes", "created_at", "update_error")
+
+
+class TaxRateInline(admin.TabularInline):
+    model = TaxRate
+    extra = 0
+    ordering = ("activity_type", "security_category")
+
+
+class TaxSystemOverrideInline(admin.TabularInline):
+    model = TaxSystemOverride
+    extra = 0
+    ordering = ("solar_system_id",)
 
 
 @admin.register(Settings)
 class SettingsAdmin(admin.ModelAdmin):
-    list_display = ("id", "interest_rate", "phrase")
+    list_display = ("id", "interest_rate", "phrase", "tax_rules_version")
+    readonly_fields = ("tax_rules_version",)
+    inlines = (TaxRateInline, TaxSystemOverrideInline)
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        TaxRules.publish()
     
     def has_add_permission(self, request):
         # Only allow one settings instance
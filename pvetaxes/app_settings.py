@@ -8,6 +8,62 @@ PVETAXES_UPDATE_LEDGER_STALE = clean_setting("PVETAXES_UPDATE_LEDGER_STALE", 240
 PVETAXES_UPDATE_STALE_OFFSET = clean_setting("PVETAXES_UPDATE_STALE_OFFSET", 5)
 """Actual value for considering staleness minus this offset"""
 
+PVETAXES_UPDATE_BACKOFF_MINUTES = clean_setting("PVETAXES_UPDATE_BACKOFF_MINUTES", 60)
+"""Minutes updates of a character are paused after a token or ESI failure.
+Doubles with each consecutive failure until a new token is added."""
+
+PVETAXES_UPDATE_BACKOFF_MAX_MINUTES = clean_setting(
+    "PVETAXES_UPDATE_BACKOFF_MAX_MINUTES", 10080
+)
+"""Max minutes updates of a character are paused after failures"""
+
+PVETAXES_REFRESH_MIN_INTERVAL = clean_setting("PVETAXES_REFRESH_MIN_INTERVAL", 300)
+"""Seconds after a wallet update in which a refresh requested by a user
+returns the last result instead of fetching the journal again"""
+
+PVETAXES_REFRESH_LOCK_TIMEOUT = clean_setting("PVETAXES_REFRESH_LOCK_TIMEOUT", 300)
+"""Max seconds an update of a character blocks further updates of it,
+e.g. a requested refresh and the update of all characters"""
+
+PVETAXES_REFRESH_TASK_PRIORITY = clean_setting("PVETAXES_REFRESH_TASK_PRIORITY", 1)
+"""Celery priority of refreshes requested by users.
+Lower numbers run first with the Redis broker used by Alliance Auth."""
+
+PVETAXES_ESI_PAGE_WORKERS = clean_setting("PVETAXES_ESI_PAGE_WORKERS", 4)
+"""Max number of pages of a wallet journal fetched from ESI at the same time"""
+
+PVETAXES_UPDATE_ENGINE = clean_setting(
+    "PVETAXES_UPDATE_ENGINE", "sync", choices=["sync", "async"]
+)
+"""Engine for updating all characters: "sync" updates one character at a time,
+"async" fetches the journals of many characters at the same time
+and needs aiohttp"""
+
+PVETAXES_ESI_BASE_URL = clean_setting(
+    "PVETAXES_ESI_BASE_URL", "https://esi.evetech.net/latest"
+)
+"""Base URL of ESI for the async engine, e.g. to use a local ESI stub"""
+
+PVETAXES_HARVESTER_CONCURRENCY = clean_setting(
+    "PVETAXES_HARVESTER_CONCURRENCY", 20, min_value=1
+)
+"""Max number of ESI requests of the async engine at the same time"""
+
+PVETAXES_HARVESTER_QUEUE_SIZE = clean_setting(
+    "PVETAXES_HARVESTER_QUEUE_SIZE", 100, min_value=1
+)
+"""Max number of pages fetched by the async engine waiting to be stored"""
+
+PVETAXES_HARVESTER_CHUNK_SIZE = clean_setting(
+    "PVETAXES_HARVESTER_CHUNK_SIZE", 100, min_value=1
+)
+"""Number of characters updated together by the async engine.
+The progress of an update of all characters is saved after each chunk."""
+
+PVETAXES_METRICS_ENABLED = clean_setting("PVETAXES_METRICS_ENABLED", False)
+"""Record counters and timings of updates, statistics and Discord messages
+for the metrics endpoint and pvetaxes_metrics"""
+
 PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT = clean_setting(
     "PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT", 600
 )
@@ -15,22 +71,30 @@ PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT = clean_setting(
 PVETAXES_TASKS_TIME_LIMIT = clean_setting("PVETAXES_TASKS_TIME_LIMIT", 7200)
 """Global timeout for tasks in seconds"""
 
+PVETAXES_STATS_UPDATE_DELAY = clean_setting("PVETAXES_STATS_UPDATE_DELAY", 60)
+"""Seconds to wait before updating the statistics after a change.
+All changes within this window are combined into one update."""
+
 PVETAXES_ALLOW_ANALYTICS = clean_setting("PVETAXES_ALLOW_ANALYTICS", True)
 
-PVETAXES_UNKNOWN_TAX_RATE = clean_setting("PVETAXES_UNKNOWN_TAX_RATE", 0.10)
+PVETAXES_DELETE_CHUNK_SIZE = clean_setting("PVETAXES_DELETE_CHUNK_SIZE", 5000)
+"""Max number of rows deleted per query when removing a character"""
 
-# Tax rates for different activities
-PVETAXES_TAX_BOUNTIES = clean_setting("PVETAXES_TAX_BOUNTIES", 0.10)
-"""Tax rate for bounty payouts (ratting)"""
+PVETAXES_DELETE_RETRY_MINUTES = clean_setting("PVETAXES_DELETE_RETRY_MINUTES", 180)
+"""Minutes after which the deletion of a removed character is queued again,
+e.g. when its task was lost. Keep it longer than PVETAXES_TASKS_TIME_LIMIT."""
 
-PVETAXES_TAX_ESS = clean_setting("PVETAXES_TAX_ESS", 0.10)
-"""Tax rate for ESS payouts"""
+PVETAXES_REPRICE_CHUNK_SIZE = clean_setting("PVETAXES_REPRICE_CHUNK_SIZE", 10000)
+"""Max number of journal entries repriced per transaction"""
 
-PVETAXES_TAX_MISSIONS = clean_setting("PVETAXES_TAX_MISSIONS", 0.10)
-"""Tax rate for mission rewards"""
+PVETAXES_JOURNAL_RETENTION_MONTHS = clean_setting("PVETAXES_JOURNAL_RETENTION_MONTHS", 0)
+"""Months of wallet journal entries to keep. Older entries are folded into
+monthly rollups and deleted. 0 keeps all entries."""
 
-PVETAXES_TAX_INCURSIONS = clean_setting("PVETAXES_TAX_INCURSIONS", 0.10)
-"""Tax rate for incursion payouts"""
+# Initial tax rules. They are copied into the database once when migrating
+# and are then managed in the admin site under Settings.
+PVETAXES_UNKNOWN_TAX_RATE = clean_setting("PVETAXES_UNKNOWN_TAX_RATE", 0.10)
+"""Initial tax rate for activities in systems of unknown security status"""
 
 # Security status tax rates
 PVETAXES_TAX_HISEC = clean_setting("PVETAXES_TAX_HISEC", 0.05)
@@ -53,8 +117,20 @@ PVETAXES_TAX_NULLSEC_ENABLED = clean_setting("PVETAXES_TAX_NULLSEC_ENABLED", Tru
 PVETAXES_TAX_JSPACE_ENABLED = clean_setting("PVETAXES_TAX_JSPACE_ENABLED", True)
 PVETAXES_TAX_POCHVEN_ENABLED = clean_setting("PVETAXES_TAX_POCHVEN_ENABLED", True)
 
+PVETAXES_STORE_JOURNAL_DESCRIPTIONS = clean_setting(
+    "PVETAXES_STORE_JOURNAL_DESCRIPTIONS", False
+)
+"""Store the description text of wallet journal entries"""
+
 # Leaderboard settings
 PVETAXES_LEADERBOARD_TAXABLE_ONLY = clean_setting("PVETAXES_LEADERBOARD_TAXABLE_ONLY", True)
+"""Only count taxed earnings towards the leaderboards"""
+
+PVETAXES_LEADERBOARD_SIZE = clean_setting("PVETAXES_LEADERBOARD_SIZE", 10)
+"""Number of users shown per activity type on the leaderboards"""
+
+PVETAXES_LEADERBOARD_SETTLE_HOURS = clean_setting("PVETAXES_LEADERBOARD_SETTLE_HOURS", 48)
+"""Hours after the end of a month before its leaderboards are frozen"""
 
 # Interest rate
 PVETAXES_INTEREST_RATE = clean_setting("PVETAXES_INTEREST_RATE", 0.0)
@@ -8,3 +8,6 @@ class PvetaxesConfig(AppConfig):
     label = "pvetaxes"
     verbose_name = f"PVE Taxes v{__version__}"
     default_auto_field = 'django.db.models.AutoField'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,52 @@
+"""Caching of objects in process memory"""
+from typing import Any, Callable
+from uuid import uuid4
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+class VersionedProcessCache:
+    """Keeps an object in process memory and reloads it only
+    when its version in the shared cache has changed.
+
+    Each access costs one cache lookup of the version,
+    so all processes see a change on their next access after ``invalidate()``.
+    Inside a transaction the version only changes when it is committed.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any]):
+        self.version_key = f"pvetaxes-process-cache-version-{name}"
+        self._loader = loader
+        self._version = None
+        self._value = None
+
+    def version(self) -> str:
+        """Return the current version from the shared cache."""
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def get(self) -> Any:
+        """Return the object, reloading it if its version has changed."""
+        version = self.version()
+        if version != self._version:
+            self._value = self._loader()
+            self._version = version
+        return self._value
+
+    def invalidate(self):
+        """Make all processes reload the object on their next access.
+
+        When called inside a transaction, this happens after the commit.
+        Otherwise another process could load the rows before the commit
+        and keep them under the new version. After a rollback nothing changes.
+        """
+        transaction.on_commit(self._new_version)
+
+    def _new_version(self):
+        cache.set(self.version_key, uuid4().hex, None)
+        self._version = None
+        self._value = None
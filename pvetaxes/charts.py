@@ -0,0 +1,158 @@
+"""Time series of PVE activity for charts"""
+import datetime as dt
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils.timezone import now
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+BUCKETS = {
+    "day": 90,
+    "week": 52,
+    "month": 24,
+}
+"""Number of buckets returned for each bucket size"""
+
+CLOSED_BUCKETS_TIMEOUT = 3600 * 24 * 7
+
+
+def _bucket_start(bucket: str, date: dt.date) -> dt.date:
+    """Return the start of the bucket containing date."""
+    start = date
+    if bucket == "week":
+        return start - dt.timedelta(days=start.weekday())
+    if bucket == "month":
+        return start.replace(day=1)
+    return start
+
+
+def _previous_bucket_start(bucket: str, start: dt.date) -> dt.date:
+    return _bucket_start(bucket, start - dt.timedelta(days=1))
+
+
+def _version_key(character_pk: int) -> str:
+    return f"pvetaxes-chart-version-{character_pk}"
+
+
+def invalidate_character_charts(character_pk: int):
+    """Invalidate the cached closed buckets of a character,
+    e.g. after journal entries were stored for a past day."""
+    if not cache.add(_version_key(character_pk), 1, None):
+        cache.incr(_version_key(character_pk))
+
+
+def _query_buckets(character_pks: list, bucket: str, since: dt.date) -> dict:
+    """Return totals by bucket start and activity type in one grouped query."""
+    from .helpers import day_key, day_key_to_date, month_key, month_key_start
+    from .models import (
+        ActivityType,
+        CharacterMonthlyRollup,
+        CharacterWalletJournalEntry,
+    )
+
+    if bucket == "month":
+        # monthly rollups also cover archived journal entries
+        rows = (
+            CharacterMonthlyRollup.objects.filter(
+                character__pk__in=character_pks, month__gte=month_key(since)
+            )
+            .values("month", "activity_type")
+            .annotate(total_amount=Sum("amount"), total_tax=Sum("tax_amount"))
+            .order_by()
+        )
+        return {
+            (month_key_start(row["month"]).date().isoformat(), row["activity_type"]): (
+                row["total_amount"],
+                row["total_tax"],
+            )
+            for row in rows
+        }
+
+    # grouped by day, then folded into the buckets
+    rows = (
+        CharacterWalletJournalEntry.objects.filter(
+            character__pk__in=character_pks,
+            period_month__gte=month_key(since),
+            period_day__gte=day_key(since),
+        )
+        .values("period_day", "activity_type")
+        .annotate(total_amount=Sum("amount_cents"), total_tax=Sum("tax_cents"))
+        .order_by()
+    )
+    result = {}
+    for row in rows:
+        start = _bucket_start(bucket, day_key_to_date(row["period_day"]))
+        key = (start.isoformat(), ActivityType(row["activity_type"]).label)
+        amount, tax = result.get(key, (0.0, 0.0))
+        result[key] = (
+            amount + row["total_amount"] / 100,
+            tax + row["total_tax"] / 100,
+        )
+    return result
+
+
+def activity_buckets(character_pks: list, bucket: str) -> dict:
+    """Return PVE activity of some characters aggregated into buckets.
+
+    Closed buckets are cached until a new bucket starts or
+    a character's closed buckets are invalidated.
+    Only the open bucket is recalculated on each call.
+
+    Args:
+        character_pks: PKs of the characters to include
+        bucket: Bucket size, one of day, week, month
+
+    Returns:
+        Columnar series: {"bucket", "buckets": [start dates],
+        "activity_types": {activity_type: {"amount": [...], "tax": [...]}}}
+    """
+    from .models.leaderboard import ACTIVITY_TYPES
+
+    bucket_count = BUCKETS[bucket]
+    open_start = _bucket_start(bucket, now().date())
+    starts = [open_start]
+    while len(starts) < bucket_count:
+        starts.insert(0, _previous_bucket_start(bucket, starts[0]))
+
+    character_pks = sorted(character_pks)
+    versions = cache.get_many([_version_key(pk) for pk in character_pks])
+    scope = hashlib.md5(
+        ",".join(
+            f"{pk}:{versions.get(_version_key(pk), 0)}" for pk in character_pks
+        ).encode()
+    ).hexdigest()
+    closed_key = f"pvetaxes-chart-{bucket}-{open_start.isoformat()}-{scope}"
+    closed = cache.get(closed_key)
+    if closed is None:
+        totals = _query_buckets(character_pks, bucket, starts[0])
+        open_label = open_start.isoformat()
+        closed = {key: value for key, value in totals.items() if key[0] != open_label}
+        cache.set(closed_key, closed, CLOSED_BUCKETS_TIMEOUT)
+    else:
+        totals = {**closed, **_query_buckets(character_pks, bucket, open_start)}
+
+    labels = [start.isoformat() for start in starts]
+    return {
+        "bucket": bucket,
+        "buckets": labels,
+        "activity_types": {
+            activity_type: {
+                "amount": [
+                    totals.get((label, activity_type), (0.0, 0.0))[0]
+                    for label in labels
+                ],
+                "tax": [
+                    totals.get((label, activity_type), (0.0, 0.0))[1]
+                    for label in labels
+                ],
+            }
+            for activity_type in ACTIVITY_TYPES
+        },
+    }
@@ -0,0 +1,335 @@
+"""Concurrent wallet journal updates for many characters"""
+import asyncio
+import queue
+import threading
+import time
+from typing import NamedTuple, Optional
+
+from django.utils.dateparse import parse_datetime
+from esi.errors import TokenError
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__, __version__, metrics
+from .app_settings import (
+    PVETAXES_ESI_BASE_URL,
+    PVETAXES_HARVESTER_CONCURRENCY,
+    PVETAXES_HARVESTER_QUEUE_SIZE,
+)
+from .providers import count_esi_calls
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+WALLET_SCOPE = "esi-wallet.read_character_wallet.v1"
+MAX_ATTEMPTS = 3
+"""Max attempts of a request failing with a server error"""
+ERROR_LIMIT_MARGIN = 10
+"""Requests are paused when less errors than this are left in the ESI error limit"""
+REQUEST_TIMEOUT = 30
+
+
+def is_available() -> bool:
+    """Return True if the dependencies of the async engine are installed."""
+    return aiohttp is not None
+
+
+class EsiHttpError(OSError):
+    """ESI request failed."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"ESI returned {status}: {message}")
+        self.status = status
+
+
+class _Stopped(Exception):
+    """Storing of fetched pages was stopped."""
+
+
+class HarvestResult(NamedTuple):
+    new_entries: int = 0
+    error: Optional[Exception] = None
+
+
+class WalletHarvester:
+    """Updates the wallet journals of many characters at the same time.
+
+    Journal pages are fetched concurrently by an asyncio event loop
+    in a background thread over one pooled HTTP session. Fetched pages are
+    passed through a bounded queue to the calling thread, which stores them
+    with ``JournalIngest``, so all database work stays on one thread
+    and fetching pauses when storing falls behind.
+
+    The number of concurrent requests is limited and requests are paused
+    while the ESI error limit is nearly used up.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = PVETAXES_HARVESTER_CONCURRENCY,
+        queue_size: int = PVETAXES_HARVESTER_QUEUE_SIZE,
+        base_url: str = PVETAXES_ESI_BASE_URL,
+    ):
+        if not is_available():
+            raise ImportError("The async engine needs aiohttp: pip install aiohttp")
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.base_url = base_url.rstrip("/")
+        self._queue = None
+        self._stopped = threading.Event()
+        self._harvest_error = None
+        self._error_limit_resume_at = 0.0
+
+    @metrics.harvest_seconds.time()
+    def run(self, characters: list) -> dict:
+        """Update the wallet journals and monthly totals of characters.
+
+        Updates of characters failing because of the token or ESI are paused
+        like updates with ``update_character()``. When fetching fails as a whole,
+        each character without a result fails with that error.
+        Characters which are already being updated are skipped.
+
+        Returns:
+            HarvestResult by character PK
+        """
+        from .tasks import acquire_update_lock, release_update_lock
+
+        locked = []
+        skipped = {}
+        try:
+            for character in characters:
+                if acquire_update_lock(character.pk):
+                    locked.append(character)
+                else:
+                    logger.info("%s: Already being updated, skipping", character)
+                    skipped[character.pk] = HarvestResult()
+            return {**skipped, **self._run(locked)}
+        finally:
+            for character in locked:
+                release_update_lock(character.pk)
+
+    def _run(self, characters: list) -> dict:
+        results = {}
+        jobs = []
+        for character in characters:
+            try:
+                token = character.fetch_token(scopes=[WALLET_SCOPE])
+                access_token = token.valid_access_token()
+            except (TokenError, OSError) as ex:
+                character.record_update_failure(ex)
+                results[character.pk] = HarvestResult(error=ex)
+            else:
+                jobs.append((character, access_token))
+        if not jobs:
+            return results
+
+        characters = {character.pk: character for character, _ in jobs}
+        self._queue = queue.Queue(maxsize=self.queue_size)
+        self._stopped.clear()
+        self._harvest_error = None
+        thread = threading.Thread(
+            target=self._run_loop,
+            args=(
+                [
+                    (character.pk, character.eve_character.character_id, access_token)
+                    for character, access_token in jobs
+                ],
+            ),
+            name="pvetaxes-harvester",
+            daemon=True,
+        )
+        thread.start()
+        try:
+            results.update(self._store(characters, thread))
+        finally:
+            self._stopped.set()
+            thread.join()
+        if self._harvest_error:
+            logger.error(
+                "Failed to fetch wallet journals",
+                exc_info=self._harvest_error,
+            )
+            for character_pk in characters:
+                results.setdefault(
+                    character_pk, HarvestResult(error=self._harvest_error)
+                )
+        return results
+
+    def _run_loop(self, jobs: list):
+        try:
+            asyncio.run(self._harvest(jobs))
+        except _Stopped:
+            pass
+        except Exception as ex:
+            self._harvest_error = ex
+
+    def _store(self, characters: dict, thread: threading.Thread) -> dict:
+        """Store pages from the queue until all characters are harvested."""
+        from .models import JournalIngest
+
+        ingests = {}
+        failed = {}
+        results = {}
+        while True:
+            try:
+                character_pk, entries, error = self._queue.get(timeout=0.1)
+            except queue.Empty:
+                if not thread.is_alive() and self._queue.empty():
+                    break
+                continue
+
+            character = characters[character_pk]
+            if character_pk in failed:
+                continue
+            if entries is not None:
+                try:
+                    if character_pk not in ingests:
+                        ingests[character_pk] = JournalIngest(character)
+                    ingests[character_pk].add_page(entries)
+                except Exception as ex:
+                    logger.error(
+                        "%s: Failed to store journal page", character, exc_info=True
+                    )
+                    failed[character_pk] = ex
+            elif error is not None:
+                logger.warning("%s: Failed to fetch wallet journal: %s", character, error)
+                character.record_update_failure(error)
+                failed[character_pk] = error
+            else:
+                try:
+                    ingest = ingests.pop(character_pk, None) or JournalIngest(character)
+                    new_entries = ingest.finish()
+                    character.record_update_success()
+                    character.calculate_monthly_totals()
+                except Exception as ex:
+                    logger.error(
+                        "%s: Failed to complete wallet update", character, exc_info=True
+                    )
+                    failed[character_pk] = ex
+                else:
+                    results[character_pk] = HarvestResult(new_entries=new_entries)
+
+        for character_pk, error in failed.items():
+            results[character_pk] = HarvestResult(error=error)
+        return results
+
+    async def _put(self, item: tuple):
+        """Put an item into the queue, waiting while the queue is full.
+
+        Raises:
+            _Stopped: If storing was stopped
+        """
+        while True:
+            if self._stopped.is_set():
+                raise _Stopped()
+            try:
+                self._queue.put_nowait(item)
+                return
+            except queue.Full:
+                await asyncio.sleep(0.01)
+
+    async def _harvest(self, jobs: list):
+        semaphore = asyncio.Semaphore(self.concurrency)
+        connector = aiohttp.TCPConnector(limit=self.concurrency)
+        async with aiohttp.ClientSession(
+            connector=connector,
+            headers={"User-Agent": f"{__title__}/{__version__}"},
+            timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+        ) as session:
+            await asyncio.gather(
+                *(self._harvest_character(session, semaphore, *job) for job in jobs)
+            )
+
+    async def _harvest_character(
+        self, session, semaphore, character_pk: int, character_id: int, access_token: str
+    ):
+        """Fetch all journal pages of a character and end with a done item."""
+        url = f"{self.base_url}/characters/{character_id}/wallet/journal/"
+        headers = {"Authorization": f"Bearer {access_token}"}
+
+        async def fetch_page(page: int) -> int:
+            async with semaphore:
+                entries, page_count = await self._fetch_page(session, url, headers, page)
+            await self._put((character_pk, entries, None))
+            return page_count
+
+        error = None
+        try:
+            page_count = await fetch_page(1)
+            outcomes = await asyncio.gather(
+                *(fetch_page(page) for page in range(2, page_count + 1)),
+                return_exceptions=True,
+            )
+            if any(isinstance(ex, _Stopped) for ex in outcomes):
+                raise _Stopped()
+            error = next((ex for ex in outcomes if isinstance(ex, Exception)), None)
+        except _Stopped:
+            raise
+        except Exception as ex:
+            error = ex
+        await self._put((character_pk, None, error))
+
+    async def _fetch_page(self, session, url: str, headers: dict, page: int) -> tuple:
+        """Fetch one journal page with retries.
+
+        Returns:
+            Entries of the page and number of pages
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            await self._wait_for_error_limit()
+            count_esi_calls()
+            try:
+                with metrics.esi_request_seconds.time():
+                    async with session.get(
+                        url, headers=headers, params={"datasource": "tranquility", "page": page}
+                    ) as response:
+                        self._check_error_limit(response.headers)
+                        metrics.esi_requests.inc(status=response.status)
+                        if response.status == 200:
+                            entries = await response.json()
+                            for entry in entries:
+                                entry["date"] = parse_datetime(entry["date"])
+                            return entries, int(response.headers.get("X-Pages", 1))
+                        message = await response.text()
+            except (aiohttp.ClientError, asyncio.TimeoutError) as ex:
+                metrics.esi_requests.inc(status="error")
+                if attempt == MAX_ATTEMPTS:
+                    raise EsiHttpError(0, str(ex) or type(ex).__name__) from ex
+                await asyncio.sleep(attempt)
+                continue
+
+            if response.status in (401, 403):
+                raise TokenError(f"ESI returned {response.status}: {message}")
+            if response.status == 420 or response.status >= 500:
+                if attempt < MAX_ATTEMPTS:
+                    await asyncio.sleep(attempt)
+                    continue
+            raise EsiHttpError(response.status, message)
+
+    def _check_error_limit(self, headers):
+        """Pause requests until the error limit resets
+        when it is nearly used up."""
+        try:
+            remain = int(headers["X-ESI-Error-Limit-Remain"])
+            reset = int(headers["X-ESI-Error-Limit-Reset"])
+        except (KeyError, ValueError):
+            return
+        if remain < ERROR_LIMIT_MARGIN:
+            resume_at = time.monotonic() + reset + 1
+            if resume_at > self._error_limit_resume_at:
+                logger.warning(
+                    "ESI error limit nearly reached, pausing requests for %d seconds",
+                    reset + 1,
+                )
+                self._error_limit_resume_at = resume_at
+
+    async def _wait_for_error_limit(self):
+        delay = self._error_limit_resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
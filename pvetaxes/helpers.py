@@ -6,11 +6,62 @@ from django.utils import timezone
 from allianceauth.services.hooks import get_extension_logger
 from app_utils.logging import LoggerAddTag
 
-from . import __title__
+from . import __title__, metrics
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
 
+def month_key(date: dt.datetime) -> int:
+    """Return the integer month key (yyyymm) for a date."""
+    return date.year * 100 + date.month
+
+
+def month_key_to_label(key: int) -> str:
+    """Return the display label (YYYY-MM) for a month key."""
+    return f"{key // 100:04d}-{key % 100:02d}"
+
+
+def parse_month_label(label: str) -> int:
+    """Return the month key for a YYYY-MM label.
+
+    Raises:
+        ValueError: If the label is not a valid month
+    """
+    year, month = (int(part) for part in label.split("-"))
+    if not 1 <= month <= 12:
+        raise ValueError(f"Invalid month: {label}")
+    return year * 100 + month
+
+
+def shift_month_key(key: int, months: int) -> int:
+    """Return the month key which is a number of months after (or before) a month."""
+    year, month = divmod(key, 100)
+    year, month = divmod(year * 12 + month - 1 + months, 12)
+    return year * 100 + month + 1
+
+
+def month_key_start(key: int) -> dt.datetime:
+    """Return the start of the month for a month key in UTC."""
+    year, month = divmod(key, 100)
+    return dt.datetime(year, month, 1, tzinfo=dt.timezone.utc)
+
+
+def month_key_end(key: int) -> dt.datetime:
+    """Return the (exclusive) end of the month for a month key in UTC."""
+    return month_key_start(shift_month_key(key, 1))
+
+
+def day_key(date: dt.date) -> int:
+    """Return the integer day key (yyyymmdd) for a date."""
+    return date.year * 10000 + date.month * 100 + date.day
+
+
+def day_key_to_date(key: int) -> dt.date:
+    """Return the date for a day key."""
+    year, month_day = divmod(key, 10000)
+    return dt.date(year, *divmod(month_day, 100))
+
+
 def get_security_status_category(security_status: float) -> str:
     """Return the security status category for a given security status value."""
     if security_status >= 0.5:
@@ -25,17 +76,31 @@ def get_security_status_category(security_status: float) -> str:
         return "unknown"
 
 
+POCHVEN_REGION_ID = 10000070
+
+
 def is_pochven_system(solar_system_id: int) -> bool:
     """Check if a solar system is in Pochven."""
-    # Pochven region ID is 10000070
     from eveuniverse.models import EveSolarSystem
     try:
         system = EveSolarSystem.objects.get(id=solar_system_id)
-        return system.eve_constellation.eve_region_id == 10000070
+        return system.eve_constellation.eve_region_id == POCHVEN_REGION_ID
     except Exception:
         return False
 
 
+def get_solar_system_space(solar_system) -> tuple:
+    """Return the space category and region ID of a solar system.
+
+    The category is the security status category,
+    except for systems in Pochven which have their own category "pochven".
+    """
+    region_id = solar_system.eve_constellation.eve_region_id
+    if region_id == POCHVEN_REGION_ID:
+        return "pochven", region_id
+    return get_security_status_category(solar_system.security_status), region_id
+
+
 def get_tax_rate_for_system(solar_system_id: int, activity_type: str = None) -> float:
     """
     Calculate the tax rate for a given solar system and activity type.
@@ -47,54 +112,19 @@ def get_tax_rate_for_system(solar_system_id: int, activity_type: str = None) ->
     Returns:
         The applicable tax rate as a decimal (e.g., 0.10 for 10%)
     """
-    from .app_settings import (
-        PVETAXES_TAX_HISEC,
-        PVETAXES_TAX_LOSEC,
-        PVETAXES_TAX_NULLSEC,
-        PVETAXES_TAX_JSPACE,
-        PVETAXES_TAX_POCHVEN,
-        PVETAXES_TAX_HISEC_ENABLED,
-        PVETAXES_TAX_LOSEC_ENABLED,
-        PVETAXES_TAX_NULLSEC_ENABLED,
-        PVETAXES_TAX_JSPACE_ENABLED,
-        PVETAXES_TAX_POCHVEN_ENABLED,
-        PVETAXES_WHITELIST,
-        PVETAXES_BLACKLIST,
-        PVETAXES_UNKNOWN_TAX_RATE,
-    )
     from eveuniverse.models import EveSolarSystem
+    from .models import ActivityType, SecurityCategory, TaxRules
     
-    # Check whitelist/blacklist
-    if PVETAXES_WHITELIST and solar_system_id not in PVETAXES_WHITELIST:
-        return 0.0
-    if solar_system_id in PVETAXES_BLACKLIST:
-        return 0.0
-    
+    activity = ActivityType[(activity_type or "bounty").upper()]
     try:
-        system = EveSolarSystem.objects.get(id=solar_system_id)
-        
-        # Check for Pochven
-        if is_pochven_system(solar_system_id):
-            return PVETAXES_TAX_POCHVEN if PVETAXES_TAX_POCHVEN_ENABLED else 0.0
-        
-        # Get security status category
-        sec_status = system.security_status
-        category = get_security_status_category(sec_status)
-        
-        # Apply tax rates based on security status
-        if category == "hisec":
-            return PVETAXES_TAX_HISEC if PVETAXES_TAX_HISEC_ENABLED else 0.0
-        elif category == "losec":
-            return PVETAXES_TAX_LOSEC if PVETAXES_TAX_LOSEC_ENABLED else 0.0
-        elif category == "nullsec":
-            return PVETAXES_TAX_NULLSEC if PVETAXES_TAX_NULLSEC_ENABLED else 0.0
-        elif category == "jspace":
-            return PVETAXES_TAX_JSPACE if PVETAXES_TAX_JSPACE_ENABLED else 0.0
-        else:
-            return PVETAXES_UNKNOWN_TAX_RATE
-    except Exception as e:
-        logger.warning(f"Error getting tax rate for system {solar_system_id}: {e}")
-        return PVETAXES_UNKNOWN_TAX_RATE
+        system = EveSolarSystem.objects.select_related("eve_constellation").get(
+            id=solar_system_id
+        )
+        category, _ = SecurityCategory.for_solar_system(system)
+    except EveSolarSystem.DoesNotExist:
+        logger.warning(f"Unknown solar system {solar_system_id}")
+        category = SecurityCategory.UNKNOWN
+    return TaxRules.current().rate(activity, category, solar_system_id)
 
 
 def get_user_discord_id(user):
@@ -125,11 +155,14 @@ def send_discord_notification(webhook_url: str, message: str, title: str = None)
                 }]
             }
         
-        response = requests.post(webhook_url, json=payload)
+        with metrics.discord_request_seconds.time(kind="webhook"):
+            response = requests.post(webhook_url, json=payload)
         response.raise_for_status()
+        metrics.discord_messages.inc(kind="webhook", result="sent")
         return True
     except Exception as e:
         logger.error(f"Error sending Discord notification: {e}")
+        metrics.discord_messages.inc(kind="webhook", result="failed")
         return False
 
 
@@ -139,26 +172,29 @@ def send_discord_dm(bot_token: str, user_id: str, message: str):
         return False
     
     try:
-        # Create DM channel
-        headers = {"Authorization": f"Bot {bot_token}"}
-        dm_response = requests.post(
-            "https://discord.com/api/v10/users/@me/channels",
-            headers=headers,
-            json={"recipient_id": user_id}
-        )
-        dm_response.raise_for_status()
-        channel_id = dm_response.json()["id"]
-        
-        # Send message
-        msg_response = requests.post(
-            f"https://discord.com/api/v10/channels/{channel_id}/messages",
-            headers=headers,
-            json={"content": message}
-        )
-        msg_response.raise_for_status()
+        with metrics.discord_request_seconds.time(kind="dm"):
+            # Create DM channel
+            headers = {"Authorization": f"Bot {bot_token}"}
+            dm_response = requests.post(
+                "https://discord.com/api/v10/users/@me/channels",
+                headers=headers,
+                json={"recipient_id": user_id}
+            )
+            dm_response.raise_for_status()
+            channel_id = dm_response.json()["id"]
+            
+            # Send message
+            msg_response = requests.post(
+                f"https://discord.com/api/v10/channels/{channel_id}/messages",
+                headers=headers,
+                json={"content": message}
+            )
+            msg_response.raise_for_status()
+        metrics.discord_messages.inc(kind="dm", result="sent")
         return True
     except Exception as e:
         logger.error(f"Error sending Discord DM to {user_id}: {e}")
+        metrics.discord_messages.inc(kind="dm", result="failed")
         return False
 
 
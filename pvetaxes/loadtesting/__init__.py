@@ -0,0 +1,4 @@
+"""Fake ESI and synthetic data for load tests and benchmarks"""
+from .client import FakeEsiClient, fake_esi_client
+from .fake_esi import FakeEsi, parse_ref_types
+from .server import FakeEsiServer
@@ -0,0 +1,188 @@
+"""Benchmarks of the batch jobs"""
+import os
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from contextlib import nullcontext
+from typing import Callable, Optional
+
+import django
+from django.db import connection, transaction
+from django.utils.timezone import now
+
+from .. import __version__
+
+
+def _calculate_monthly_totals():
+    from ..models import Character
+
+    for character in Character.objects.active():
+        character.calculate_monthly_totals()
+
+
+def _update_stats():
+    from ..tasks import update_stats
+
+    update_stats()
+
+
+def _calctaxes():
+    from ..tasks import calctaxes
+
+    calctaxes()
+
+
+def _apply_monthly_interest():
+    from ..tasks import apply_monthly_interest
+
+    apply_monthly_interest()
+
+
+def _prepare_interest():
+    """Enable interest and allow applying it again this month.
+
+    Returns:
+        Function restoring the settings
+    """
+    from ..models import Settings
+
+    settings = Settings.load()
+    interest_rate, last_applied = settings.interest_rate, settings.last_interest_applied
+    settings.interest_rate = interest_rate or 0.01
+    settings.last_interest_applied = None
+    settings.save()
+
+    def restore():
+        settings.interest_rate = interest_rate
+        settings.last_interest_applied = last_applied
+        settings.save()
+
+    return restore
+
+
+def _process_corp_payments():
+    from ..tasks import process_corp_payments
+
+    process_corp_payments()
+
+
+JOBS = {
+    "calculate_monthly_totals": (_calculate_monthly_totals, None, False),
+    "update_stats": (_update_stats, None, False),
+    "calctaxes": (_calctaxes, None, False),
+    "apply_monthly_interest": (_apply_monthly_interest, _prepare_interest, True),
+    "process_corp_payments": (_process_corp_payments, None, True),
+}
+"""Function, optional preparation and whether to roll back each run of each job.
+A preparation runs before each run of its job and returns a function
+undoing it. Runs of jobs adding rows are rolled back, so each run
+works on the same data."""
+
+
+class QueryCounter:
+    """Counts the database queries of a connection while installed
+    with ``connection.execute_wrapper()``."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def _run(
+    func: Callable, prepare: Optional[Callable], rollback: bool, trace_memory: bool
+) -> dict:
+    restore = prepare() if prepare else None
+    counter = QueryCounter()
+    try:
+        if trace_memory:
+            tracemalloc.start()
+        with transaction.atomic() if rollback else nullcontext():
+            with connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                func()
+                seconds = time.perf_counter() - started
+            if rollback:
+                transaction.set_rollback(True)
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+        if restore:
+            restore()
+    return {"seconds": seconds, "queries": counter.count, "peak_memory": peak}
+
+
+def run_job(name: str, repeat: int = 3) -> dict:
+    """Time a job.
+
+    The job is run ``repeat`` times for the wall time and once more
+    with tracemalloc for the peak memory, which slows it down.
+
+    Returns:
+        Median and min wall time in seconds, median queries
+        and peak memory of Python objects in bytes
+    """
+    func, prepare, rollback = JOBS[name]
+    runs = [_run(func, prepare, rollback, trace_memory=False) for _ in range(repeat)]
+    traced = _run(func, prepare, rollback, trace_memory=True)
+    wall_times = [run["seconds"] for run in runs]
+    return {
+        "wall_time": statistics.median(wall_times),
+        "wall_time_min": min(wall_times),
+        "wall_times": wall_times,
+        "queries": statistics.median_low(run["queries"] for run in runs),
+        "peak_memory": traced["peak_memory"],
+    }
+
+
+def environment() -> dict:
+    """Return the versions and the commit the benchmarks ran on."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            capture_output=True,
+            text=True,
+            timeout=10,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "created_at": now().isoformat(),
+        "commit": commit,
+        "version": __version__,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "database": connection.vendor,
+    }
+
+
+COMPARED_METRICS = ("wall_time", "queries", "peak_memory")
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list:
+    """Compare the jobs of a report with a baseline report.
+
+    Args:
+        threshold: Allowed increase of a metric as decimal, e.g. 0.2 for 20%
+
+    Returns:
+        Changes as (job, metric, baseline value, value, change as decimal,
+        is regression) for jobs in both reports
+    """
+    changes = []
+    for name, result in report["jobs"].items():
+        if name not in baseline.get("jobs", {}):
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = baseline["jobs"][name].get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (0.0 if new == old else float("inf"))
+            changes.append((name, metric, old, new, change, change > threshold))
+    return changes
@@ -0,0 +1,118 @@
+"""In-process stand-in for the ESI client"""
+import contextlib
+from types import SimpleNamespace
+
+from bravado.exception import make_http_exception
+
+from .fake_esi import FakeEsi
+
+
+class FakeResponse:
+    """Response with the attributes of a bravado response used by pvetaxes."""
+
+    def __init__(self, status_code: int, headers: dict, data):
+        self.status_code = status_code
+        self.headers = headers
+        self.reason = str(status_code)
+        self.text = str(data) if status_code >= 400 else ""
+        self.data = data
+
+
+class FakeOperation:
+    """Future of a request to a fake ESI, like the futures of django-esi.
+
+    Errors are raised as bravado HTTP errors without retries.
+    """
+
+    def __init__(self, fake_esi: FakeEsi, path: str, params: dict, token: str):
+        self.fake_esi = fake_esi
+        self.path = path
+        self.params = params
+        self.token = token
+        self.request_config = SimpleNamespace(also_return_response=False)
+
+    def result(self, **kwargs):
+        status, headers, data = self.fake_esi.handle(
+            self.path,
+            self.params,
+            {"Authorization": f"Bearer {self.token}"} if self.token else {},
+        )
+        response = FakeResponse(status, headers, data)
+        if status >= 400:
+            raise make_http_exception(response, message=data.get("error"))
+        if self.request_config.also_return_response:
+            return data, response
+        return data
+
+    def results(self, **kwargs):
+        """Return the data of all pages."""
+        results = []
+        page = page_count = 1
+        while page <= page_count:
+            operation = FakeOperation(
+                self.fake_esi, self.path, {**self.params, "page": page}, self.token
+            )
+            operation.request_config.also_return_response = True
+            data, response = operation.result()
+            results += data
+            page_count = int(response.headers["X-Pages"])
+            page += 1
+        return results
+
+
+class FakeWallet:
+    def __init__(self, fake_esi: FakeEsi):
+        self.fake_esi = fake_esi
+
+    def get_characters_character_id_wallet_journal(
+        self, character_id: int, token: str = None, page: int = None, **kwargs
+    ) -> FakeOperation:
+        return FakeOperation(
+            self.fake_esi,
+            f"/characters/{character_id}/wallet/journal/",
+            {"page": page},
+            token,
+        )
+
+    def get_corporations_corporation_id_wallets_division_journal(
+        self,
+        corporation_id: int,
+        division: int,
+        token: str = None,
+        page: int = None,
+        **kwargs,
+    ) -> FakeOperation:
+        return FakeOperation(
+            self.fake_esi,
+            f"/corporations/{corporation_id}/wallets/{division}/journal/",
+            {"page": page},
+            token,
+        )
+
+
+class FakeEsiClient:
+    """Client with the wallet operations used by pvetaxes, served by a fake ESI."""
+
+    def __init__(self, fake_esi: FakeEsi):
+        self.Wallet = FakeWallet(fake_esi)
+
+
+@contextlib.contextmanager
+def fake_esi_client(fake_esi: FakeEsi):
+    """Serve the ESI requests of pvetaxes in this process from a fake ESI.
+
+    Tokens are still needed, but are not checked.
+    Usage::
+
+        with fake_esi_client(FakeEsi(pages=(1, 5))):
+            character.update_wallet_journal()
+    """
+    from ..providers import esi
+
+    # the provider creates its client lazily and keeps it in _client
+    previous = esi._client
+    esi._client = FakeEsiClient(fake_esi)
+    try:
+        yield fake_esi
+    finally:
+        esi._client = previous
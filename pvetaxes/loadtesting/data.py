@@ -0,0 +1,263 @@
+"""Synthetic alliance-scale data for benchmarks"""
+import datetime as dt
+import random
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils.timezone import now
+
+from allianceauth.authentication.models import CharacterOwnership
+from allianceauth.eveonline.models import EveCharacter, EveCorporationInfo
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+from ..helpers import day_key, month_key
+from .fake_esi import AMOUNT_RANGES, IDS_PER_JOURNAL
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+USERNAME_PREFIX = "pvetaxes-synthetic-"
+FIRST_CHARACTER_ID = 2_140_000_000
+"""Synthetic characters get IDs from here on"""
+CORPORATION_ID = 2_139_999_999
+"""ID of the corporation of all synthetic characters"""
+CORPORATION_NAME = "Synthetic Corporation"
+
+SECURITY_CATEGORY_WEIGHTS = {1: 20, 2: 10, 3: 55, 4: 10, 5: 5}
+"""Relative frequency of PVE by space category code, unknown is not used"""
+REGION_IDS = {1: 10000002, 2: 10000042, 3: 10000060, 4: 11000001, 5: 10000070}
+BULK_SIZE = 5000
+
+
+def synthetic_eve_characters():
+    """Return the Eve characters in the synthetic corporation.
+
+    Other characters are never selected, even with IDs in the synthetic range.
+    """
+    return EveCharacter.objects.filter(
+        character_id__gte=FIRST_CHARACTER_ID, corporation_id=CORPORATION_ID
+    )
+
+
+def synthetic_characters():
+    from ..models import Character
+
+    return Character.objects.filter(eve_character__in=synthetic_eve_characters())
+
+
+def has_other_characters() -> bool:
+    """Return True if the database has characters which are not synthetic."""
+    from ..models import Character
+
+    return (
+        Character.objects.exclude(eve_character__in=synthetic_eve_characters()).exists()
+        or has_conflicts()
+    )
+
+
+def has_conflicts() -> bool:
+    """Return True if other Eve characters or corporations use synthetic IDs."""
+    return (
+        EveCharacter.objects.filter(character_id__gte=FIRST_CHARACTER_ID)
+        .exclude(corporation_id=CORPORATION_ID)
+        .exists()
+        or EveCorporationInfo.objects.filter(corporation_id=CORPORATION_ID)
+        .exclude(corporation_name=CORPORATION_NAME)
+        .exists()
+    )
+
+
+def generate(users: int, characters: int, rows: int, months: int = 12, seed: int = 1) -> dict:
+    """Create users, characters and journal entries with their monthly totals.
+
+    Characters are spread over users with a few users owning many characters.
+    Activity follows a Pareto distribution, so a fifth of the characters
+    earn most of the ISK, and is spread over the last months with more
+    activity on weekends. Users pay part of their taxes with donations
+    to the corporation of the admin character.
+
+    Existing synthetic data is deleted first.
+
+    Returns:
+        Counts of the created objects
+    """
+    from ..models import (
+        AdminCharacter,
+        AdminCorpWalletEntry,
+        Character,
+        CharacterTaxCredits,
+        CharacterWalletJournalEntry,
+        RefType,
+        TaxRules,
+    )
+    from ..models.character import REF_TYPE_ACTIVITIES
+
+    if characters < users:
+        raise ValueError("Each user needs at least one character")
+    if has_conflicts():
+        raise ValueError(
+            "Other Eve characters or corporations use the IDs of the synthetic data"
+        )
+    delete()
+    rng = random.Random(seed)
+    rules = TaxRules.current()
+    corporation = EveCorporationInfo.objects.create(
+        corporation_id=CORPORATION_ID,
+        corporation_name=CORPORATION_NAME,
+        corporation_ticker="SYNTH",
+        member_count=characters,
+    )
+
+    # one character per user, the others mostly to a few users
+    user_weights = [rng.paretovariate(1.5) for _ in range(users)]
+    owners = list(range(users)) + rng.choices(
+        range(users), user_weights, k=characters - users
+    )
+    EveCharacter.objects.bulk_create(
+        [
+            EveCharacter(
+                character_id=FIRST_CHARACTER_ID + number,
+                character_name=f"Synthetic Character {number}",
+                corporation_id=corporation.corporation_id,
+                corporation_name=corporation.corporation_name,
+                corporation_ticker=corporation.corporation_ticker,
+            )
+            for number in range(characters)
+        ],
+        batch_size=BULK_SIZE,
+    )
+    eve_characters = list(synthetic_eve_characters().order_by("character_id"))
+    user_objs = []
+    for number in range(users):
+        user = User.objects.create(username=f"{USERNAME_PREFIX}{number}")
+        user_objs.append(user)
+    for eve_character, owner in zip(eve_characters, owners):
+        CharacterOwnership.objects.create(
+            user=user_objs[owner],
+            character=eve_character,
+            owner_hash=f"synthetic-{eve_character.character_id}",
+        )
+    for user, eve_character in zip(user_objs, eve_characters):
+        user.profile.main_character = eve_character
+        user.profile.save()
+    Character.objects.bulk_create(
+        [Character(eve_character=eve_character) for eve_character in eve_characters],
+        batch_size=BULK_SIZE,
+    )
+    character_objs = list(
+        synthetic_characters()
+        .select_related("eve_character")
+        .order_by("eve_character__character_id")
+    )
+    admin_character = AdminCharacter.objects.create(
+        eve_character=eve_characters[0], corporation=corporation
+    )
+
+    # journal entries
+    activity = [rng.paretovariate(1.16) for _ in character_objs]
+    total_activity = sum(activity)
+    ref_types = [ref_type for ref_type in RefType]
+    ref_type_weights = [50, 10, 8, 4, 3]
+    categories = list(SECURITY_CATEGORY_WEIGHTS)
+    category_weights = list(SECURITY_CATEGORY_WEIGHTS.values())
+    end = now()
+    seconds = months * 30 * 24 * 3600
+    remaining_rows = rows
+    batch = []
+    for character, weight in zip(character_objs, activity):
+        count = min(round(rows * weight / total_activity), remaining_rows, IDS_PER_JOURNAL)
+        remaining_rows -= count
+        first_journal_id = character.eve_character.character_id * IDS_PER_JOURNAL
+        for position in range(count):
+            date = end - dt.timedelta(seconds=rng.randrange(seconds))
+            if date.weekday() < 5 and rng.random() < 0.3:
+                # move part of the weekday activity to the weekend
+                date -= dt.timedelta(days=date.weekday() + 1)
+            ref_type = rng.choices(ref_types, ref_type_weights)[0]
+            category = rng.choices(categories, category_weights)[0]
+            low, high = AMOUNT_RANGES[ref_type.label]
+            entry = CharacterWalletJournalEntry(
+                character=character,
+                journal_id=first_journal_id + position,
+                date=date,
+                period_month=month_key(date),
+                period_day=day_key(date),
+                amount_cents=rng.randrange(low * 100, high * 100),
+                ref_type=ref_type,
+                activity_type=REF_TYPE_ACTIVITIES[ref_type],
+                security_category=category,
+                eve_region_id=REGION_IDS[category],
+            )
+            entry.apply_tax(rules)
+            batch.append(entry)
+            if len(batch) >= BULK_SIZE:
+                CharacterWalletJournalEntry.objects.bulk_create(batch)
+                batch = []
+    CharacterWalletJournalEntry.objects.bulk_create(batch)
+
+    for character in character_objs:
+        character.calculate_monthly_totals()
+
+    # payments: credits for past payments and new donations to process
+    credits = []
+    life_credits = defaultdict(float)
+    donations = []
+    for character in character_objs:
+        if rng.random() < 0.3:
+            amount = round(rng.uniform(1_000_000, 100_000_000), 2)
+            credits.append(
+                CharacterTaxCredits(
+                    character=character,
+                    amount=amount,
+                    credit_type="payment",
+                    reason="Synthetic payment",
+                )
+            )
+            life_credits[character.pk] += amount
+        if rng.random() < 0.2:
+            donations.append(
+                AdminCorpWalletEntry(
+                    admin_character=admin_character,
+                    journal_id=CORPORATION_ID * IDS_PER_JOURNAL + len(donations),
+                    date=end - dt.timedelta(days=rng.randrange(30)),
+                    amount=round(rng.uniform(1_000_000, 100_000_000), 2),
+                    second_party_id=character.eve_character.character_id,
+                    description="tax payment",
+                )
+            )
+    with transaction.atomic():
+        CharacterTaxCredits.objects.bulk_create(credits, batch_size=BULK_SIZE)
+        for character in character_objs:
+            if character.pk in life_credits:
+                character.life_credits = life_credits[character.pk]
+        Character.objects.bulk_update(character_objs, ["life_credits"], batch_size=BULK_SIZE)
+        AdminCorpWalletEntry.objects.bulk_create(donations, batch_size=BULK_SIZE)
+
+    counts = {
+        "users": users,
+        "characters": characters,
+        "rows": rows - remaining_rows,
+        "credits": len(credits),
+        "donations": len(donations),
+    }
+    logger.info("Generated synthetic data: %s", counts)
+    return counts
+
+
+def delete():
+    """Delete all synthetic data.
+
+    Only characters of the synthetic corporation and users with the synthetic
+    username prefix are deleted.
+    """
+    from ..app_settings import PVETAXES_DELETE_CHUNK_SIZE
+
+    for character in synthetic_characters():
+        character.delete_data(chunk_size=PVETAXES_DELETE_CHUNK_SIZE)
+    User.objects.filter(username__startswith=USERNAME_PREFIX).delete()
+    synthetic_eve_characters().delete()
+    EveCorporationInfo.objects.filter(
+        corporation_id=CORPORATION_ID, corporation_name=CORPORATION_NAME
+    ).delete()
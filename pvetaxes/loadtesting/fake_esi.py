@@ -0,0 +1,318 @@
+"""Synthetic ESI wallet journals"""
+import datetime as dt
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Optional, Sequence
+
+from django.utils.timezone import now
+
+DEFAULT_REF_TYPES = {
+    "bounty_prizes": 50,
+    "ess_escrow_transfer": 10,
+    "agent_mission_reward": 8,
+    "agent_mission_time_bonus_reward": 4,
+    "corporate_reward_payout": 3,
+    "market_transaction": 15,
+    "player_donation": 5,
+    "brokers_fee": 5,
+}
+"""Relative frequency of each reference type in character journals"""
+
+AMOUNT_RANGES = {
+    "bounty_prizes": (100_000, 30_000_000),
+    "ess_escrow_transfer": (5_000_000, 200_000_000),
+    "agent_mission_reward": (500_000, 20_000_000),
+    "agent_mission_time_bonus_reward": (200_000, 10_000_000),
+    "corporate_reward_payout": (10_000_000, 60_000_000),
+}
+"""ISK amounts of PVE reference types, other types use 1,000 - 100,000,000"""
+
+SERVER_ERROR_STATUSES = (420, 500, 502, 503, 504)
+
+CHARACTER_JOURNAL_PATH = re.compile(r"/characters/(?P<character_id>\d+)/wallet/journal/?$")
+CORPORATION_JOURNAL_PATH = re.compile(
+    r"/corporations/(?P<corporation_id>\d+)/wallets/(?P<division>\d+)/journal/?$"
+)
+IDS_PER_JOURNAL = 1_000_000
+"""Journal IDs are the owner ID times this plus the position in the journal"""
+BASE_END = dt.datetime(2025, 1, 1, tzinfo=dt.timezone.utc)
+
+
+def default_end(seed: int) -> dt.datetime:
+    """Return the date of the newest journal entry for a seed,
+    a fixed day in the year after ``BASE_END``."""
+    return BASE_END + dt.timedelta(days=seed % 365)
+
+
+class FakeEsi:
+    """Serves synthetic wallet journals like ESI, for load tests without ESI.
+
+    Journals are generated on request and are the same for the same
+    character, page, seed and end, so repeated updates find no new entries
+    and runs with the same arguments are reproducible.
+    Any character or corporation ID is served. Responses have the headers
+    of ESI, including X-Pages, ETag and the error limit headers.
+
+    Errors can be injected: a share of characters get 403 for all requests,
+    like with a revoked token, and a share of requests fail with one of
+    ``error_statuses``. Every error counts against the error limit and
+    all requests get 420 while it is used up, like on ESI.
+    Which requests fail depends only on the seed, the request
+    and how often it was made before.
+
+    Args:
+        pages: Min and max number of journal pages of a character
+        page_size: Entries per page, 2500 on ESI
+        days: Days covered by each journal, ending at ``end``
+        ref_types: Relative frequency by reference type
+        solar_system_ids: Solar systems of bounties, no system if empty.
+            Systems which are not in the database are fetched from ESI
+            during updates, so only give systems that are loaded.
+        payer_ids: Characters making player donations to corporations,
+            e.g. to test payment processing
+        phrase: Text in the description of donations from payers
+        error_rate: Share of requests failing with a server error
+        error_statuses: Status codes of injected errors
+        token_error_rate: Share of characters with a failing token
+        error_limit: Errors allowed per error limit window
+        error_limit_window: Seconds of an error limit window
+        latency: Seconds each request is delayed
+        seed: Seed of all generated data and errors
+        end: Date of the newest entry of all journals, a fixed date
+            derived from the seed by default. Pass ``now()`` for journals
+            ending at the start of the process, e.g. to test the current month.
+    """
+
+    def __init__(
+        self,
+        pages: Sequence[int] = (1, 3),
+        page_size: int = 2500,
+        days: int = 30,
+        ref_types: Optional[dict] = None,
+        solar_system_ids: Sequence[int] = (),
+        payer_ids: Sequence[int] = (),
+        phrase: str = "tax",
+        error_rate: float = 0.0,
+        error_statuses: Sequence[int] = SERVER_ERROR_STATUSES,
+        token_error_rate: float = 0.0,
+        error_limit: int = 100,
+        error_limit_window: int = 60,
+        latency: float = 0.0,
+        seed: int = 1,
+        end: Optional[dt.datetime] = None,
+    ):
+        if pages[0] < 1 or pages[0] > pages[1]:
+            raise ValueError("Invalid page range")
+        if pages[1] * page_size > IDS_PER_JOURNAL:
+            raise ValueError(f"Journals can have at most {IDS_PER_JOURNAL} entries")
+        self.pages = pages
+        self.page_size = page_size
+        self.days = days
+        self.ref_types = ref_types or DEFAULT_REF_TYPES
+        self.solar_system_ids = list(solar_system_ids)
+        self.payer_ids = list(payer_ids)
+        self.phrase = phrase
+        self.error_rate = error_rate
+        self.error_statuses = list(error_statuses)
+        self.token_error_rate = token_error_rate
+        self.error_limit = error_limit
+        self.error_limit_window = error_limit_window
+        self.latency = latency
+        self.seed = seed
+        self.end = (end or default_end(seed)).replace(second=0, microsecond=0)
+        """Date of the newest entry of all journals"""
+
+        self._lock = threading.RLock()
+        self._attempts = {}
+        self._errors_left = error_limit
+        self._window_ends_at = time.monotonic() + error_limit_window
+        self.stats = {"requests": 0, "not_modified": 0, "errors": {}}
+        """Number of requests, of 304 responses and of errors by status"""
+
+    def __repr__(self):
+        return (
+            f"{type(self).__name__}(pages={self.pages}, seed={self.seed}, "
+            f"end={self.end.isoformat()})"
+        )
+
+    def _random(self, *key) -> random.Random:
+        return random.Random("-".join(str(part) for part in (self.seed, *key)))
+
+    def page_count(self, owner_id: int) -> int:
+        """Return the number of journal pages of a character or corporation."""
+        return self._random("pages", owner_id).randint(*self.pages)
+
+    def has_token_error(self, character_id: int) -> bool:
+        return self._random("token", character_id).random() < self.token_error_rate
+
+    def character_journal(self, character_id: int, page: int) -> list:
+        """Return a page of the wallet journal of a character, newest first."""
+        rng = self._random("journal", character_id, page)
+        ref_types = list(self.ref_types)
+        weights = list(self.ref_types.values())
+        entries = []
+        for position, date in self._positions(character_id, page):
+            ref_type = rng.choices(ref_types, weights)[0]
+            low, high = AMOUNT_RANGES.get(ref_type, (1_000, 100_000_000))
+            sign = 1
+            if ref_type not in AMOUNT_RANGES and rng.random() < 0.5:
+                sign = -1
+            entry = {
+                "id": character_id * IDS_PER_JOURNAL + position,
+                "date": date,
+                "ref_type": ref_type,
+                "amount": sign * round(rng.uniform(low, high), 2),
+                "balance": round(rng.uniform(0, 10_000_000_000), 2),
+                "description": f"Synthetic {ref_type} entry",
+                "first_party_id": 1000125 if ref_type in AMOUNT_RANGES else character_id,
+                "second_party_id": character_id,
+            }
+            if ref_type == "bounty_prizes" and self.solar_system_ids:
+                entry["context_id"] = rng.choice(self.solar_system_ids)
+                entry["context_id_type"] = "system_id"
+                entry["solar_system_id"] = entry["context_id"]
+            entries.append(entry)
+        return entries
+
+    def corporation_journal(self, corporation_id: int, division: int, page: int) -> list:
+        """Return a page of the wallet journal of a corporation division,
+        with donations from the payers."""
+        rng = self._random("corporation", corporation_id, division, page)
+        entries = []
+        for position, date in self._positions(corporation_id, page):
+            if self.payer_ids and rng.random() < 0.5:
+                payer_id = rng.choice(self.payer_ids)
+                description = f"{self.phrase} payment"
+            else:
+                payer_id = rng.randint(90_000_000, 98_000_000)
+                description = "Donation"
+            entries.append(
+                {
+                    "id": corporation_id * IDS_PER_JOURNAL + division * 100_000 + position,
+                    "date": date,
+                    "ref_type": "player_donation",
+                    "amount": round(rng.uniform(1_000_000, 500_000_000), 2),
+                    "description": description,
+                    "first_party_id": payer_id,
+                    "second_party_id": payer_id,
+                }
+            )
+        return entries
+
+    def _positions(self, owner_id: int, page: int):
+        """Yield the position and date of the entries of a page."""
+        total = self.page_count(owner_id) * self.page_size
+        step = dt.timedelta(days=self.days) / total
+        start = (page - 1) * self.page_size
+        for position in range(start, min(start + self.page_size, total)):
+            yield position, self.end - step * position
+
+    def etag(self, *key) -> str:
+        digest = hashlib.md5(
+            "-".join(str(part) for part in (self.seed, self.end, *key)).encode()
+        ).hexdigest()
+        return f'"{digest}"'
+
+    def handle(self, path: str, params: dict, headers: dict) -> tuple:
+        """Answer a request like ESI.
+
+        Args:
+            path: Path of the request, with or without the version prefix
+            params: Query parameters
+            headers: Request headers
+
+        Returns:
+            Status code, response headers and the data of the body
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        page = int(params.get("page") or 1)
+        match = CHARACTER_JOURNAL_PATH.search(path)
+        if match:
+            owner_id = int(match["character_id"])
+            key = ("character", owner_id, page)
+        else:
+            match = CORPORATION_JOURNAL_PATH.search(path)
+            if not match:
+                return self._error(404, "Not found")
+            owner_id = int(match["corporation_id"])
+            key = ("corporation", owner_id, int(match["division"]), page)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            if time.monotonic() >= self._window_ends_at:
+                self._errors_left = self.error_limit
+                self._window_ends_at = time.monotonic() + self.error_limit_window
+            if self._errors_left <= 0:
+                return self._error(420, "This software has exceeded the error limit for ESI.")
+            attempt = self._attempts[key] = self._attempts.get(key, 0) + 1
+
+        if not headers.get("Authorization"):
+            return self._error(401, "Authentication required")
+        if key[0] == "character" and self.has_token_error(owner_id):
+            return self._error(403, "token is expired")
+        rng = self._random("error", *key, attempt)
+        if self.error_statuses and rng.random() < self.error_rate:
+            return self._error(rng.choice(self.error_statuses), "Injected error")
+        page_count = self.page_count(owner_id)
+        if page > page_count:
+            return self._error(404, "Requested page does not exist!")
+
+        response_headers = {
+            **self._error_limit_headers(),
+            "X-Pages": str(page_count),
+            "ETag": self.etag(*key),
+            "Expires": (now() + dt.timedelta(hours=1)).strftime("%a, %d %b %Y %H:%M:%S GMT"),
+            "Content-Type": "application/json; charset=UTF-8",
+        }
+        if headers.get("If-None-Match") == response_headers["ETag"]:
+            with self._lock:
+                self.stats["not_modified"] += 1
+            return 304, response_headers, None
+        if key[0] == "character":
+            data = self.character_journal(owner_id, page)
+        else:
+            data = self.corporation_journal(owner_id, key[2], page)
+        return 200, response_headers, data
+
+    def _error_limit_headers(self) -> dict:
+        return {
+            "X-ESI-Error-Limit-Remain": str(max(self._errors_left, 0)),
+            "X-ESI-Error-Limit-Reset": str(
+                max(int(self._window_ends_at - time.monotonic()), 0)
+            ),
+        }
+
+    def _error(self, status: int, message: str) -> tuple:
+        with self._lock:
+            self.stats["errors"][status] = self.stats["errors"].get(status, 0) + 1
+            if status != 420:
+                self._errors_left -= 1
+            headers = self._error_limit_headers()
+        return status, headers, {"error": message}
+
+
+def parse_ref_types(value: str) -> dict:
+    """Parse reference type frequencies from text like
+    "bounty_prizes=60,market_transaction=40".
+
+    Raises:
+        ValueError: If the text is not valid
+    """
+    ref_types = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        ref_type, separator, weight = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid reference type item: {item}")
+        weight = float(weight)
+        if weight < 0:
+            raise ValueError(f"Frequency must not be negative: {item}")
+        ref_types[ref_type.strip()] = weight
+    if not any(ref_types.values()):
+        raise ValueError("At least one reference type needs a frequency above 0")
+    return ref_types
@@ -0,0 +1,62 @@
+"""HTTP server for a fake ESI"""
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .fake_esi import FakeEsi
+
+
+class FakeEsiRequestHandler(BaseHTTPRequestHandler):
+    server_version = "FakeESI"
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        status, headers, data = self.server.fake_esi.handle(
+            url.path, dict(parse_qsl(url.query)), self.headers
+        )
+        body = b"" if data is None else json.dumps(data, cls=DjangoJSONEncoder).encode()
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class FakeEsiServer(ThreadingHTTPServer):
+    """HTTP server answering requests with a fake ESI.
+
+    Point ``PVETAXES_ESI_BASE_URL`` at ``base_url`` to run the async engine
+    against it.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        fake_esi: FakeEsi,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        verbose: bool = False,
+    ):
+        super().__init__((host, port), FakeEsiRequestHandler)
+        self.fake_esi = fake_esi
+        self.verbose = verbose
+
+    def handle_error(self, request, client_address):
+        # clients closing connections early are expected in load tests
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/latest"
@@ -0,0 +1,148 @@
+"""Query and latency budgets of the views"""
+import datetime as dt
+import statistics
+import time
+
+from django.contrib.auth.models import Permission, User
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from django.utils.timezone import now
+
+from .benchmarks import QueryCounter
+from .data import USERNAME_PREFIX, synthetic_characters
+
+VIEW_BUDGETS = {
+    "index": {"queries": 2, "latency": 0.5},
+    "launcher": {"queries": 2, "latency": 0.5},
+    "user_summary": {"queries": 3, "latency": 0.5},
+    "user_ledger": {"queries": 4, "latency": 0.5},
+    "admin_launcher": {"queries": 7, "latency": 0.5},
+    "admin_tables": {"queries": 4, "latency": 1.0},
+}
+"""Max queries and median latency in seconds of each view.
+Queries are counted on top of the FAQ page, which has none of its own,
+so the queries of the session, permissions and the Alliance Auth
+base template are not counted."""
+BASELINE_VIEW = "faq"
+
+PERMISSIONS = ("basic_access", "admin_access", "auditor_access")
+PAUSED_SHARE = 10
+"""Every nth synthetic character is paused, to fill the admin launcher"""
+
+
+def prepare() -> User:
+    """Give the synthetic user with the most characters all permissions
+    and pause some characters.
+
+    Returns:
+        The user the views are rendered for
+    """
+    user = (
+        User.objects.filter(username__startswith=USERNAME_PREFIX)
+        .annotate(character_count=Count("character_ownerships"))
+        .order_by("-character_count", "pk")
+        .first()
+    )
+    if not user:
+        raise ValueError("No synthetic data")
+    user.user_permissions.add(
+        *Permission.objects.filter(
+            content_type__app_label="pvetaxes", codename__in=PERMISSIONS
+        )
+    )
+    paused_until = now() + dt.timedelta(days=365)
+    for number, character in enumerate(synthetic_characters().order_by("pk")):
+        if number % PAUSED_SHARE == 0:
+            character.update_failure_count = 5
+            character.update_paused_until = paused_until
+            character.update_error = "Synthetic error"
+            character.save(
+                update_fields=[
+                    "update_failure_count", "update_paused_until", "update_error"
+                ]
+            )
+    return user
+
+
+def view_urls(user: User) -> dict:
+    """Return the URL of each view for a user."""
+    character = (
+        synthetic_characters()
+        .filter(eve_character__character_ownership__user=user)
+        .order_by("pk")
+        .first()
+    )
+    return {
+        BASELINE_VIEW: reverse("pvetaxes:faq"),
+        "index": reverse("pvetaxes:index"),
+        "launcher": reverse("pvetaxes:launcher"),
+        "user_summary": reverse("pvetaxes:user_summary"),
+        "user_ledger": reverse("pvetaxes:user_ledger", args=[character.pk]),
+        "admin_launcher": reverse("pvetaxes:admin_launcher"),
+        "admin_tables": reverse("pvetaxes:admin_tables"),
+    }
+
+
+def measure_views(user: User, repeat: int = 5) -> dict:
+    """Render each view for a user with the test client.
+
+    Each view is rendered once to warm up caches, then ``repeat`` times.
+
+    Returns:
+        Queries of the last run on top of the baseline view
+        and median latency in seconds by view
+    """
+    client = Client()
+    client.force_login(user)
+    results = {}
+    with override_settings(ALLOWED_HOSTS=["testserver"]):
+        for name, url in view_urls(user).items():
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f"{name} returned {response.status_code}")
+            latencies = []
+            for _ in range(repeat):
+                counter = QueryCounter()
+                with connection.execute_wrapper(counter):
+                    started = time.perf_counter()
+                    client.get(url)
+                    latencies.append(time.perf_counter() - started)
+            results[name] = {
+                "queries": counter.count,
+                "latency": statistics.median(latencies),
+            }
+    baseline = results.pop(BASELINE_VIEW)
+    for result in results.values():
+        result["queries"] -= baseline["queries"]
+    return results
+
+
+def check(results: dict, latency_factor: float = 1.0) -> list:
+    """Return the budgets exceeded by the results of a dataset."""
+    failures = []
+    for name, result in results.items():
+        budget = VIEW_BUDGETS[name]
+        if result["queries"] > budget["queries"]:
+            failures.append(
+                f"{name}: {result['queries']} queries, budget {budget['queries']}"
+            )
+        latency_budget = budget["latency"] * latency_factor
+        if result["latency"] > latency_budget:
+            failures.append(
+                f"{name}: {result['latency'] * 1000:.0f} ms, "
+                f"budget {latency_budget * 1000:.0f} ms"
+            )
+    return failures
+
+
+def check_scaling(small: dict, large: dict) -> list:
+    """Return the views whose queries grow with the dataset."""
+    return [
+        f"{name}: {small[name]['queries']} -> {large[name]['queries']} queries "
+        "with more characters"
+        for name in small
+        if large[name]["queries"] > small[name]["queries"]
+    ]
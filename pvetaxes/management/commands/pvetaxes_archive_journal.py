@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+
+from pvetaxes.app_settings import PVETAXES_JOURNAL_RETENTION_MONTHS
+from pvetaxes.tasks import archive_journal
+
+
+class Command(BaseCommand):
+    help = (
+        "Fold wallet journal entries older than the retention period "
+        "into monthly totals and delete them"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months",
+            type=int,
+            default=PVETAXES_JOURNAL_RETENTION_MONTHS,
+            help="Months of journal entries to keep (default: PVETAXES_JOURNAL_RETENTION_MONTHS)"
+        )
+        parser.add_argument(
+            "--confirm",
+            action="store_true",
+            help="Confirm that you want to delete the archived journal entries"
+        )
+
+    def handle(self, *args, **options):
+        months = options["months"]
+        if months <= 0:
+            self.stdout.write(
+                self.style.ERROR("Retention must be at least one month")
+            )
+            return
+        
+        if not options["confirm"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"This command will delete all journal entries older than "
+                    f"{months} months. Their monthly totals and taxes are kept.\n"
+                    "Run with --confirm to proceed."
+                )
+            )
+            return
+        
+        self.stdout.write("Archiving journal entries...")
+        archived = archive_journal(months)
+        self.stdout.write(
+            self.style.SUCCESS(f"Archived {archived} journal entries")
+        )
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from pvetaxes.models import CharacterWalletJournalEntry
+
+
+class Command(BaseCommand):
+    help = (
+        "Stamp the space category and region of their solar system "
+        "onto wallet journal entries"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Also update entries which already have a region"
+        )
+
+    def handle(self, *args, **options):
+        entries = CharacterWalletJournalEntry.objects.all()
+        if not options["all"]:
+            entries = entries.filter(eve_region_id__isnull=True)
+        
+        self.stdout.write("Updating journal entries...")
+        updated = entries.stamp_space()
+        self.stdout.write(
+            self.style.SUCCESS(f"Updated {updated} journal entries")
+        )
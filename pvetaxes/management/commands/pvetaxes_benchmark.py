@@ -0,0 +1,144 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pvetaxes.loadtesting import benchmarks, data
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the batch jobs on synthetic data and write a JSON report, "
+        "which can be compared with the report of another commit. "
+        "Creates and deletes synthetic users, characters and journal entries, "
+        "so only run it on a test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100)
+        parser.add_argument("--characters", type=int, default=300)
+        parser.add_argument(
+            "--rows", type=int, default=100_000, help="Number of journal entries"
+        )
+        parser.add_argument(
+            "--months", type=int, default=12, help="Months covered by the journal entries"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--jobs",
+            nargs="+",
+            choices=list(benchmarks.JOBS),
+            default=list(benchmarks.JOBS),
+            help="Jobs to time, all by default"
+        )
+        parser.add_argument(
+            "--repeat", type=int, default=3, help="Timed runs of each job"
+        )
+        parser.add_argument("--output", help="File to write the JSON report to")
+        parser.add_argument(
+            "--compare", help="Report of an earlier run to compare with"
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.2,
+            help="Max allowed increase of a metric compared with the earlier report"
+        )
+        parser.add_argument(
+            "--keep-data",
+            action="store_true",
+            help="Keep the synthetic data after the benchmarks"
+        )
+        parser.add_argument(
+            "--allow-existing-data",
+            action="store_true",
+            help=(
+                "Run even if the database has other characters. "
+                "The jobs then also apply interest and payments to them!"
+            )
+        )
+
+    def handle(self, *args, **options):
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        if data.has_other_characters() and not options["allow_existing_data"]:
+            raise CommandError(
+                "The database has characters which are not synthetic. "
+                "Run the benchmarks on a test database."
+            )
+        baseline = None
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as file:
+                baseline = json.load(file)
+
+        self.stdout.write(
+            f"Generating {options['users']} users, {options['characters']} characters "
+            f"and {options['rows']} journal entries..."
+        )
+        started = time.perf_counter()
+        try:
+            counts = data.generate(
+                users=options["users"],
+                characters=options["characters"],
+                rows=options["rows"],
+                months=options["months"],
+                seed=options["seed"],
+            )
+        except ValueError as ex:
+            raise CommandError(str(ex)) from ex
+        report = {
+            **benchmarks.environment(),
+            "dataset": {
+                **counts,
+                "months": options["months"],
+                "seed": options["seed"],
+                "generation_time": time.perf_counter() - started,
+            },
+            "jobs": {},
+        }
+
+        try:
+            for name in options["jobs"]:
+                result = benchmarks.run_job(name, repeat=options["repeat"])
+                report["jobs"][name] = result
+                self.stdout.write(
+                    f"{name}: {result['wall_time']:.3f}s, {result['queries']} queries, "
+                    f"{result['peak_memory'] / 1024 ** 2:.1f} MiB peak"
+                )
+        finally:
+            if not options["keep_data"]:
+                self.stdout.write("Deleting synthetic data...")
+                data.delete()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Report written to {options['output']}")
+
+        if baseline:
+            self.compare(report, baseline, options["threshold"])
+
+    def compare(self, report: dict, baseline: dict, threshold: float):
+        if baseline.get("dataset", {}).get("rows") != report["dataset"]["rows"]:
+            self.stdout.write(
+                self.style.WARNING("The earlier report used a different dataset")
+            )
+        regressions = []
+        for name, metric, old, new, change, is_regression in benchmarks.compare(
+            report, baseline, threshold
+        ):
+            number_format = ",.3f" if metric == "wall_time" else ",.0f"
+            line = (
+                f"{name} {metric}: {old:{number_format}} -> {new:{number_format}} "
+                f"({change:+.0%})"
+            )
+            if is_regression:
+                regressions.append(line)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} metrics increased by more than {threshold:.0%}"
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions"))
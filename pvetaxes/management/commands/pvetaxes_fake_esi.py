@@ -0,0 +1,152 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+from django.utils.timezone import now
+
+from pvetaxes.loadtesting import FakeEsi, FakeEsiServer, parse_ref_types
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve synthetic wallet journals like ESI for load tests. "
+        "Set PVETAXES_ESI_BASE_URL to the printed URL to update characters "
+        "with the async engine against it."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--host", default="127.0.0.1")
+        parser.add_argument("--port", type=int, default=8080)
+        parser.add_argument(
+            "--pages",
+            type=int,
+            nargs=2,
+            default=[1, 3],
+            metavar=("MIN", "MAX"),
+            help="Range of the number of journal pages of each character"
+        )
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            default=2500,
+            help="Journal entries per page"
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=30,
+            help="Days covered by each journal, ending at the --end date"
+        )
+        parser.add_argument(
+            "--ref-types",
+            help='Relative frequency of reference types, e.g. "bounty_prizes=60,market_transaction=40"'
+        )
+        parser.add_argument(
+            "--solar-systems",
+            type=int,
+            nargs="+",
+            default=[],
+            metavar="SOLAR_SYSTEM_ID",
+            help="Solar systems of bounties, only use systems loaded in the database"
+        )
+        parser.add_argument(
+            "--payers",
+            type=int,
+            nargs="+",
+            default=[],
+            metavar="CHARACTER_ID",
+            help="Characters making tax payments to corporations"
+        )
+        parser.add_argument(
+            "--error-rate",
+            type=float,
+            default=0.0,
+            help="Share of requests failing with 420 or a server error"
+        )
+        parser.add_argument(
+            "--token-error-rate",
+            type=float,
+            default=0.0,
+            help="Share of characters whose requests fail with 403"
+        )
+        parser.add_argument(
+            "--error-limit",
+            type=int,
+            default=100,
+            help="Errors allowed per minute before all requests get 420"
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.0,
+            help="Seconds each request is delayed"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--end",
+            help=(
+                'Date of the newest journal entries, e.g. 2025-01-31, or "now". '
+                "Defaults to a fixed date derived from the seed"
+            )
+        )
+        parser.add_argument(
+            "--verbose-requests",
+            action="store_true",
+            help="Log each request"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            fake_esi = FakeEsi(
+                pages=options["pages"],
+                page_size=options["page_size"],
+                days=options["days"],
+                ref_types=(
+                    parse_ref_types(options["ref_types"]) if options["ref_types"] else None
+                ),
+                solar_system_ids=options["solar_systems"],
+                payer_ids=options["payers"],
+                error_rate=options["error_rate"],
+                token_error_rate=options["token_error_rate"],
+                error_limit=options["error_limit"],
+                latency=options["latency"],
+                seed=options["seed"],
+                end=self.parse_end(options["end"]) if options["end"] else None,
+            )
+        except ValueError as ex:
+            raise CommandError(str(ex)) from ex
+
+        server = FakeEsiServer(
+            fake_esi,
+            host=options["host"],
+            port=options["port"],
+            verbose=options["verbose_requests"],
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Serving a fake ESI at {server.base_url}, stop with CTRL-C")
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        stats = fake_esi.stats
+        self.stdout.write(
+            f"{stats['requests']} requests, {stats['not_modified']} not modified, "
+            f"errors by status: {stats['errors']}"
+        )
+
+    @staticmethod
+    def parse_end(value: str) -> dt.datetime:
+        if value == "now":
+            return now()
+        end = parse_datetime(value)
+        if end is None:
+            date = parse_date(value)
+            if date is None:
+                raise ValueError(f"Invalid end date: {value}")
+            end = dt.datetime.combine(date, dt.time())
+        if end.tzinfo is None:
+            end = end.replace(tzinfo=dt.timezone.utc)
+        return end
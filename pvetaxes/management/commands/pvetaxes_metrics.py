@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from pvetaxes import metrics
+from pvetaxes.app_settings import PVETAXES_METRICS_ENABLED
+
+
+class Command(BaseCommand):
+    help = (
+        "Print the recorded counters and timings in the Prometheus text format. "
+        "Metrics are recorded with PVETAXES_METRICS_ENABLED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Delete all recorded metrics"
+        )
+
+    def handle(self, *args, **options):
+        if options["reset"]:
+            metrics.reset()
+            self.stdout.write(self.style.SUCCESS("Metrics deleted"))
+            return
+        if not PVETAXES_METRICS_ENABLED:
+            self.stderr.write(
+                self.style.WARNING("PVETAXES_METRICS_ENABLED is off, no metrics are recorded")
+            )
+        self.stdout.write(metrics.export(), ending="")
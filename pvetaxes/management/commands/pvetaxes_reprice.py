@@ -0,0 +1,82 @@
+import datetime as dt
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from pvetaxes.models import RepricingRun
+from pvetaxes.tasks import reprice_journal
+
+
+def parse_date(value: str) -> dt.date:
+    try:
+        return dt.date.fromisoformat(value)
+    except ValueError as ex:
+        raise CommandError(f"Invalid date: {value}") from ex
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalculate the taxes of journal entries in a date range "
+        "with the current tax rates"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--from",
+            dest="start",
+            help="First day to reprice as YYYY-MM-DD"
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            help="Last day to reprice as YYYY-MM-DD (default: today)"
+        )
+        parser.add_argument(
+            "--resume",
+            action="store_true",
+            help="Resume the last unfinished repricing run"
+        )
+        parser.add_argument(
+            "--confirm",
+            action="store_true",
+            help="Confirm that you want to overwrite the taxes of the journal entries"
+        )
+
+    def handle(self, *args, **options):
+        if options["resume"]:
+            run = (
+                RepricingRun.objects.exclude(phase=RepricingRun.Phase.DONE)
+                .order_by("-pk")
+                .first()
+            )
+            if not run:
+                self.stdout.write(self.style.WARNING("No unfinished repricing run"))
+                return
+        else:
+            if not options["start"]:
+                raise CommandError("--from is required unless resuming a run")
+            start = parse_date(options["start"])
+            end = (
+                parse_date(options["end"])
+                if options["end"]
+                else timezone.now().date()
+            )
+            if end < start:
+                raise CommandError("--to must not be before --from")
+            
+            if not options["confirm"]:
+                self.stdout.write(
+                    self.style.WARNING(
+                        f"This command will recalculate the taxes of all journal "
+                        f"entries from {start} to {end} with the current tax rates.\n"
+                        "Run with --confirm to proceed."
+                    )
+                )
+                return
+            run = RepricingRun.start(start, end)
+        
+        self.stdout.write(f"{run}...")
+        repriced = reprice_journal(run.pk)
+        self.stdout.write(
+            self.style.SUCCESS(f"Repriced {repriced} journal entries")
+        )
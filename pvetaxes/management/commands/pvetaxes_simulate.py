@@ -0,0 +1,86 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pvetaxes.helpers import parse_month_label
+from pvetaxes.simulator import TaxSimulator, parse_schedule
+
+
+class Command(BaseCommand):
+    help = (
+        "Show how taxes would change with other tax rates. "
+        "Schedules are given as rates by space category and optionally activity type, "
+        'e.g. "nullsec=0.05,bounty.losec=0.1"'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--schedule",
+            action="append",
+            required=True,
+            help="Candidate tax rates, can be given multiple times"
+        )
+        parser.add_argument(
+            "--from",
+            dest="start",
+            help="First month to include as YYYY-MM"
+        )
+        parser.add_argument(
+            "--to",
+            dest="end",
+            help="Last month to include as YYYY-MM"
+        )
+        parser.add_argument(
+            "--top",
+            type=int,
+            default=10,
+            help="Number of users with the largest changes to show per schedule"
+        )
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Reload the earnings instead of using the cached ones"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            schedules = [parse_schedule(value) for value in options["schedule"]]
+            start_month = parse_month_label(options["start"]) if options["start"] else None
+            end_month = parse_month_label(options["end"]) if options["end"] else None
+        except ValueError as ex:
+            raise CommandError(str(ex)) from ex
+        
+        started = time.perf_counter()
+        simulator = TaxSimulator.load(refresh=options["refresh"])
+        loaded = time.perf_counter()
+        try:
+            result = simulator.evaluate(schedules, start_month, end_month)
+        except ValueError as ex:
+            raise CommandError(str(ex)) from ex
+        finished = time.perf_counter()
+        
+        self.stdout.write(f"Current taxes: {result['current']:,.0f} ISK")
+        for value, schedule in zip(options["schedule"], result["schedules"]):
+            self.stdout.write("")
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{value}: {schedule['total']:,.0f} ISK ({schedule['delta']:+,.0f} ISK)"
+                )
+            )
+            changes = sorted(
+                zip(result["users"], schedule["user_totals"], schedule["user_deltas"]),
+                key=lambda change: abs(change[2]),
+                reverse=True,
+            )
+            for user, total, delta in changes[: options["top"]]:
+                self.stdout.write(
+                    f"  {user['name']}: {user['current']:,.0f} -> {total:,.0f} ISK "
+                    f"({delta:+,.0f} ISK)"
+                )
+        
+        self.stdout.write("")
+        self.stdout.write(
+            f"Loaded {len(simulator.amounts)} aggregates of {len(simulator.user_ids)} users "
+            f"in {loaded - started:.3f}s, evaluated {len(schedules)} schedules "
+            f"in {finished - loaded:.3f}s"
+        )
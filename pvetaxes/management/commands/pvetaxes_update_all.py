@@ -1,17 +1,235 @@
-from django.core.management.base import BaseCommand
+import multiprocessing
+import time
 
-from pvetaxes.tasks import update_all_characters
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from pvetaxes.app_settings import PVETAXES_HARVESTER_CHUNK_SIZE, PVETAXES_UPDATE_ENGINE
+from pvetaxes.models import Character
+from pvetaxes.providers import esi_call_count
+from pvetaxes.tasks import (
+    schedule_stats_update,
+    update_all_characters,
+    update_character,
+    update_engine,
+)
+
+PROGRESS_INTERVAL = 5
+"""Seconds between progress lines"""
+
+
+def _init_worker():
+    """Drop the DB connections inherited from the parent process,
+    so that each worker opens its own."""
+    connections.close_all()
+
+
+def _update_character_pk(character_pk: int) -> dict:
+    """Update one character in a worker process."""
+    esi_calls_before = esi_call_count()
+    result = {"pk": character_pk, "new_entries": 0, "error": None}
+    try:
+        character = Character.objects.active().get(pk=character_pk)
+        result["new_entries"] = update_character(character) or 0
+    except Exception as ex:
+        result["error"] = f"{type(ex).__name__}: {ex}"
+    result["esi_calls"] = esi_call_count() - esi_calls_before
+    return result
 
 
 class Command(BaseCommand):
     help = "Update wallet journals for all registered characters"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--engine",
+            choices=["sync", "async"],
+            default=PVETAXES_UPDATE_ENGINE,
+            help=(
+                "sync updates one character at a time per worker, "
+                "async fetches the journals of many characters at the same time"
+            )
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of worker processes to update characters in parallel"
+        )
+        parser.add_argument(
+            "--characters",
+            type=int,
+            nargs="+",
+            metavar="CHARACTER_ID",
+            help="Only update these EVE characters"
+        )
+        parser.add_argument(
+            "--corporation",
+            type=int,
+            metavar="CORPORATION_ID",
+            help="Only update characters of this EVE corporation"
+        )
+        parser.add_argument(
+            "--stale-only",
+            action="store_true",
+            help="Only update characters whose wallet journal is stale"
+        )
+
     def handle(self, *args, **options):
-        self.stdout.write("Starting update for all characters...")
-        result = update_all_characters()
+        if options["workers"] < 1:
+            raise CommandError("--workers must be at least 1")
+        engine = update_engine(options["engine"])
+        if engine == "async" and options["workers"] > 1:
+            raise CommandError("--workers can not be used with the async engine")
+
+        standalone = (
+            options["workers"] > 1
+            or options["characters"]
+            or options["corporation"]
+            or options["stale_only"]
+        )
+        if not standalone:
+            self.update_all(engine)
+            return
+
+        characters = Character.objects.active().updatable()
+        if options["characters"]:
+            characters = characters.filter(
+                eve_character__character_id__in=options["characters"]
+            )
+        if options["corporation"]:
+            characters = characters.filter(
+                eve_character__corporation_id=options["corporation"]
+            )
+        if options["stale_only"]:
+            stale_before = timezone.now() - Character.update_time_until_stale()
+            characters = characters.filter(
+                Q(last_wallet_update__isnull=True)
+                | Q(last_wallet_update__lt=stale_before)
+            )
+        character_pks = list(characters.order_by("pk").values_list("pk", flat=True))
+        if not character_pks:
+            self.stdout.write("No characters to update")
+            return
+
+        if engine == "async":
+            self.stdout.write(
+                f"Updating {len(character_pks)} characters with the async engine..."
+            )
+            self.harvest_characters(character_pks)
+        else:
+            self.stdout.write(
+                f"Updating {len(character_pks)} characters "
+                f"with {options['workers']} workers..."
+            )
+            self.update_characters(character_pks, options["workers"])
+        schedule_stats_update()
+
+    def update_all(self, engine: str):
+        self.stdout.write(f"Starting update for all characters with the {engine} engine...")
+        result = update_all_characters(engine)
+        if result is None:
+            self.stdout.write(
+                self.style.WARNING("Another update of all characters is running")
+            )
+            return
+        if not result["finished"]:
+            self.stdout.write(
+                self.style.WARNING("Time limit reached, the update continues in a task")
+            )
         self.stdout.write(
             self.style.SUCCESS(
                 f"Update complete: {result['success']}/{result['total']} succeeded, "
                 f"{result['failed']} failed"
             )
         )
+
+    def update_characters(self, character_pks: list, workers: int):
+        """Update characters in worker processes and report the throughput."""
+        totals = {"done": 0, "failed": 0, "new_entries": 0, "esi_calls": 0}
+        started = time.monotonic()
+        last_report = started
+
+        if workers > 1:
+            # workers are forked, so the parent must not hold open connections
+            connections.close_all()
+            pool = multiprocessing.get_context("fork").Pool(
+                workers, initializer=_init_worker
+            )
+            results = pool.imap_unordered(_update_character_pk, character_pks)
+        else:
+            pool = None
+            results = map(_update_character_pk, character_pks)
+
+        try:
+            for result in results:
+                totals["done"] += 1
+                totals["new_entries"] += result["new_entries"]
+                totals["esi_calls"] += result["esi_calls"]
+                if result["error"]:
+                    totals["failed"] += 1
+                    self.stdout.write(
+                        self.style.ERROR(
+                            f"Character {result['pk']} failed: {result['error']}"
+                        )
+                    )
+                if time.monotonic() - last_report >= PROGRESS_INTERVAL:
+                    last_report = time.monotonic()
+                    self.report(totals, len(character_pks), last_report - started)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+
+        self.report(totals, len(character_pks), time.monotonic() - started)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Update complete: {totals['done'] - totals['failed']}/"
+                f"{len(character_pks)} succeeded, {totals['failed']} failed"
+            )
+        )
+
+    def harvest_characters(self, character_pks: list):
+        """Update characters in chunks with the async engine
+        and report the throughput."""
+        from pvetaxes.harvester import WalletHarvester
+
+        harvester = WalletHarvester()
+        totals = {"done": 0, "failed": 0, "new_entries": 0, "esi_calls": 0}
+        started = time.monotonic()
+        esi_calls_before = esi_call_count()
+        for start in range(0, len(character_pks), PVETAXES_HARVESTER_CHUNK_SIZE):
+            chunk = Character.objects.select_related("eve_character").filter(
+                pk__in=character_pks[start:start + PVETAXES_HARVESTER_CHUNK_SIZE]
+            )
+            for character_pk, result in harvester.run(list(chunk)).items():
+                totals["done"] += 1
+                totals["new_entries"] += result.new_entries
+                if result.error:
+                    totals["failed"] += 1
+                    self.stdout.write(
+                        self.style.ERROR(
+                            f"Character {character_pk} failed: "
+                            f"{type(result.error).__name__}: {result.error}"
+                        )
+                    )
+            totals["esi_calls"] = esi_call_count() - esi_calls_before
+            self.report(totals, len(character_pks), time.monotonic() - started)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Update complete: {totals['done'] - totals['failed']}/"
+                f"{len(character_pks)} succeeded, {totals['failed']} failed"
+            )
+        )
+
+    def report(self, totals: dict, total: int, seconds: float):
+        seconds = max(seconds, 0.001)
+        self.stdout.write(
+            f"{totals['done']}/{total} characters in {seconds:.0f}s: "
+            f"{totals['done'] / seconds:.2f} chars/s, "
+            f"{totals['new_entries'] / seconds:.0f} rows/s, "
+            f"{totals['esi_calls']} ESI calls"
+        )
@@ -18,7 +18,7 @@ class Command(BaseCommand):
         character_id = options["character_id"]
         
         try:
-            character = Character.objects.get(pk=character_id)
+            character = Character.objects.active().get(pk=character_id)
             self.stdout.write(f"Updating {character}...")
             
             result = update_character_wallet(character_id)
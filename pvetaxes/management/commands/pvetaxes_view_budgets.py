@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from pvetaxes.loadtesting import data, view_budgets
+
+
+class Command(BaseCommand):
+    help = (
+        "Render the views on a small and a large synthetic dataset and check "
+        "their query and latency budgets. Fails when a budget is exceeded or when "
+        "the queries of a view grow with the number of characters. "
+        "Creates and deletes synthetic users, characters and journal entries, "
+        "so only run it on a test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=20)
+        parser.add_argument(
+            "--characters",
+            type=int,
+            nargs=2,
+            default=[40, 400],
+            metavar=("SMALL", "LARGE"),
+            help="Characters of the small and the large dataset"
+        )
+        parser.add_argument(
+            "--rows", type=int, default=20_000, help="Journal entries of the large dataset"
+        )
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--repeat", type=int, default=5, help="Timed renders of each view"
+        )
+        parser.add_argument(
+            "--latency-factor",
+            type=float,
+            default=1.0,
+            help="Multiplier of the latency budgets, e.g. for slow CI machines"
+        )
+        parser.add_argument("--output", help="File to write the JSON results to")
+
+    def handle(self, *args, **options):
+        small, large = options["characters"]
+        if small >= large:
+            raise CommandError("The large dataset needs more characters")
+        if options["repeat"] < 1:
+            raise CommandError("--repeat must be at least 1")
+        if data.has_other_characters():
+            raise CommandError(
+                "The database has characters which are not synthetic. "
+                "Run the view budgets on a test database."
+            )
+
+        results = {}
+        try:
+            for size, characters in (("small", small), ("large", large)):
+                try:
+                    data.generate(
+                        users=options["users"],
+                        characters=characters,
+                        rows=options["rows"] * characters // large,
+                        months=3,
+                        seed=options["seed"],
+                    )
+                except ValueError as ex:
+                    raise CommandError(str(ex)) from ex
+                user = view_budgets.prepare()
+                results[size] = view_budgets.measure_views(user, options["repeat"])
+                self.stdout.write(
+                    f"{size} dataset, {user.character_ownerships.count()} characters "
+                    "of the user:"
+                )
+                for name, result in results[size].items():
+                    self.stdout.write(
+                        f"  {name}: {result['queries']} queries, "
+                        f"{result['latency'] * 1000:.0f} ms"
+                    )
+        finally:
+            self.stdout.write("Deleting synthetic data...")
+            data.delete()
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2)
+
+        failures = view_budgets.check_scaling(results["small"], results["large"])
+        for size in ("small", "large"):
+            failures += [
+                f"{size} dataset, {failure}"
+                for failure in view_budgets.check(
+                    results[size], options["latency_factor"]
+                )
+            ]
+        for failure in failures:
+            self.stdout.write(self.style.ERROR(failure))
+        if failures:
+            raise CommandError(f"{len(failures)} view budgets exceeded")
+        self.stdout.write(self.style.SUCCESS("All views within budget"))
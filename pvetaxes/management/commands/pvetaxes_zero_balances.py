@@ -26,9 +26,9 @@ class Command(BaseCommand):
         
         self.stdout.write("Zeroing all character balances...")
         
-        for character in Character.objects.all():
+        for character in Character.objects.active():
             # Calculate current balance
-            lifetime_taxes = character.wallet_journal.aggregate(
+            lifetime_taxes = character.monthly_rollups.aggregate(
                 total=models.Sum("tax_amount")
             )["total"] or 0
             
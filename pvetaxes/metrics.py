@@ -0,0 +1,314 @@
+"""Counters and timing histograms of the hot paths, exported for Prometheus.
+
+Metrics are only recorded with ``PVETAXES_METRICS_ENABLED``. When disabled,
+recording a metric returns right away and timed blocks do nothing else.
+
+Samples of all processes are added up in one Redis hash. Each process
+buffers its samples and sends them in one pipeline when the outermost
+timed block ends, at least every ``FLUSH_INTERVAL`` seconds during long
+blocks, and right away when recorded outside of timed blocks.
+"""
+import threading
+import time
+from collections import defaultdict
+from contextlib import ContextDecorator
+from typing import Optional
+
+from django.db import connection
+from redis.exceptions import RedisError
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+from .app_settings import PVETAXES_METRICS_ENABLED
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+KEY = "pvetaxes-metrics"
+"""Redis hash with the value of each sample"""
+
+TIME_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+QUERY_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+ROW_BUCKETS = (0, 10, 100, 1000, 2500, 10000, 50000)
+FLUSH_INTERVAL = 10
+
+_registry = {}
+_lock = threading.Lock()
+_pending = defaultdict(float)
+_pending_since = 0.0
+_open_blocks = 0
+
+
+def _redis():
+    from django_redis import get_redis_connection
+
+    return get_redis_connection("default")
+
+
+def _sample_name(name: str, labels: dict) -> str:
+    if not labels:
+        return name
+    pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return f"{name}{{{pairs}}}"
+
+
+def _record(samples: dict):
+    """Add values to samples and send them if no timed block is open
+    or they were buffered for too long."""
+    global _pending_since
+    with _lock:
+        if not _pending:
+            _pending_since = time.monotonic()
+        for sample, value in samples.items():
+            _pending[sample] += value
+        if _open_blocks and time.monotonic() - _pending_since < FLUSH_INTERVAL:
+            return
+    flush()
+
+
+def flush():
+    """Send the buffered samples of this process to Redis."""
+    with _lock:
+        if not _pending:
+            return
+        samples = dict(_pending)
+        _pending.clear()
+    try:
+        pipe = _redis().pipeline(transaction=False)
+        for sample, value in samples.items():
+            if float(value).is_integer():
+                pipe.hincrby(KEY, sample, int(value))
+            else:
+                pipe.hincrbyfloat(KEY, sample, value)
+        pipe.execute()
+    except (NotImplementedError, RedisError) as ex:
+        logger.warning("Failed to record metrics: %s", ex)
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        _registry[name] = self
+
+
+class Counter(_Metric):
+    """Counts events, e.g. requests by status."""
+
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if not PVETAXES_METRICS_ENABLED:
+            return
+        _record({_sample_name(self.name, labels): amount})
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. durations in seconds."""
+
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: tuple = TIME_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = buckets
+
+    def observe(self, value: float, **labels):
+        if not PVETAXES_METRICS_ENABLED:
+            return
+        samples = {
+            _sample_name(f"{self.name}_bucket", {**labels, "le": bound}): 1
+            for bound in self.buckets
+            if value <= bound
+        }
+        samples[_sample_name(f"{self.name}_bucket", {**labels, "le": "+Inf"})] = 1
+        samples[_sample_name(f"{self.name}_sum", labels)] = value
+        samples[_sample_name(f"{self.name}_count", labels)] = 1
+        _record(samples)
+
+    def time(self, queries: Optional["Histogram"] = None, **labels) -> "_Timer":
+        """Observe the duration of a block or function in seconds.
+
+        Args:
+            queries: Histogram observing the number of database queries
+                of the block
+        """
+        if not PVETAXES_METRICS_ENABLED:
+            return _NO_TIMER
+        return _Timer(self, queries, labels)
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class _Timer(ContextDecorator):
+    def __init__(self, histogram: Histogram, queries: Optional[Histogram], labels: dict):
+        self.histogram = histogram
+        self.queries = queries
+        self.labels = labels
+        self._counter = None
+        self._wrapper = None
+        self._started = None
+
+    def _recreate_cm(self):
+        # each call of a decorated function gets its own timer,
+        # so functions can run in several threads at the same time
+        return _Timer(self.histogram, self.queries, self.labels)
+
+    def __enter__(self):
+        global _open_blocks
+        with _lock:
+            _open_blocks += 1
+        if self.queries:
+            self._counter = _QueryCounter()
+            self._wrapper = connection.execute_wrapper(self._counter)
+            self._wrapper.__enter__()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        global _open_blocks
+        self.histogram.observe(time.perf_counter() - self._started, **self.labels)
+        if self.queries:
+            self._wrapper.__exit__(*exc)
+            self.queries.observe(self._counter.count, **self.labels)
+        with _lock:
+            _open_blocks -= 1
+            is_outermost = not _open_blocks
+        if is_outermost:
+            flush()
+        return False
+
+
+class _NoTimer(ContextDecorator):
+    def __call__(self, func):
+        # decorated functions are not wrapped while metrics are disabled
+        return func
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_TIMER = _NoTimer()
+
+
+def export() -> str:
+    """Return all samples in the Prometheus text format."""
+    flush()
+    try:
+        values = _redis().hgetall(KEY)
+    except (NotImplementedError, RedisError) as ex:
+        logger.warning("Failed to read metrics: %s", ex)
+        values = {}
+
+    samples = defaultdict(list)
+    for sample, value in values.items():
+        sample = sample.decode()
+        name = sample.split("{", 1)[0]
+        for suffix in ("_bucket", "_sum", "_count"):
+            base = name[: -len(suffix)]
+            if name.endswith(suffix) and isinstance(_registry.get(base), Histogram):
+                name = base
+                break
+        samples[name].append((sample, float(value)))
+
+    lines = []
+    for name, metric in sorted(_registry.items()):
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.type}")
+        for sample, value in sorted(samples.get(name, []), key=_sort_key):
+            lines.append(f"{sample} {int(value) if value.is_integer() else value}")
+    return "\n".join(lines) + "\n"
+
+
+def _sort_key(sample: tuple) -> tuple:
+    """Sort samples by labels and histogram buckets by their bound."""
+    name = sample[0]
+    if 'le="' not in name:
+        return name, 0.0
+    head, bound = name.split('le="', 1)
+    bound = bound.split('"', 1)[0]
+    return head, float("inf") if bound == "+Inf" else float(bound)
+
+
+def reset():
+    """Delete all recorded samples."""
+    with _lock:
+        _pending.clear()
+    try:
+        _redis().delete(KEY)
+    except (NotImplementedError, RedisError) as ex:
+        logger.warning("Failed to reset metrics: %s", ex)
+
+
+esi_request_seconds = Histogram(
+    "pvetaxes_esi_request_seconds", "Duration of ESI wallet journal page requests"
+)
+esi_requests = Counter(
+    "pvetaxes_esi_requests_total", "ESI wallet journal page requests by result"
+)
+journal_rows_inserted = Counter(
+    "pvetaxes_journal_rows_inserted_total", "Journal entries stored by wallet type"
+)
+character_update_seconds = Histogram(
+    "pvetaxes_character_update_seconds",
+    "Duration of wallet journal updates of a character",
+)
+character_update_queries = Histogram(
+    "pvetaxes_character_update_queries",
+    "Database queries of wallet journal updates of a character",
+    QUERY_BUCKETS,
+)
+character_update_rows = Histogram(
+    "pvetaxes_character_update_rows",
+    "New journal entries of wallet journal updates of a character",
+    ROW_BUCKETS,
+)
+character_update_failures = Counter(
+    "pvetaxes_character_update_failures_total",
+    "Failed character updates by reason (token or esi)",
+)
+corp_wallet_update_seconds = Histogram(
+    "pvetaxes_corp_wallet_update_seconds", "Duration of corporation wallet updates"
+)
+corp_wallet_update_queries = Histogram(
+    "pvetaxes_corp_wallet_update_queries",
+    "Database queries of corporation wallet updates",
+    QUERY_BUCKETS,
+)
+stats_update_seconds = Histogram(
+    "pvetaxes_stats_update_seconds", "Duration of statistics updates"
+)
+stats_update_queries = Histogram(
+    "pvetaxes_stats_update_queries",
+    "Database queries of statistics updates",
+    QUERY_BUCKETS,
+)
+calctaxes_seconds = Histogram(
+    "pvetaxes_calctaxes_seconds", "Duration of tax balance calculations of all users"
+)
+calctaxes_queries = Histogram(
+    "pvetaxes_calctaxes_queries",
+    "Database queries of tax balance calculations of all users",
+    QUERY_BUCKETS,
+)
+harvest_seconds = Histogram(
+    "pvetaxes_harvest_seconds", "Duration of async engine runs"
+)
+discord_request_seconds = Histogram(
+    "pvetaxes_discord_request_seconds", "Duration of sending Discord messages by kind"
+)
+discord_messages = Counter(
+    "pvetaxes_discord_messages_total", "Discord messages by kind and result"
+)
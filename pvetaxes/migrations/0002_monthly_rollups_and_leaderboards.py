@@ -0,0 +1,82 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:39
+
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    CharacterWalletJournalEntry = apps.get_model("pvetaxes", "CharacterWalletJournalEntry")
+    CharacterMonthlyRollup = apps.get_model("pvetaxes", "CharacterMonthlyRollup")
+    monthly_data = (
+        CharacterWalletJournalEntry.objects
+        .annotate(month=TruncMonth("date"))
+        .values("character_id", "month", "activity_type")
+        .annotate(
+            total_amount=Sum("amount"),
+            total_tax=Sum("tax_amount"),
+            taxable_amount=Sum("amount", filter=Q(tax_amount__gt=0)),
+            entry_count=Count("id"),
+        )
+        .order_by()
+    )
+    CharacterMonthlyRollup.objects.bulk_create(
+        (
+            CharacterMonthlyRollup(
+                character_id=entry["character_id"],
+                month=entry["month"].year * 100 + entry["month"].month,
+                activity_type=entry["activity_type"],
+                amount=entry["total_amount"],
+                tax_amount=entry["total_tax"],
+                taxable_amount=entry["taxable_amount"] or 0.0,
+                entry_count=entry["entry_count"],
+            )
+            for entry in monthly_data.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyLeaderboard',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.PositiveIntegerField(unique=True)),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.CreateModel(
+            name='CharacterMonthlyRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.PositiveIntegerField()),
+                ('activity_type', models.CharField(max_length=50)),
+                ('amount', models.FloatField(default=0.0)),
+                ('tax_amount', models.FloatField(default=0.0)),
+                ('taxable_amount', models.FloatField(default=0.0)),
+                ('entry_count', models.PositiveIntegerField(default=0)),
+                ('character', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_rollups', to='pvetaxes.character')),
+            ],
+            options={
+                'default_permissions': (),
+                'indexes': [models.Index(fields=['month', 'activity_type'], name='pvetaxes_ch_month_b52dcb_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='charactermonthlyrollup',
+            constraint=models.UniqueConstraint(fields=('character', 'month', 'activity_type'), name='pvetaxes_rollup_unique_character_month_activity'),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
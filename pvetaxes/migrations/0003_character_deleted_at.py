@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0002_monthly_rollups_and_leaderboards'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='deleted_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0003_character_deleted_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='charactermonthlyrollup',
+            name='archived',
+            field=models.BooleanField(default=False),
+        ),
+    ]
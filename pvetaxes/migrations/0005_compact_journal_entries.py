@@ -0,0 +1,147 @@
+from django.db import migrations, models, transaction
+from django.db.models import F, Max, Min
+from django.db.models.functions import Round
+
+CHUNK_SIZE = 20_000
+
+REF_TYPES = {
+    "bounty_prizes": 1,
+    "ess_escrow_transfer": 2,
+    "agent_mission_reward": 3,
+    "agent_mission_time_bonus_reward": 4,
+    "corporate_reward_payout": 5,
+}
+
+ACTIVITY_TYPES = {
+    "bounty": 1,
+    "ess": 2,
+    "mission": 3,
+    "incursion": 4,
+}
+
+
+def convert_journal(apps, schema_editor):
+    """Fill the compact columns with set-based updates,
+    one transaction per chunk of primary keys."""
+    CharacterWalletJournalEntry = apps.get_model("pvetaxes", "CharacterWalletJournalEntry")
+    bounds = CharacterWalletJournalEntry.objects.aggregate(Min("pk"), Max("pk"))
+    if bounds["pk__min"] is None:
+        return
+
+    for start in range(bounds["pk__min"], bounds["pk__max"] + 1, CHUNK_SIZE):
+        chunk = CharacterWalletJournalEntry.objects.filter(
+            pk__gte=start, pk__lt=start + CHUNK_SIZE
+        )
+        with transaction.atomic():
+            chunk.update(
+                amount_cents=Round(F("amount") * 100),
+                tax_cents=Round(F("tax_amount") * 100),
+                tax_rate_bps=Round(F("tax_rate") * 10_000),
+            )
+            for name, code in REF_TYPES.items():
+                chunk.filter(ref_type=name).update(ref_type_code=code)
+            for name, code in ACTIVITY_TYPES.items():
+                chunk.filter(activity_type=name).update(activity_type_code=code)
+            chunk.filter(description="").update(description=None)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pvetaxes', '0004_rollup_archived'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='characterwalletjournalentry',
+            name='pvetaxes_ch_activit_ba3c9e_idx',
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='amount_cents',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='tax_cents',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='tax_rate_bps',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='ref_type_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='activity_type_code',
+            field=models.PositiveSmallIntegerField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.RunPython(convert_journal, migrations.RunPython.noop),
+        # entries of unknown types can not be represented anymore
+        migrations.RunSQL(
+            "DELETE FROM pvetaxes_characterwalletjournalentry "
+            "WHERE ref_type_code IS NULL OR activity_type_code IS NULL",
+            migrations.RunSQL.noop,
+        ),
+        migrations.RemoveField(
+            model_name='characterwalletjournalentry',
+            name='amount',
+        ),
+        migrations.RemoveField(
+            model_name='characterwalletjournalentry',
+            name='tax_amount',
+        ),
+        migrations.RemoveField(
+            model_name='characterwalletjournalentry',
+            name='tax_rate',
+        ),
+        migrations.RemoveField(
+            model_name='characterwalletjournalentry',
+            name='ref_type',
+        ),
+        migrations.RemoveField(
+            model_name='characterwalletjournalentry',
+            name='activity_type',
+        ),
+        migrations.RenameField(
+            model_name='characterwalletjournalentry',
+            old_name='ref_type_code',
+            new_name='ref_type',
+        ),
+        migrations.RenameField(
+            model_name='characterwalletjournalentry',
+            old_name='activity_type_code',
+            new_name='activity_type',
+        ),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='amount_cents',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='ref_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'bounty_prizes'), (2, 'ess_escrow_transfer'), (3, 'agent_mission_reward'), (4, 'agent_mission_time_bonus_reward'), (5, 'corporate_reward_payout')]),
+        ),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='activity_type',
+            field=models.PositiveSmallIntegerField(choices=[(1, 'bounty'), (2, 'ess'), (3, 'mission'), (4, 'incursion')]),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['activity_type', 'date'], name='pvetaxes_ch_activit_ba3c9e_idx'),
+        ),
+    ]
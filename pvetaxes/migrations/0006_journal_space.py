@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0005_compact_journal_entries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='eve_region_id',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='security_category',
+            field=models.PositiveSmallIntegerField(choices=[(0, 'unknown'), (1, 'hisec'), (2, 'losec'), (3, 'nullsec'), (4, 'jspace'), (5, 'pochven')], default=0),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['security_category', 'date'], name='pvetaxes_ch_securit_894d0d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['eve_region_id', 'date'], name='pvetaxes_ch_eve_reg_1bd9e7_idx'),
+        ),
+    ]
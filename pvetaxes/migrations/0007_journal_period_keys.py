@@ -0,0 +1,77 @@
+import datetime as dt
+
+from django.db import migrations, models, transaction
+from django.db.models import Max, Min
+from django.db.models.functions import ExtractDay, ExtractMonth, ExtractYear
+
+CHUNK_SIZE = 20_000
+
+
+def fill_period_keys(apps, schema_editor):
+    """Fill the period keys with set-based updates,
+    one transaction per chunk of primary keys."""
+    CharacterWalletJournalEntry = apps.get_model("pvetaxes", "CharacterWalletJournalEntry")
+    bounds = CharacterWalletJournalEntry.objects.aggregate(Min("pk"), Max("pk"))
+    if bounds["pk__min"] is None:
+        return
+
+    year = ExtractYear("date", tzinfo=dt.timezone.utc)
+    month = ExtractMonth("date", tzinfo=dt.timezone.utc)
+    day = ExtractDay("date", tzinfo=dt.timezone.utc)
+    for start in range(bounds["pk__min"], bounds["pk__max"] + 1, CHUNK_SIZE):
+        with transaction.atomic():
+            CharacterWalletJournalEntry.objects.filter(
+                pk__gte=start, pk__lt=start + CHUNK_SIZE
+            ).update(
+                period_month=year * 100 + month,
+                period_day=year * 10000 + month * 100 + day,
+            )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('pvetaxes', '0006_journal_space'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='characterwalletjournalentry',
+            name='pvetaxes_ch_securit_894d0d_idx',
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='period_day',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='characterwalletjournalentry',
+            name='period_month',
+            field=models.PositiveIntegerField(null=True),
+        ),
+        migrations.RunPython(fill_period_keys, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='period_day',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AlterField(
+            model_name='characterwalletjournalentry',
+            name='period_month',
+            field=models.PositiveIntegerField(),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['character', 'period_month', 'activity_type', 'amount_cents', 'tax_cents'], name='pvetaxes_ch_charact_f98467_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['period_day', 'activity_type'], name='pvetaxes_ch_period__7f8a40_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='characterwalletjournalentry',
+            index=models.Index(fields=['period_month', 'security_category'], name='pvetaxes_ch_period__8fb58d_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0007_journal_period_keys'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RepricingRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_day', models.PositiveIntegerField()),
+                ('end_day', models.PositiveIntegerField()),
+                ('phase', models.CharField(choices=[('reprice', 'Repricing journal entries'), ('rollups', 'Rebuilding monthly totals'), ('done', 'Done')], default='reprice', max_length=16)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('repriced_count', models.PositiveBigIntegerField(default=0)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+    ]
@@ -0,0 +1,99 @@
+# Generated by Django 4.2.30 on 2026-10-19 06:57
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def seed_tax_rules(apps, schema_editor):
+    """Copy the tax rates and system lists from the Django settings."""
+    from pvetaxes import app_settings
+
+    Settings = apps.get_model("pvetaxes", "Settings")
+    TaxRate = apps.get_model("pvetaxes", "TaxRate")
+    TaxSystemOverride = apps.get_model("pvetaxes", "TaxSystemOverride")
+
+    settings, _ = Settings.objects.get_or_create(pk=1)
+    settings.tax_listed_systems_only = bool(app_settings.PVETAXES_WHITELIST)
+    settings.save()
+
+    category_rates = {
+        0: app_settings.PVETAXES_UNKNOWN_TAX_RATE,
+        1: app_settings.PVETAXES_TAX_HISEC if app_settings.PVETAXES_TAX_HISEC_ENABLED else 0.0,
+        2: app_settings.PVETAXES_TAX_LOSEC if app_settings.PVETAXES_TAX_LOSEC_ENABLED else 0.0,
+        3: app_settings.PVETAXES_TAX_NULLSEC if app_settings.PVETAXES_TAX_NULLSEC_ENABLED else 0.0,
+        4: app_settings.PVETAXES_TAX_JSPACE if app_settings.PVETAXES_TAX_JSPACE_ENABLED else 0.0,
+        5: app_settings.PVETAXES_TAX_POCHVEN if app_settings.PVETAXES_TAX_POCHVEN_ENABLED else 0.0,
+    }
+    TaxRate.objects.bulk_create(
+        TaxRate(
+            settings=settings,
+            activity_type=activity_type,
+            security_category=category,
+            rate=rate,
+        )
+        for activity_type in (1, 2, 3, 4)
+        for category, rate in category_rates.items()
+    )
+
+    overrides = {solar_system_id: None for solar_system_id in app_settings.PVETAXES_WHITELIST}
+    overrides.update(
+        {solar_system_id: 0.0 for solar_system_id in app_settings.PVETAXES_BLACKLIST}
+    )
+    TaxSystemOverride.objects.bulk_create(
+        TaxSystemOverride(settings=settings, solar_system_id=solar_system_id, rate=rate)
+        for solar_system_id, rate in overrides.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0008_repricing_run'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='settings',
+            name='tax_listed_systems_only',
+            field=models.BooleanField(default=False, help_text='Only tax activities in solar systems listed in the system overrides'),
+        ),
+        migrations.AddField(
+            model_name='settings',
+            name='tax_rules_version',
+            field=models.PositiveIntegerField(default=1, help_text='Version of the tax rules, counted up on every change'),
+        ),
+        migrations.CreateModel(
+            name='TaxSystemOverride',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('solar_system_id', models.PositiveIntegerField(help_text='EVE solar system ID')),
+                ('rate', models.FloatField(blank=True, help_text='Tax rate for all activities in this system as decimal, 0 for exempt. Leave empty to use the normal rates, e.g. to list a system when only listed systems are taxed', null=True)),
+                ('settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_system_overrides', to='pvetaxes.settings')),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.CreateModel(
+            name='TaxRate',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('activity_type', models.PositiveSmallIntegerField(choices=[(1, 'bounty'), (2, 'ess'), (3, 'mission'), (4, 'incursion')])),
+                ('security_category', models.PositiveSmallIntegerField(choices=[(0, 'unknown'), (1, 'hisec'), (2, 'losec'), (3, 'nullsec'), (4, 'jspace'), (5, 'pochven')], help_text='Unknown also applies to entries without a solar system')),
+                ('rate', models.FloatField(default=0.0, help_text='Tax rate as decimal, e.g. 0.1 for 10%. 0 disables the tax')),
+                ('settings', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tax_rates', to='pvetaxes.settings')),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='taxsystemoverride',
+            constraint=models.UniqueConstraint(fields=('settings', 'solar_system_id'), name='pvetaxes_taxsystemoverride_unique_system'),
+        ),
+        migrations.AddConstraint(
+            model_name='taxrate',
+            constraint=models.UniqueConstraint(fields=('settings', 'activity_type', 'security_category'), name='pvetaxes_taxrate_unique_activity_category'),
+        ),
+        migrations.RunPython(seed_tax_rules, migrations.RunPython.noop),
+    ]
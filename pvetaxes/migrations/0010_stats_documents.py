@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:01
+
+from django.db import migrations, models
+
+
+def move_stats_documents(apps, schema_editor):
+    """Copy the payloads of the stats row into documents."""
+    Stats = apps.get_model("pvetaxes", "Stats")
+    StatsDocument = apps.get_model("pvetaxes", "StatsDocument")
+    stats = Stats.objects.filter(pk=1).first()
+    if stats is None:
+        return
+
+    StatsDocument.objects.bulk_create(
+        [
+            StatsDocument(name="leadergraph", data=stats.curmonth_leadergraph),
+            StatsDocument(
+                name="user_activity_ledger", data=stats.user_activity_ledger_90day
+            ),
+            StatsDocument(
+                name="all_activity_ledger", data=stats.admin_get_all_activity_json
+            ),
+        ]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0009_tax_rules'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsDocument',
+            fields=[
+                ('name', models.CharField(choices=[('leadergraph', 'Leaderboard of the current month'), ('user_activity_ledger', 'Daily activity by user'), ('all_activity_ledger', 'Daily activity of all users')], max_length=32, primary_key=True, serialize=False)),
+                ('data', models.JSONField(default=dict)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'default_permissions': (),
+            },
+        ),
+        migrations.RunPython(move_stats_documents, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='stats',
+            name='admin_get_all_activity_json',
+        ),
+        migrations.RemoveField(
+            model_name='stats',
+            name='curmonth_leadergraph',
+        ),
+        migrations.RemoveField(
+            model_name='stats',
+            name='user_activity_ledger_90day',
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0010_stats_documents'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stats',
+            name='last_changes',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='stats',
+            name='last_journal_pk',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0011_stats_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UpdateRun',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('characters', 'Characters'), ('admins', 'Admin characters')], max_length=16)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('last_pk', models.BigIntegerField(default=0)),
+                ('success_count', models.PositiveIntegerField(default=0)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('failures', models.JSONField(blank=True, default=dict)),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'default_permissions': (),
+                'indexes': [models.Index(fields=['kind', 'finished_at'], name='pvetaxes_up_kind_64d504_idx')],
+            },
+        ),
+    ]
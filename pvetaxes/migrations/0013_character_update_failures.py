@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-19 07:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pvetaxes', '0012_update_runs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='character',
+            name='update_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='update_failure_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='character',
+            name='update_paused_until',
+            field=models.DateTimeField(blank=True, db_index=True, null=True),
+        ),
+    ]
@@ -1,16 +1,41 @@
-from .character import Character, CharacterWalletJournalEntry, CharacterTaxCredits
+from .character import (
+    ActivityType,
+    Character,
+    CharacterTaxCredits,
+    CharacterWalletJournalEntry,
+    JournalIngest,
+    RefType,
+    SecurityCategory,
+)
 from .admin import AdminCharacter, AdminCorpWalletEntry
 from .general import General
+from .leaderboard import LiveLeaderboard, MonthlyLeaderboard
+from .repricing import RepricingRun
+from .rollups import CharacterMonthlyRollup
 from .settings import Settings
-from .stats import Stats
+from .stats import Stats, StatsDocument
+from .tax_rules import TaxRate, TaxRules, TaxSystemOverride
+from .update_run import UpdateRun
 
 __all__ = [
+    "ActivityType",
     "Character",
     "CharacterWalletJournalEntry",
     "CharacterTaxCredits",
+    "CharacterMonthlyRollup",
     "AdminCharacter",
     "AdminCorpWalletEntry",
     "General",
+    "LiveLeaderboard",
+    "MonthlyLeaderboard",
+    "RefType",
+    "RepricingRun",
+    "SecurityCategory",
     "Settings",
     "Stats",
+    "StatsDocument",
+    "TaxRate",
+    "TaxRules",
+    "TaxSystemOverride",
+    "UpdateRun",
 ]
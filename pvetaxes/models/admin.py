@@ -11,9 +11,9 @@ from allianceauth.eveonline.models import EveCharacter, EveCorporationInfo
 from allianceauth.services.hooks import get_extension_logger
 from app_utils.logging import LoggerAddTag
 
-from .. import __title__
+from .. import __title__, metrics
 from ..decorators import fetch_token_for_character
-from ..providers import esi
+from ..providers import esi, iter_esi_pages
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
@@ -62,10 +62,14 @@ class AdminCharacter(models.Model):
             logger.error(f"Error fetching token for {self}: {e}")
             raise TokenError(f"Could not fetch token for {self}") from e
 
+    @metrics.corp_wallet_update_seconds.time(queries=metrics.corp_wallet_update_queries)
     @fetch_token_for_character("esi-wallet.read_corporation_wallets.v1")
     def update_corp_wallet(self, token: Token):
         """Update corporation wallet journal for tracking tax payments."""
-        from ..app_settings import PVETAXES_CORP_WALLET_DIVISION
+        from ..app_settings import (
+            PVETAXES_CORP_WALLET_DIVISION,
+            PVETAXES_ESI_PAGE_WORKERS,
+        )
         from .settings import Settings
         
         logger.info("%s: Fetching corp wallet journal from ESI", self)
@@ -73,11 +77,14 @@ class AdminCharacter(models.Model):
         settings = Settings.load()
         search_phrase = settings.phrase.lower() if settings.phrase else ""
         
-        entries = esi.client.Wallet.get_corporations_corporation_id_wallets_division_journal(
+        pages = iter_esi_pages(
+            esi.client.Wallet.get_corporations_corporation_id_wallets_division_journal,
+            max_workers=PVETAXES_ESI_PAGE_WORKERS,
             corporation_id=self.corporation.corporation_id,
             division=PVETAXES_CORP_WALLET_DIVISION,
             token=token.valid_access_token(),
-        ).results()
+        )
+        entries = [entry for page in pages for entry in page]
         
         for entry in entries:
             # Look for payment entries matching our search phrase
@@ -103,6 +110,7 @@ class AdminCharacter(models.Model):
                     second_party_id=second_party_id,
                     description=entry.get("description", ""),
                 )
+                metrics.journal_rows_inserted.inc(wallet="corporation")
         
         self.last_update = now()
         self.save()
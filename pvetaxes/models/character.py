@@ -1,9 +1,10 @@
 import datetime as dt
+from collections import defaultdict
 from typing import Optional
 
 from django.contrib.auth.models import User
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import models
+from django.db import models, transaction
 from django.utils.functional import cached_property
 from django.utils.timezone import now
 from esi.errors import TokenError
@@ -17,18 +18,34 @@ from app_utils.allianceauth import notify_throttled
 from app_utils.caching import ObjectCacheMixin
 from app_utils.logging import LoggerAddTag
 
-from .. import __title__
+from .. import __title__, metrics
 from ..app_settings import (
+    PVETAXES_DELETE_RETRY_MINUTES,
+    PVETAXES_ESI_PAGE_WORKERS,
+    PVETAXES_STORE_JOURNAL_DESCRIPTIONS,
+    PVETAXES_UPDATE_BACKOFF_MAX_MINUTES,
+    PVETAXES_UPDATE_BACKOFF_MINUTES,
     PVETAXES_UPDATE_LEDGER_STALE,
     PVETAXES_UPDATE_STALE_OFFSET,
 )
 from ..decorators import fetch_token_for_character
-from ..providers import esi
+from ..helpers import day_key, month_key
+from ..providers import count_esi_calls, esi, iter_esi_pages
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
 
 class CharacterQuerySet(models.QuerySet):
+    def active(self) -> models.QuerySet:
+        """Filter characters which are not being deleted."""
+        return self.filter(deleted_at__isnull=True)
+
+    def deletion_stale(self) -> models.QuerySet:
+        """Filter removed characters whose deletion should have finished by now."""
+        return self.filter(
+            deleted_at__lt=now() - dt.timedelta(minutes=PVETAXES_DELETE_RETRY_MINUTES)
+        )
+
     def eve_character_ids(self) -> set:
         return set(self.values_list("eve_character__character_id", flat=True))
 
@@ -36,6 +53,17 @@ class CharacterQuerySet(models.QuerySet):
         """Filter characters owned by user."""
         return self.filter(eve_character__character_ownership__user__pk=user.pk)
 
+    def updatable(self) -> models.QuerySet:
+        """Filter characters whose updates are not paused after failures."""
+        return self.filter(
+            models.Q(update_paused_until__isnull=True)
+            | models.Q(update_paused_until__lte=now())
+        )
+
+    def update_paused(self) -> models.QuerySet:
+        """Filter characters whose updates are paused after failures."""
+        return self.filter(update_paused_until__gt=now())
+
 
 class CharacterManagerBase(ObjectCacheMixin, models.Manager):
     def unregistered_characters_of_user_count(self, user: User) -> int:
@@ -176,115 +204,350 @@ class Character(CharacterAbstract):
     
     last_wallet_update = models.DateTimeField(null=True, blank=True)
     """Last time the wallet journal was updated"""
+    
+    update_failure_count = models.PositiveSmallIntegerField(default=0)
+    """Number of consecutive updates which failed because of the token or ESI"""
+    
+    update_paused_until = models.DateTimeField(null=True, blank=True, db_index=True)
+    """Updates of all characters skip this character until then"""
+    
+    update_error = models.CharField(max_length=255, blank=True, default="")
+    """Error of the last failed update"""
+    
+    deleted_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    """When this character was removed. Its data is deleted in the background."""
+
+    @property
+    def is_update_paused(self) -> bool:
+        return bool(self.update_paused_until and self.update_paused_until > now())
+
+    @property
+    def is_deletion_stale(self) -> bool:
+        """Whether this character was removed and its deletion should have
+        finished by now."""
+        return bool(
+            self.deleted_at
+            and now() - self.deleted_at
+            > dt.timedelta(minutes=PVETAXES_DELETE_RETRY_MINUTES)
+        )
+
+    def record_update_failure(self, error: Exception):
+        """Count a failed update and pause updates with exponential backoff."""
+        self.update_failure_count += 1
+        minutes = min(
+            PVETAXES_UPDATE_BACKOFF_MINUTES * 2 ** (self.update_failure_count - 1),
+            PVETAXES_UPDATE_BACKOFF_MAX_MINUTES,
+        )
+        self.update_paused_until = now() + dt.timedelta(minutes=minutes)
+        self.update_error = str(error)[:255]
+        metrics.character_update_failures.inc(
+            reason="token" if isinstance(error, TokenError) else "esi"
+        )
+        self.save(
+            update_fields=["update_failure_count", "update_paused_until", "update_error"]
+        )
+        logger.warning(
+            "%s: Update failed %d times, pausing updates until %s",
+            self,
+            self.update_failure_count,
+            self.update_paused_until,
+        )
 
+    def record_update_success(self):
+        """Reset the failure count after a successful update."""
+        if not self.update_failure_count:
+            return
+        self.update_failure_count = 0
+        self.update_paused_until = None
+        self.update_error = ""
+        self.save(
+            update_fields=["update_failure_count", "update_paused_until", "update_error"]
+        )
+
+    @metrics.character_update_seconds.time(queries=metrics.character_update_queries)
     @fetch_token_for_character("esi-wallet.read_character_wallet.v1")
-    def update_wallet_journal(self, token: Token):
-        """Update wallet journal from ESI for this character."""
+    def update_wallet_journal(self, token: Token) -> int:
+        """Update wallet journal from ESI for this character.
+
+        Returns:
+            Number of new journal entries
+        """
         logger.info("%s: Fetching wallet journal from ESI", self)
-        
-        # Fetch wallet journal entries
-        # ESI reference types for PVE activities:
-        # bounty_prizes = Bounties from ratting
-        # ess_escrow_transfer = ESS payouts
-        # agent_mission_reward = Mission rewards
-        # agent_mission_time_bonus_reward = Mission time bonus
-        # corporate_reward_payout = Incursion payouts
-        
-        entries = esi.client.Wallet.get_characters_character_id_wallet_journal(
+        pages = iter_esi_pages(
+            esi.client.Wallet.get_characters_character_id_wallet_journal,
+            max_workers=PVETAXES_ESI_PAGE_WORKERS,
             character_id=self.eve_character.character_id,
             token=token.valid_access_token(),
-        ).results()
-        
-        relevant_ref_types = [
-            "bounty_prizes",
-            "ess_escrow_transfer",
-            "agent_mission_reward",
-            "agent_mission_time_bonus_reward",
-            "corporate_reward_payout",
-        ]
-        
-        for entry in entries:
-            if entry["ref_type"] not in relevant_ref_types:
-                continue
-            
-            # Determine activity type
-            if entry["ref_type"] == "bounty_prizes":
-                activity_type = "bounty"
-            elif entry["ref_type"] == "ess_escrow_transfer":
-                activity_type = "ess"
-            elif entry["ref_type"] in ["agent_mission_reward", "agent_mission_time_bonus_reward"]:
-                activity_type = "mission"
-            elif entry["ref_type"] == "corporate_reward_payout":
-                activity_type = "incursion"
-            else:
-                continue
-            
-            # Check if entry already exists
-            try:
-                journal_entry = self.wallet_journal.get(journal_id=entry["id"])
-                # Entry exists, skip
+        )
+        ingest = JournalIngest(self)
+        for page in pages:
+            ingest.add_page(page)
+        return ingest.finish()
+
+    def update_live_leaderboards(self, new_entries: list):
+        """Add the amounts of newly stored journal entries to the live leaderboards."""
+        from ..app_settings import PVETAXES_LEADERBOARD_TAXABLE_ONLY
+        from .leaderboard import LiveLeaderboard
+
+        if not new_entries or not self.user:
+            return
+        amounts = defaultdict(float)
+        for entry in new_entries:
+            if PVETAXES_LEADERBOARD_TAXABLE_ONLY and entry.tax_amount <= 0:
                 continue
-            except CharacterWalletJournalEntry.DoesNotExist:
-                # Create new entry
-                solar_system = None
-                if "solar_system_id" in entry:
-                    solar_system, _ = EveSolarSystem.objects.get_or_create_esi(
-                        id=entry["solar_system_id"]
-                    )
-                
-                journal_entry = self.wallet_journal.create(
-                    journal_id=entry["id"],
-                    date=entry["date"],
-                    amount=entry.get("amount", 0),
-                    ref_type=entry["ref_type"],
-                    activity_type=activity_type,
-                    eve_solar_system=solar_system,
-                    description=entry.get("description", ""),
-                )
-                journal_entry.calculate_tax()
-        
-        self.last_wallet_update = now()
-        self.save()
-        logger.info("%s: Wallet journal update complete", self)
+            amounts[(entry.period_month, entry.activity_label)] += entry.amount
+        name = (
+            self.main_character.character_name
+            if self.main_character
+            else self.user.username
+        )
+        LiveLeaderboard.add(self.user.pk, name, amounts)
 
     def calculate_monthly_totals(self):
-        """Calculate monthly activity and tax totals."""
-        from django.db.models import Sum
-        from django.db.models.functions import TruncMonth
+        """Calculate monthly activity and tax totals.
+
+        Rollups of archived months are kept as they are,
+        since their journal entries no longer exist.
+        """
+        from django.db.models import Count, Max, Q, Sum
+
+        from ..helpers import month_key_to_label
+        from .rollups import CharacterMonthlyRollup
+        
+        journal = self.wallet_journal.all()
+        last_archived_month = self.monthly_rollups.filter(archived=True).aggregate(
+            Max("month")
+        )["month__max"]
+        if last_archived_month:
+            journal = journal.filter(period_month__gt=last_archived_month)
         
         # Group by month and activity type
         monthly_data = (
-            self.wallet_journal
-            .annotate(month=TruncMonth("date"))
-            .values("month", "activity_type")
+            journal
+            .values("period_month", "activity_type")
             .annotate(
-                total_amount=Sum("amount"),
-                total_tax=Sum("tax_amount")
+                total_amount=Sum("amount_cents"),
+                total_tax=Sum("tax_cents"),
+                taxable_amount=Sum("amount_cents", filter=Q(tax_cents__gt=0)),
+                entry_count=Count("*"),
             )
-            .order_by("month", "activity_type")
+            .order_by("period_month", "activity_type")
         )
+        rollups = [
+            CharacterMonthlyRollup(
+                character=self,
+                month=entry["period_month"],
+                activity_type=ActivityType(entry["activity_type"]).label,
+                amount=cents_to_isk(entry["total_amount"]),
+                tax_amount=cents_to_isk(entry["total_tax"]),
+                taxable_amount=cents_to_isk(entry["taxable_amount"] or 0),
+                entry_count=entry["entry_count"],
+            )
+            for entry in monthly_data
+        ]
         
-        # Build JSON structures
-        activity_json = {}
-        taxes_json = {}
-        
-        for entry in monthly_data:
-            month_key = entry["month"].strftime("%Y-%m")
-            if month_key not in activity_json:
-                activity_json[month_key] = {}
-                taxes_json[month_key] = {}
+        with transaction.atomic():
+            self.monthly_rollups.filter(archived=False).delete()
+            CharacterMonthlyRollup.objects.bulk_create(rollups)
             
-            activity_type = entry["activity_type"]
-            activity_json[month_key][activity_type] = float(entry["total_amount"])
-            taxes_json[month_key][activity_type] = float(entry["total_tax"])
-        
-        self.monthly_activity_json = activity_json
-        self.monthly_taxes_json = taxes_json
-        self.save()
+            # Build JSON structures from archived and live months
+            activity_json = {}
+            taxes_json = {}
+            life_taxes = 0.0
+            for rollup in self.monthly_rollups.order_by("month", "activity_type"):
+                month_label = month_key_to_label(rollup.month)
+                if month_label not in activity_json:
+                    activity_json[month_label] = {}
+                    taxes_json[month_label] = {}
+                activity_json[month_label][rollup.activity_type] = rollup.amount
+                taxes_json[month_label][rollup.activity_type] = rollup.tax_amount
+                life_taxes += rollup.tax_amount
+            
+            self.monthly_activity_json = activity_json
+            self.monthly_taxes_json = taxes_json
+            self.life_taxes = life_taxes
+            # only the totals, so a concurrent removal is not undone
+            self.save(
+                update_fields=["monthly_activity_json", "monthly_taxes_json", "life_taxes"]
+            )
+
+    def archive_journal(self, before_month: int, chunk_size: int) -> int:
+        """Fold journal entries older than a month into archived rollups
+        and delete them.
+
+        Args:
+            before_month: Month key of the first month to keep
+            chunk_size: Max number of entries deleted per query
+
+        Returns:
+            Number of deleted journal entries
+        """
+        self.calculate_monthly_totals()
+        self.monthly_rollups.filter(month__lt=before_month, archived=False).update(
+            archived=True
+        )
+        old_entries = self.wallet_journal.filter(period_month__lt=before_month)
+        deleted = 0
+        while True:
+            pks = list(old_entries.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                break
+            deleted += CharacterWalletJournalEntry.objects.filter(pk__in=pks).delete()[0]
+
+        if deleted:
+            logger.info("%s: Archived %d journal entries", self, deleted)
+        return deleted
+
+    def delete_data(self, chunk_size: int):
+        """Delete this character and all its data in chunks,
+        so no single transaction holds locks for long."""
+        from .rollups import CharacterMonthlyRollup
+
+        for model, related_qs in (
+            (CharacterWalletJournalEntry, self.wallet_journal),
+            (CharacterTaxCredits, self.tax_credits),
+            (CharacterMonthlyRollup, self.monthly_rollups),
+        ):
+            while True:
+                pks = list(related_qs.values_list("pk", flat=True)[:chunk_size])
+                if not pks:
+                    break
+                model.objects.filter(pk__in=pks).delete()
+
+        self.delete()
+
+
+class ActivityType(models.IntegerChoices):
+    """PVE activity types. Labels are used as keys in rollups and stats."""
+
+    BOUNTY = 1, "bounty"
+    ESS = 2, "ess"
+    MISSION = 3, "mission"
+    INCURSION = 4, "incursion"
+
+
+class RefType(models.IntegerChoices):
+    """ESI wallet journal reference types of PVE activities."""
+
+    BOUNTY_PRIZES = 1, "bounty_prizes"
+    ESS_ESCROW_TRANSFER = 2, "ess_escrow_transfer"
+    AGENT_MISSION_REWARD = 3, "agent_mission_reward"
+    AGENT_MISSION_TIME_BONUS_REWARD = 4, "agent_mission_time_bonus_reward"
+    CORPORATE_REWARD_PAYOUT = 5, "corporate_reward_payout"
+
+    @classmethod
+    def from_esi(cls, ref_type: str) -> Optional["RefType"]:
+        """Return the code of an ESI reference type or None if it is not PVE."""
+        return _REF_TYPES_BY_NAME.get(ref_type)
+
+
+_REF_TYPES_BY_NAME = {ref_type.label: ref_type for ref_type in RefType}
+
+REF_TYPE_ACTIVITIES = {
+    RefType.BOUNTY_PRIZES: ActivityType.BOUNTY,
+    RefType.ESS_ESCROW_TRANSFER: ActivityType.ESS,
+    RefType.AGENT_MISSION_REWARD: ActivityType.MISSION,
+    RefType.AGENT_MISSION_TIME_BONUS_REWARD: ActivityType.MISSION,
+    RefType.CORPORATE_REWARD_PAYOUT: ActivityType.INCURSION,
+}
+"""Activity type of each reference type"""
+
+
+class SecurityCategory(models.IntegerChoices):
+    """Space categories of solar systems."""
+
+    UNKNOWN = 0, "unknown"
+    HISEC = 1, "hisec"
+    LOSEC = 2, "losec"
+    NULLSEC = 3, "nullsec"
+    JSPACE = 4, "jspace"
+    POCHVEN = 5, "pochven"
+
+    @classmethod
+    def for_solar_system(cls, solar_system: EveSolarSystem) -> tuple:
+        """Return the category and region ID of a solar system."""
+        from ..helpers import get_solar_system_space
+
+        category, region_id = get_solar_system_space(solar_system)
+        return cls[category.upper()], region_id
+
+
+def isk_to_cents(amount: float) -> int:
+    """Convert an ISK amount into hundredths of ISK."""
+    return int(round(amount * 100))
+
+
+def cents_to_isk(cents: int) -> float:
+    """Convert hundredths of ISK into an ISK amount."""
+    return cents / 100
+
+
+def rate_to_bps(rate: float) -> int:
+    """Convert a tax rate as decimal into basis points."""
+    return int(round(rate * 10_000))
+
+
+def calculate_tax_cents(amount_cents: int, tax_rate_bps: int) -> int:
+    """Return the tax in hundredths of ISK, rounded half up."""
+    return (amount_cents * tax_rate_bps + 5_000) // 10_000
+
+
+class CharacterWalletJournalEntryQuerySet(models.QuerySet):
+    def stamp_space(self) -> int:
+        """Set space category and region of the solar system on these entries
+        with one update per solar system.
+
+        Returns:
+            Number of updated entries
+        """
+        entries = self.filter(eve_solar_system__isnull=False)
+        system_ids = list(
+            entries.values_list("eve_solar_system_id", flat=True)
+            .distinct()
+            .order_by()
+        )
+        systems = EveSolarSystem.objects.select_related("eve_constellation").in_bulk(
+            system_ids
+        )
+        updated = 0
+        for solar_system in systems.values():
+            security_category, region_id = SecurityCategory.for_solar_system(
+                solar_system
+            )
+            updated += entries.filter(eve_solar_system=solar_system).update(
+                security_category=security_category, eve_region_id=region_id
+            )
+        return updated
+
+    def revenue_by_space(self) -> list:
+        """Return earnings and taxes by space category in one grouped query."""
+        rows = (
+            self.values("security_category")
+            .annotate(
+                total_amount=models.Sum("amount_cents"),
+                total_tax=models.Sum("tax_cents"),
+                entry_count=models.Count("id"),
+            )
+            .order_by("security_category")
+        )
+        return [
+            {
+                "security_category": SecurityCategory(row["security_category"]).label,
+                "amount": cents_to_isk(row["total_amount"]),
+                "tax": cents_to_isk(row["total_tax"]),
+                "entry_count": row["entry_count"],
+            }
+            for row in rows
+        ]
 
 
 class CharacterWalletJournalEntry(models.Model):
-    """Individual wallet journal entry for PVE activity."""
+    """Individual wallet journal entry for PVE activity.
+
+    Rows are kept compact: reference and activity types are stored as small
+    integer codes, ISK amounts as integer hundredths of ISK
+    and the tax rate in basis points.
+    """
     
     character = models.ForeignKey(
         Character, related_name="wallet_journal", on_delete=models.CASCADE
@@ -295,28 +558,43 @@ class CharacterWalletJournalEntry(models.Model):
     date = models.DateTimeField(db_index=True)
     """Date of the activity"""
     
-    amount = models.FloatField()
-    """ISK amount earned"""
+    period_month = models.PositiveIntegerField()
+    """Month of the activity as yyyymm (UTC), used for grouping by month"""
+    
+    period_day = models.PositiveIntegerField()
+    """Day of the activity as yyyymmdd (UTC), used for grouping by day"""
     
-    ref_type = models.CharField(max_length=100)
+    amount_cents = models.BigIntegerField()
+    """ISK amount earned in hundredths of ISK"""
+    
+    ref_type = models.PositiveSmallIntegerField(choices=RefType.choices)
     """ESI reference type"""
     
-    activity_type = models.CharField(max_length=50, db_index=True)
-    """Activity type: bounty, ess, mission, incursion"""
+    activity_type = models.PositiveSmallIntegerField(choices=ActivityType.choices)
+    """Activity type"""
     
     eve_solar_system = models.ForeignKey(
         EveSolarSystem, on_delete=models.SET_NULL, null=True, blank=True
     )
     """Solar system where activity occurred"""
     
-    description = models.TextField(blank=True)
-    """Description from journal entry"""
+    security_category = models.PositiveSmallIntegerField(
+        choices=SecurityCategory.choices, default=SecurityCategory.UNKNOWN
+    )
+    """Space category of the solar system, stamped at ingest"""
+    
+    eve_region_id = models.PositiveIntegerField(null=True, blank=True)
+    """Region of the solar system, stamped at ingest"""
+    
+    description = models.TextField(null=True, blank=True)
+    """Description from journal entry,
+    only stored when PVETAXES_STORE_JOURNAL_DESCRIPTIONS is enabled"""
     
-    tax_amount = models.FloatField(default=0.0)
-    """Tax amount calculated for this entry"""
+    tax_cents = models.BigIntegerField(default=0)
+    """Tax amount calculated for this entry in hundredths of ISK"""
     
-    tax_rate = models.FloatField(default=0.0)
-    """Tax rate applied (as decimal)"""
+    tax_rate_bps = models.PositiveIntegerField(default=0)
+    """Tax rate applied in basis points"""
     
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -325,27 +603,178 @@ class CharacterWalletJournalEntry(models.Model):
         indexes = [
             models.Index(fields=["character", "date"]),
             models.Index(fields=["activity_type", "date"]),
+            models.Index(fields=["eve_region_id", "date"]),
+            # covers the monthly rollups
+            models.Index(
+                fields=[
+                    "character",
+                    "period_month",
+                    "activity_type",
+                    "amount_cents",
+                    "tax_cents",
+                ]
+            ),
+            models.Index(fields=["period_day", "activity_type"]),
+            models.Index(fields=["period_month", "security_category"]),
         ]
 
+    objects = CharacterWalletJournalEntryQuerySet.as_manager()
+
     def __str__(self):
-        return f"{self.character.name} - {self.activity_type} - {self.amount:,.0f} ISK"
+        return f"{self.character.name} - {self.activity_label} - {self.amount:,.0f} ISK"
+
+    @property
+    def amount(self) -> float:
+        """ISK amount earned"""
+        return cents_to_isk(self.amount_cents)
+
+    @property
+    def tax_amount(self) -> float:
+        """Tax amount in ISK"""
+        return cents_to_isk(self.tax_cents)
+
+    @property
+    def tax_rate(self) -> float:
+        """Tax rate applied (as decimal)"""
+        return self.tax_rate_bps / 10_000
+
+    @property
+    def activity_label(self) -> str:
+        """Activity type as used in rollups and stats: bounty, ess, mission, incursion"""
+        return ActivityType(self.activity_type).label
+
+    def apply_tax(self, rules):
+        """Set tax rate and tax amount of this entry without saving it."""
+        self.tax_rate_bps = rules.rate_bps(
+            self.activity_type, self.security_category, self.eve_solar_system_id
+        )
+        self.tax_cents = calculate_tax_cents(self.amount_cents, self.tax_rate_bps)
 
-    def calculate_tax(self):
-        """Calculate and save the tax amount for this entry."""
-        from ..helpers import get_tax_rate_for_system
-        
-        if self.eve_solar_system:
-            self.tax_rate = get_tax_rate_for_system(
-                self.eve_solar_system.id, self.activity_type
-            )
-        else:
-            from ..app_settings import PVETAXES_UNKNOWN_TAX_RATE
-            self.tax_rate = PVETAXES_UNKNOWN_TAX_RATE
+    def calculate_tax(self, rules=None):
+        """Calculate and save the tax amount for this entry.
+
+        Args:
+            rules: Tax rules to apply, defaults to the current rules
+        """
+        from .tax_rules import TaxRules
         
-        self.tax_amount = self.amount * self.tax_rate
+        if rules is None:
+            rules = TaxRules.current()
+        self.apply_tax(rules)
         self.save()
 
 
+class JournalIngest:
+    """Stores the wallet journal of a character from ESI page by page.
+
+    Each page is stored with one bulk insert as soon as it is added,
+    so pages can be added in any order while they arrive.
+    """
+
+    def __init__(self, character: Character):
+        from .tax_rules import TaxRules
+
+        self.character = character
+        self.rules = TaxRules.current()
+        self.new_count = 0
+        self.has_past_entries = False
+        self._spaces = {}
+        """Solar system, space category and region by solar system ID"""
+        self._today = now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+    def add_page(self, entries: list) -> int:
+        """Store the new PVE entries of a page of the journal from ESI.
+
+        Returns:
+            Number of new journal entries
+        """
+        new_entries = self._new_entries(entries)
+        CharacterWalletJournalEntry.objects.bulk_create(new_entries, batch_size=500)
+        self.character.update_live_leaderboards(new_entries)
+        metrics.journal_rows_inserted.inc(len(new_entries), wallet="character")
+        self.new_count += len(new_entries)
+        self.has_past_entries |= any(entry.date < self._today for entry in new_entries)
+        return len(new_entries)
+
+    def finish(self) -> int:
+        """Complete the update after all pages were added.
+
+        Returns:
+            Number of new journal entries
+        """
+        self.character.last_wallet_update = now()
+        self.character.save(update_fields=["last_wallet_update"])
+        if self.has_past_entries:
+            from ..charts import invalidate_character_charts
+
+            invalidate_character_charts(self.character.pk)
+        metrics.character_update_rows.observe(self.new_count)
+        logger.info(
+            "%s: Wallet journal update complete with %d new entries",
+            self.character,
+            self.new_count,
+        )
+        return self.new_count
+
+    def _new_entries(self, entries: list) -> list:
+        """Return unsaved journal entries with their taxes
+        for the PVE entries of a page which are not stored yet."""
+        pve_entries = []
+        for entry in entries:
+            ref_type = RefType.from_esi(entry["ref_type"])
+            if ref_type is not None:
+                pve_entries.append((entry, ref_type))
+        known_ids = set(
+            CharacterWalletJournalEntry.objects.filter(
+                journal_id__in=[entry["id"] for entry, _ in pve_entries]
+            ).values_list("journal_id", flat=True)
+        )
+        new_entries = []
+        for entry, ref_type in pve_entries:
+            if entry["id"] in known_ids:
+                continue
+            known_ids.add(entry["id"])
+            solar_system = None
+            security_category, region_id = SecurityCategory.UNKNOWN, None
+            solar_system_id = entry.get("solar_system_id")
+            if solar_system_id is not None:
+                if solar_system_id not in self._spaces:
+                    solar_system, created = EveSolarSystem.objects.get_or_create_esi(
+                        id=solar_system_id
+                    )
+                    if created:
+                        count_esi_calls()
+                    self._spaces[solar_system_id] = (
+                        solar_system,
+                        *SecurityCategory.for_solar_system(solar_system),
+                    )
+                solar_system, security_category, region_id = self._spaces[
+                    solar_system_id
+                ]
+
+            journal_entry = CharacterWalletJournalEntry(
+                character=self.character,
+                journal_id=entry["id"],
+                date=entry["date"],
+                period_month=month_key(entry["date"]),
+                period_day=day_key(entry["date"]),
+                amount_cents=isk_to_cents(entry.get("amount", 0)),
+                ref_type=ref_type,
+                activity_type=REF_TYPE_ACTIVITIES[ref_type],
+                eve_solar_system=solar_system,
+                security_category=security_category,
+                eve_region_id=region_id,
+                description=(
+                    (entry.get("description") or None)
+                    if PVETAXES_STORE_JOURNAL_DESCRIPTIONS
+                    else None
+                ),
+            )
+            journal_entry.apply_tax(self.rules)
+            new_entries.append(journal_entry)
+        return new_entries
+
+
 class CharacterTaxCredits(models.Model):
     """Tax credits/debits applied to a character."""
     
@@ -385,4 +814,4 @@ class CharacterTaxCredits(models.Model):
         
         if is_new:
             self.character.life_credits += self.amount
-            self.character.save()
+            self.character.save(update_fields=["life_credits"])
@@ -0,0 +1,253 @@
+import datetime as dt
+from collections import defaultdict
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import models
+from django.db.models import F, Sum
+from django.utils.timezone import now
+from redis.exceptions import RedisError
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+from ..app_settings import (
+    PVETAXES_LEADERBOARD_SETTLE_HOURS,
+    PVETAXES_LEADERBOARD_SIZE,
+    PVETAXES_LEADERBOARD_TAXABLE_ONLY,
+    PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT,
+)
+from ..helpers import month_key, month_key_end
+from .rollups import CharacterMonthlyRollup
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+ACTIVITY_TYPES = ["bounty", "ess", "mission", "incursion"]
+
+
+class MonthlyLeaderboard(models.Model):
+    """Frozen per-user leaderboards of a past month.
+
+    Leaderboards of months which are still open are only kept in the cache.
+    """
+
+    month = models.PositiveIntegerField(unique=True)
+    """Month key as yyyymm"""
+
+    data = models.JSONField(default=dict)
+    """Top users by activity type"""
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        default_permissions = ()
+
+    def __str__(self):
+        return f"Leaderboard {self.month}"
+
+    @staticmethod
+    def _cache_key(month: int) -> str:
+        return f"pvetaxes-leaderboard-{month}"
+
+    @staticmethod
+    def is_settled(month: int) -> bool:
+        """Return True if no more activity can arrive for this month."""
+        settle_time = month_key_end(month) + dt.timedelta(
+            hours=PVETAXES_LEADERBOARD_SETTLE_HOURS
+        )
+        return now() >= settle_time
+
+    @classmethod
+    def for_month(cls, month: int, refresh: bool = False) -> dict:
+        """Return the leaderboards for a month.
+
+        Settled months are calculated once and then served from the database.
+        Open months are cached and recalculated when the cache expires
+        or when ``refresh`` is set.
+        """
+        cache_key = cls._cache_key(month)
+        if not refresh:
+            data = cache.get(cache_key)
+            if data is not None:
+                return data
+
+        try:
+            data = cls.objects.get(month=month).data
+        except cls.DoesNotExist:
+            data = cls.calculate(month)
+            if cls.is_settled(month):
+                cls.objects.get_or_create(month=month, defaults={"data": data})
+                logger.info("Froze leaderboards for month %s", month)
+            else:
+                cache.set(cache_key, data, PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT)
+                return data
+
+        cache.set(cache_key, data, None)
+        return data
+
+    @staticmethod
+    def user_totals(month: int) -> models.QuerySet:
+        """Return the earnings of all users in a month by activity type,
+        ordered by activity type and descending total."""
+        amount_field = (
+            "taxable_amount" if PVETAXES_LEADERBOARD_TAXABLE_ONLY else "amount"
+        )
+        ownership = "character__eve_character__character_ownership"
+        return (
+            CharacterMonthlyRollup.objects.filter(
+                month=month,
+                character__deleted_at__isnull=True,
+                **{f"{ownership}__isnull": False},
+            )
+            .values(
+                "activity_type",
+                user_id=F(f"{ownership}__user_id"),
+                username=F(f"{ownership}__user__username"),
+                main_name=F(
+                    f"{ownership}__user__profile__main_character__character_name"
+                ),
+            )
+            .annotate(total=Sum(amount_field))
+            .filter(total__gt=0)
+            .order_by("activity_type", "-total")
+        )
+
+    @classmethod
+    def calculate(cls, month: int) -> dict:
+        """Calculate the leaderboards for a month from the monthly rollups.
+
+        Earnings of all characters of a user are combined.
+        """
+        leaderboard = {activity_type: [] for activity_type in ACTIVITY_TYPES}
+        for row in cls.user_totals(month):
+            leaders = leaderboard.setdefault(row["activity_type"], [])
+            if len(leaders) < PVETAXES_LEADERBOARD_SIZE:
+                leaders.append(
+                    {
+                        "user_id": row["user_id"],
+                        "name": row["main_name"] or row["username"],
+                        "amount": row["total"],
+                    }
+                )
+
+        return leaderboard
+
+
+class LiveLeaderboard:
+    """Leaderboards of the current month kept as sorted sets in Redis.
+
+    Ingestion increments the counters of a user with the amounts it just stored,
+    so readers get the top users without querying the database.
+    ``reconcile()`` rebuilds the counters from the monthly rollups
+    to correct any drift.
+    """
+
+    KEY_PREFIX = "pvetaxes-live-leaderboard"
+    NAMES_KEY = f"{KEY_PREFIX}-names"
+    KEY_TIMEOUT = 3600 * 24 * 62
+
+    @classmethod
+    def _key(cls, month: int, activity_type: str) -> str:
+        return f"{cls.KEY_PREFIX}-{month}-{activity_type}"
+
+    @staticmethod
+    def _redis():
+        from django_redis import get_redis_connection
+
+        return get_redis_connection("default")
+
+    @classmethod
+    def add(cls, user_id: int, name: str, amounts: dict):
+        """Increment the counters of a user.
+
+        Args:
+            user_id: PK of the user
+            name: Name shown on the leaderboard
+            amounts: {(month, activity_type): amount}
+        """
+        if not amounts:
+            return
+        try:
+            pipe = cls._redis().pipeline()
+            pipe.hset(cls.NAMES_KEY, user_id, name)
+            for (month, activity_type), amount in amounts.items():
+                key = cls._key(month, activity_type)
+                pipe.zincrby(key, amount, user_id)
+                pipe.expire(key, cls.KEY_TIMEOUT)
+            pipe.execute()
+        except (NotImplementedError, RedisError) as ex:
+            logger.warning("Failed to update live leaderboards: %s", ex)
+
+    @classmethod
+    def top(cls, month: int) -> Optional[dict]:
+        """Return the top users of a month by activity type
+        or None if the live leaderboards are empty or not available."""
+        try:
+            redis = cls._redis()
+            pipe = redis.pipeline()
+            for activity_type in ACTIVITY_TYPES:
+                pipe.zrevrange(
+                    cls._key(month, activity_type),
+                    0,
+                    PVETAXES_LEADERBOARD_SIZE - 1,
+                    withscores=True,
+                )
+            results = pipe.execute()
+            user_ids = list({user_id for ranking in results for user_id, _ in ranking})
+            if not user_ids:
+                return None
+            names = dict(zip(user_ids, redis.hmget(cls.NAMES_KEY, user_ids)))
+        except (NotImplementedError, RedisError) as ex:
+            logger.warning("Failed to read live leaderboards: %s", ex)
+            return None
+
+        return {
+            activity_type: [
+                {
+                    "user_id": int(user_id),
+                    "name": (names.get(user_id) or b"").decode(),
+                    "amount": amount,
+                }
+                for user_id, amount in ranking
+                if amount > 0
+            ]
+            for activity_type, ranking in zip(ACTIVITY_TYPES, results)
+        }
+
+    @classmethod
+    def current(cls) -> dict:
+        """Return the leaderboards of the current month,
+        falling back to the rollups if the live leaderboards are not available."""
+        month = month_key(now())
+        return cls.top(month) or MonthlyLeaderboard.for_month(month)
+
+    @classmethod
+    def reconcile(cls, month: int):
+        """Rebuild the counters of a month from the monthly rollups."""
+        totals = defaultdict(dict)
+        names = {}
+        for row in MonthlyLeaderboard.user_totals(month):
+            totals[row["activity_type"]][row["user_id"]] = row["total"]
+            names[row["user_id"]] = row["main_name"] or row["username"]
+
+        try:
+            pipe = cls._redis().pipeline()
+            if names:
+                pipe.hset(cls.NAMES_KEY, mapping=names)
+            for activity_type in ACTIVITY_TYPES:
+                key = cls._key(month, activity_type)
+                if totals[activity_type]:
+                    tmp_key = f"{key}-reconcile"
+                    pipe.delete(tmp_key)
+                    pipe.zadd(tmp_key, totals[activity_type])
+                    pipe.rename(tmp_key, key)
+                    pipe.expire(key, cls.KEY_TIMEOUT)
+                else:
+                    pipe.delete(key)
+            pipe.execute()
+        except (NotImplementedError, RedisError) as ex:
+            logger.warning("Failed to reconcile live leaderboards: %s", ex)
+            return
+
+        logger.info("Reconciled live leaderboards for month %s", month)
@@ -0,0 +1,180 @@
+import datetime as dt
+
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Floor
+from django.utils.timezone import now
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+from ..helpers import day_key, day_key_to_date, month_key, shift_month_key
+from .character import Character, CharacterWalletJournalEntry
+from .tax_rules import TaxRules
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+def tax_cents_expression(tax_rate_bps: int):
+    """Return the SQL counterpart of ``calculate_tax_cents()``."""
+    return Floor((F("amount_cents") * tax_rate_bps + 5_000) / 10_000)
+
+
+class RepricingRun(models.Model):
+    """Recalculation of the taxes of journal entries in a date range
+    with the current tax rules.
+
+    Entries are repriced in chunks of primary keys with one UPDATE
+    per distinct rate of the rate matrix and per system override. Progress is saved together with each chunk,
+    so an interrupted run continues where it stopped.
+    Monthly rollups and lifetime taxes of the affected characters
+    are rebuilt afterwards. Archived months can not be repriced.
+    """
+
+    class Phase(models.TextChoices):
+        REPRICE = "reprice", "Repricing journal entries"
+        ROLLUPS = "rollups", "Rebuilding monthly totals"
+        DONE = "done", "Done"
+
+    start_day = models.PositiveIntegerField()
+    """First day of the range as yyyymmdd"""
+
+    end_day = models.PositiveIntegerField()
+    """Last day of the range as yyyymmdd"""
+
+    phase = models.CharField(max_length=16, choices=Phase.choices, default=Phase.REPRICE)
+
+    last_pk = models.BigIntegerField(default=0)
+    """PK of the last journal entry or character processed in the current phase"""
+
+    repriced_count = models.PositiveBigIntegerField(default=0)
+    """Number of repriced journal entries"""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        default_permissions = ()
+
+    def __str__(self):
+        return f"Repricing {self.start_date} - {self.end_date} ({self.phase})"
+
+    @classmethod
+    def start(cls, start_date: dt.date, end_date: dt.date) -> "RepricingRun":
+        """Create a new run for a date range."""
+        return cls.objects.create(
+            start_day=day_key(start_date), end_day=day_key(end_date)
+        )
+
+    @property
+    def start_date(self) -> dt.date:
+        return day_key_to_date(self.start_day)
+
+    @property
+    def end_date(self) -> dt.date:
+        return day_key_to_date(self.end_day)
+
+    @property
+    def is_finished(self) -> bool:
+        return self.phase == self.Phase.DONE
+
+    def _entries(self) -> models.QuerySet:
+        return CharacterWalletJournalEntry.objects.filter(
+            period_day__gte=self.start_day, period_day__lte=self.end_day
+        )
+
+    def run(self, chunk_size: int):
+        """Run or continue this repricing run until it is done."""
+        if self.phase == self.Phase.REPRICE:
+            self._reprice(chunk_size)
+        if self.phase == self.Phase.ROLLUPS:
+            self._rebuild_rollups()
+
+    def _reprice(self, chunk_size: int):
+        rules = TaxRules.current()
+        rate_groups = rules.rate_groups()
+        override_groups = {}
+        for solar_system_id, rate_bps in rules.overrides.items():
+            if rate_bps is not None:
+                override_groups.setdefault(rate_bps, []).append(solar_system_id)
+        entries = self._entries()
+        logger.info("%s: Repricing journal entries with %r", self, rules)
+        while True:
+            pks = list(
+                entries.filter(pk__gt=self.last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:chunk_size]
+            )
+            if not pks:
+                break
+
+            chunk = entries.filter(pk__gt=self.last_pk, pk__lte=pks[-1])
+            with transaction.atomic():
+                chunk.filter(
+                    eve_solar_system__isnull=False, eve_region_id__isnull=True
+                ).stamp_space()
+                for tax_rate_bps, matrix_filter in rate_groups.items():
+                    chunk.filter(matrix_filter).update(
+                        tax_rate_bps=tax_rate_bps,
+                        tax_cents=tax_cents_expression(tax_rate_bps),
+                    )
+                if rules.listed_systems_only:
+                    chunk.filter(eve_solar_system__isnull=False).exclude(
+                        eve_solar_system_id__in=list(rules.overrides)
+                    ).update(tax_rate_bps=0, tax_cents=0)
+                for tax_rate_bps, solar_system_ids in override_groups.items():
+                    chunk.filter(eve_solar_system_id__in=solar_system_ids).update(
+                        tax_rate_bps=tax_rate_bps,
+                        tax_cents=tax_cents_expression(tax_rate_bps),
+                    )
+                self.last_pk = pks[-1]
+                self.repriced_count += len(pks)
+                self.save()
+
+        self.phase = self.Phase.ROLLUPS
+        self.last_pk = 0
+        self.save()
+
+    def _rebuild_rollups(self):
+        from ..charts import invalidate_character_charts
+        from .leaderboard import LiveLeaderboard, MonthlyLeaderboard
+
+        logger.info("%s: Rebuilding monthly totals", self)
+        character_pks = (
+            self._entries()
+            .filter(character__pk__gt=self.last_pk)
+            .values_list("character", flat=True)
+            .distinct()
+            .order_by("character")
+        )
+        characters = Character.objects.active().filter(pk__in=list(character_pks))
+        for character in characters.order_by("pk"):
+            character.calculate_monthly_totals()
+            invalidate_character_charts(character.pk)
+            self.last_pk = character.pk
+            self.save()
+
+        # leaderboards may only count taxed earnings
+        start_month = month_key(self.start_date)
+        end_month = month_key(self.end_date)
+        MonthlyLeaderboard.objects.filter(
+            month__gte=start_month, month__lte=end_month
+        ).delete()
+        month = start_month
+        cache_keys = []
+        while month <= end_month:
+            cache_keys.append(MonthlyLeaderboard._cache_key(month))
+            month = shift_month_key(month, 1)
+        cache.delete_many(cache_keys)
+        current_month = month_key(now())
+        if start_month <= current_month <= end_month:
+            LiveLeaderboard.reconcile(current_month)
+
+        self.phase = self.Phase.DONE
+        self.finished_at = now()
+        self.save()
+        logger.info("%s: Repriced %d journal entries", self, self.repriced_count)
+
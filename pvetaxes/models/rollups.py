@@ -0,0 +1,58 @@
+from django.db import models
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+from .character import Character
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+class CharacterMonthlyRollup(models.Model):
+    """Monthly totals of a character's PVE activity by activity type.
+
+    Maintained by ``Character.calculate_monthly_totals()``.
+    Covers both archived and live journal entries,
+    so all balance and stats calculations are based on it.
+    """
+
+    character = models.ForeignKey(
+        Character, related_name="monthly_rollups", on_delete=models.CASCADE
+    )
+    month = models.PositiveIntegerField()
+    """Month key as yyyymm"""
+
+    activity_type = models.CharField(max_length=50)
+    """Activity type: bounty, ess, mission, incursion"""
+
+    amount = models.FloatField(default=0.0)
+    """ISK earned"""
+
+    tax_amount = models.FloatField(default=0.0)
+    """Taxes owed"""
+
+    taxable_amount = models.FloatField(default=0.0)
+    """ISK earned in activities that were taxed"""
+
+    entry_count = models.PositiveIntegerField(default=0)
+    """Number of journal entries in this rollup"""
+
+    archived = models.BooleanField(default=False)
+    """Whether the journal entries of this month have been archived.
+    Archived rollups are no longer recalculated."""
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["character", "month", "activity_type"],
+                name="pvetaxes_rollup_unique_character_month_activity",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["month", "activity_type"]),
+        ]
+
+    def __str__(self):
+        return f"{self.character.name} - {self.month} - {self.activity_type}"
@@ -1,3 +1,5 @@
+import copy
+
 from django.core.exceptions import ValidationError
 from django.db import models
 
@@ -5,6 +7,7 @@ from allianceauth.services.hooks import get_extension_logger
 from app_utils.logging import LoggerAddTag
 
 from .. import __title__
+from ..caching import VersionedProcessCache
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
@@ -46,6 +49,16 @@ class Settings(models.Model):
         help_text="Send a corp-wide summary of outstanding taxes to Discord"
     )
     
+    tax_listed_systems_only = models.BooleanField(
+        default=False,
+        help_text="Only tax activities in solar systems listed in the system overrides"
+    )
+    
+    tax_rules_version = models.PositiveIntegerField(
+        default=1,
+        help_text="Version of the tax rules, counted up on every change"
+    )
+    
     last_interest_applied = models.DateTimeField(
         null=True,
         blank=True,
@@ -62,8 +75,12 @@ class Settings(models.Model):
 
     def save(self, *args, **kwargs):
         """Ensure only one settings instance exists."""
+        from .tax_rules import tax_rules_cache
+
         self.pk = 1
         super().save(*args, **kwargs)
+        settings_cache.invalidate()
+        tax_rules_cache.invalidate()
 
     def delete(self, *args, **kwargs):
         """Prevent deletion of settings."""
@@ -71,6 +88,15 @@ class Settings(models.Model):
 
     @classmethod
     def load(cls):
+        """Return a copy of the singleton settings instance,
+        which is cached in process until it is saved."""
+        return copy.copy(settings_cache.get())
+
+    @classmethod
+    def _load_from_db(cls):
         """Load or create the singleton settings instance."""
         obj, created = cls.objects.get_or_create(pk=1)
         return obj
+
+
+settings_cache = VersionedProcessCache("settings", Settings._load_from_db)
@@ -1,19 +1,34 @@
+import copy
 import datetime as dt
 import json
 from collections import defaultdict
 
+import numpy as np
 from django.contrib.auth.models import User
-from django.db import models
-from django.db.models import Sum
+from django.core.cache import cache
+from django.db import models, transaction
+from django.db.models import Count, Max, Q, Sum
 from django.utils.timezone import now
 
 from allianceauth.services.hooks import get_extension_logger
 from app_utils.logging import LoggerAddTag
 
-from .. import __title__
+from .. import __title__, metrics
+from ..app_settings import PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT
+from ..caching import VersionedProcessCache
 
 logger = LoggerAddTag(get_extension_logger(__name__), __title__)
 
+LEDGER_DAYS = 90
+
+STATS_FIELD_NAMES = {
+    "bounty": "bounties",
+    "ess": "ess",
+    "mission": "missions",
+    "incursion": "incursions",
+}
+"""Maps activity types to the names of their stats fields"""
+
 
 class Stats(models.Model):
     """Statistics tracking for PVE activities."""
@@ -42,15 +57,11 @@ class Stats(models.Model):
     life_missions_tax = models.FloatField(default=0.0)
     life_incursions_tax = models.FloatField(default=0.0)
     
-    # Leader data (JSON)
-    curmonth_leadergraph = models.JSONField(default=dict, blank=True)
-    """Top earners for current month by activity type"""
-    
-    user_activity_ledger_90day = models.JSONField(default=dict, blank=True)
-    """90-day activity history by user"""
+    last_journal_pk = models.BigIntegerField(default=0)
+    """PK of the newest journal entry included in the last update"""
     
-    admin_get_all_activity_json = models.JSONField(default=dict, blank=True)
-    """Admin view of all activity"""
+    last_changes = models.JSONField(default=dict, blank=True)
+    """Journal changes since the previous update: new entries, characters and months"""
     
     last_update = models.DateTimeField(auto_now=True)
 
@@ -64,170 +75,273 @@ class Stats(models.Model):
 
     @classmethod
     def load(cls):
-        """Load or create the singleton stats instance."""
+        """Return a copy of the singleton stats instance,
+        which is cached in process until it is saved."""
+        return copy.copy(stats_cache.get())
+
+    @classmethod
+    def _load_from_db(cls):
+        """Load or create the singleton stats instance.
+
+        A new instance is calculated in the background.
+        """
+        from ..tasks import schedule_stats_update
+
         obj, created = cls.objects.get_or_create(pk=1)
         if created:
-            obj.update_stats()
+            logger.info("Created statistics, scheduling first update")
+            transaction.on_commit(schedule_stats_update)
         return obj
 
     def save(self, *args, **kwargs):
         """Ensure only one stats instance exists."""
         self.pk = 1
         super().save(*args, **kwargs)
+        stats_cache.invalidate()
 
+    @metrics.stats_update_seconds.time(queries=metrics.stats_update_queries)
     def update_stats(self):
         """Recalculate all statistics."""
-        from .character import Character, CharacterWalletJournalEntry
+        from ..helpers import month_key
+        from .rollups import CharacterMonthlyRollup
         
         logger.info("Updating PVE statistics")
         
-        # Get current month start
-        today = now()
-        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Current month stats
-        current_month_entries = CharacterWalletJournalEntry.objects.filter(
-            date__gte=month_start
-        )
-        
-        self.curmonth_bounties = current_month_entries.filter(
-            activity_type="bounty"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.curmonth_ess = current_month_entries.filter(
-            activity_type="ess"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.curmonth_missions = current_month_entries.filter(
-            activity_type="mission"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.curmonth_incursions = current_month_entries.filter(
-            activity_type="incursion"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        # Current month taxes
-        self.curmonth_bounties_tax = current_month_entries.filter(
-            activity_type="bounty"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        self.curmonth_ess_tax = current_month_entries.filter(
-            activity_type="ess"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        self.curmonth_missions_tax = current_month_entries.filter(
-            activity_type="mission"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        self.curmonth_incursions_tax = current_month_entries.filter(
-            activity_type="incursion"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        # Lifetime stats
-        all_entries = CharacterWalletJournalEntry.objects.all()
-        
-        self.life_bounties = all_entries.filter(
-            activity_type="bounty"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.life_ess = all_entries.filter(
-            activity_type="ess"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.life_missions = all_entries.filter(
-            activity_type="mission"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        self.life_incursions = all_entries.filter(
-            activity_type="incursion"
-        ).aggregate(Sum("amount"))["amount__sum"] or 0.0
-        
-        # Lifetime taxes
-        self.life_bounties_tax = all_entries.filter(
-            activity_type="bounty"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        self.life_ess_tax = all_entries.filter(
-            activity_type="ess"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-        
-        self.life_missions_tax = all_entries.filter(
-            activity_type="mission"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
+        # Current month and lifetime totals from the monthly rollups,
+        # which include archived journal entries
+        current_month = month_key(now())
+        totals = {
+            row["activity_type"]: row
+            for row in (
+                CharacterMonthlyRollup.objects
+                .filter(character__deleted_at__isnull=True)
+                .values("activity_type")
+                .annotate(
+                    life_amount=Sum("amount"),
+                    life_tax=Sum("tax_amount"),
+                    curmonth_amount=Sum("amount", filter=Q(month=current_month)),
+                    curmonth_tax=Sum("tax_amount", filter=Q(month=current_month)),
+                )
+                .order_by()
+            )
+        }
         
-        self.life_incursions_tax = all_entries.filter(
-            activity_type="incursion"
-        ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
+        for activity_type, field_name in STATS_FIELD_NAMES.items():
+            row = totals.get(activity_type, {})
+            setattr(self, f"curmonth_{field_name}", row.get("curmonth_amount") or 0.0)
+            setattr(self, f"curmonth_{field_name}_tax", row.get("curmonth_tax") or 0.0)
+            setattr(self, f"life_{field_name}", row.get("life_amount") or 0.0)
+            setattr(self, f"life_{field_name}_tax", row.get("life_tax") or 0.0)
         
         # Update leaderboards
         self.update_leaderboards()
         
+        # Update daily activity ledgers
+        self.update_activity_ledgers()
+        
+        self.record_changes()
         self.save()
         logger.info("PVE statistics updated")
 
+    def record_changes(self):
+        """Record which journal entries were added since the last update."""
+        from .character import CharacterWalletJournalEntry
+        
+        new_entries = CharacterWalletJournalEntry.objects.filter(
+            pk__gt=self.last_journal_pk
+        )
+        summary = new_entries.aggregate(
+            entry_count=Count("pk"),
+            character_count=Count("character", distinct=True),
+            max_pk=Max("pk"),
+        )
+        self.last_changes = {
+            "entry_count": summary["entry_count"],
+            "character_count": summary["character_count"],
+            "months": sorted(
+                new_entries.values_list("period_month", flat=True)
+                .distinct()
+                .order_by()
+            ),
+        }
+        if summary["max_pk"] is not None:
+            self.last_journal_pk = summary["max_pk"]
+
     def update_leaderboards(self):
-        """Update leaderboard data."""
-        from .character import Character, CharacterWalletJournalEntry
-        from django.db.models import Sum
-        
-        # Get current month start
-        today = now()
-        month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        
-        # Current month leaderboard
-        leaderboard = {}
-        
-        for activity_type in ["bounty", "ess", "mission", "incursion"]:
-            top_users = (
-                CharacterWalletJournalEntry.objects
-                .filter(date__gte=month_start, activity_type=activity_type)
-                .values("character__eve_character__character_name")
-                .annotate(total=Sum("amount"))
-                .order_by("-total")[:10]
+        """Update leaderboard data for the current month."""
+        from ..helpers import month_key
+        from .leaderboard import MonthlyLeaderboard
+        
+        StatsDocument.put(
+            StatsDocument.Name.LEADERGRAPH,
+            MonthlyLeaderboard.for_month(month_key(now()), refresh=True),
+        )
+
+    def update_activity_ledgers(self):
+        """Update the daily activity ledgers of the last 90 days.
+
+        Both ledgers are stored in a columnar layout: one list of dates
+        and one list of values per series, aligned with the dates.
+        """
+        from ..helpers import day_key
+        from .character import ActivityType, CharacterWalletJournalEntry
+        from .leaderboard import ACTIVITY_TYPES
+        
+        days = LEDGER_DAYS
+        today = now().date()
+        first_day = today - dt.timedelta(days=days - 1)
+        ownership = "character__eve_character__character_ownership"
+        rows = list(
+            CharacterWalletJournalEntry.objects
+            .filter(
+                # entries dated after today, e.g. from clock skew, are left out
+                period_day__gte=day_key(first_day),
+                period_day__lte=day_key(today),
+                character__deleted_at__isnull=True,
+                **{f"{ownership}__isnull": False},
             )
-            
-            leaderboard[activity_type] = [
+            .values_list(
+                "period_day",
+                "activity_type",
+                f"{ownership}__user_id",
+                f"{ownership}__user__username",
+                f"{ownership}__user__profile__main_character__character_name",
+            )
+            .annotate(total_amount=Sum("amount_cents"), total_tax=Sum("tax_cents"))
+            .order_by()
+        )
+        days_range = [first_day + dt.timedelta(days=offset) for offset in range(days)]
+        dates = [day.isoformat() for day in days_range]
+        if not rows:
+            StatsDocument.put(
+                StatsDocument.Name.USER_ACTIVITY_LEDGER,
+                {"dates": dates, "users": {}, "series": []},
+            )
+            StatsDocument.put(
+                StatsDocument.Name.ALL_ACTIVITY_LEDGER,
                 {
-                    "name": entry["character__eve_character__character_name"],
-                    "amount": entry["total"]
-                }
-                for entry in top_users
-            ]
+                    "dates": dates,
+                    "activity_types": {
+                        activity_type: {"amount": [0.0] * days, "tax": [0.0] * days}
+                        for activity_type in ACTIVITY_TYPES
+                    },
+                },
+            )
+            return
         
-        self.curmonth_leadergraph = leaderboard
+        day_col, activity_col, user_col, username_col, main_col, amount_col, tax_col = zip(
+            *rows
+        )
+        day_idx = np.searchsorted(
+            np.array([day_key(day) for day in days_range]), np.array(day_col)
+        )
+        activity_idx = np.array(
+            [ACTIVITY_TYPES.index(ActivityType(code).label) for code in activity_col]
+        )
+        user_ids = np.array(user_col, dtype=np.int64)
+        amounts = np.array(amount_col, dtype=np.float64) / 100
+        taxes = np.array(tax_col, dtype=np.float64) / 100
+        
+        # one series per user and activity type
+        series_keys, series_idx = np.unique(
+            user_ids * len(ACTIVITY_TYPES) + activity_idx, return_inverse=True
+        )
+        series_amounts = np.zeros((len(series_keys), days))
+        series_taxes = np.zeros((len(series_keys), days))
+        np.add.at(series_amounts, (series_idx, day_idx), amounts)
+        np.add.at(series_taxes, (series_idx, day_idx), taxes)
+        
+        # one series per activity type over all users
+        totals_amounts = np.zeros((len(ACTIVITY_TYPES), days))
+        totals_taxes = np.zeros((len(ACTIVITY_TYPES), days))
+        np.add.at(totals_amounts, (activity_idx, day_idx), amounts)
+        np.add.at(totals_taxes, (activity_idx, day_idx), taxes)
+        
+        names = {
+            str(user_id): main_name or username
+            for user_id, username, main_name in zip(user_col, username_col, main_col)
+        }
+        series_user_ids, series_activity_idx = np.divmod(
+            series_keys, len(ACTIVITY_TYPES)
+        )
+        StatsDocument.put(
+            StatsDocument.Name.USER_ACTIVITY_LEDGER,
+            {
+                "dates": dates,
+                "users": names,
+                "series": [
+                    {
+                        "user_id": int(user_id),
+                        "activity_type": ACTIVITY_TYPES[activity],
+                        "amount": amount_values,
+                        "tax": tax_values,
+                    }
+                    for user_id, activity, amount_values, tax_values in zip(
+                        series_user_ids.tolist(),
+                        series_activity_idx.tolist(),
+                        series_amounts.round(2).tolist(),
+                        series_taxes.round(2).tolist(),
+                    )
+                ],
+            },
+        )
+        StatsDocument.put(
+            StatsDocument.Name.ALL_ACTIVITY_LEDGER,
+            {
+                "dates": dates,
+                "activity_types": {
+                    activity_type: {"amount": amount_values, "tax": tax_values}
+                    for activity_type, amount_values, tax_values in zip(
+                        ACTIVITY_TYPES,
+                        totals_amounts.round(2).tolist(),
+                        totals_taxes.round(2).tolist(),
+                    )
+                },
+            },
+        )
 
+    @metrics.calctaxes_seconds.time(queries=metrics.calctaxes_queries)
     def calctaxes(self):
         """Calculate outstanding tax balances for all users.
         
         Returns:
             dict: {User: (total_owed, current_month_owed)}
         """
-        from .character import Character, CharacterTaxCredits
+        from ..helpers import month_key
+        from .character import Character
+        from .rollups import CharacterMonthlyRollup
         
         user_taxes = {}
         
+        # Lifetime and current month taxes by character from the monthly rollups,
+        # which include archived journal entries
+        current_month = month_key(now())
+        character_taxes = {
+            row["character_id"]: (row["life_tax"] or 0.0, row["curmonth_tax"] or 0.0)
+            for row in (
+                CharacterMonthlyRollup.objects
+                .values("character_id")
+                .annotate(
+                    life_tax=Sum("tax_amount"),
+                    curmonth_tax=Sum("tax_amount", filter=Q(month=current_month)),
+                )
+                .order_by()
+            )
+        }
+        
         # Get all characters
-        for character in Character.objects.select_related("eve_character__character_ownership__user"):
+        for character in Character.objects.active().select_related("eve_character__character_ownership__user"):
             user = character.user
             if not user:
                 continue
             
-            # Calculate lifetime taxes owed
-            lifetime_taxes = character.wallet_journal.aggregate(
-                Sum("tax_amount")
-            )["tax_amount__sum"] or 0.0
+            lifetime_taxes, current_month_taxes = character_taxes.get(
+                character.pk, (0.0, 0.0)
+            )
             
             # Calculate lifetime credits
             lifetime_credits = character.life_credits
             
-            # Calculate current month taxes
-            today = now()
-            month_start = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            
-            current_month_taxes = character.wallet_journal.filter(
-                date__gte=month_start
-            ).aggregate(Sum("tax_amount"))["tax_amount__sum"] or 0.0
-            
             # Net balance
             net_balance = lifetime_taxes - lifetime_credits
             
@@ -241,3 +355,47 @@ class Stats(models.Model):
                 user_taxes[user] = (net_balance, current_month_taxes)
         
         return user_taxes
+
+
+stats_cache = VersionedProcessCache("stats", Stats._load_from_db)
+
+
+class StatsDocument(models.Model):
+    """Large statistics payload, which is loaded separately from the totals in Stats."""
+
+    class Name(models.TextChoices):
+        LEADERGRAPH = "leadergraph", "Leaderboard of the current month"
+        USER_ACTIVITY_LEDGER = "user_activity_ledger", "Daily activity by user"
+        ALL_ACTIVITY_LEDGER = "all_activity_ledger", "Daily activity of all users"
+
+    name = models.CharField(max_length=32, choices=Name.choices, primary_key=True)
+    data = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        default_permissions = ()
+
+    def __str__(self):
+        return self.get_name_display()
+
+    @staticmethod
+    def _cache_key(name: str) -> str:
+        return f"pvetaxes-stats-document-{name}"
+
+    @classmethod
+    def get(cls, name: str):
+        """Return the payload of a document, from the cache if possible."""
+        data = cache.get(cls._cache_key(name))
+        if data is None:
+            data = (
+                cls.objects.filter(name=name).values_list("data", flat=True).first()
+                or {}
+            )
+            cache.set(cls._cache_key(name), data, PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT)
+        return data
+
+    @classmethod
+    def put(cls, name: str, data):
+        """Store the payload of a document."""
+        cls.objects.update_or_create(name=name, defaults={"data": data})
+        cache.set(cls._cache_key(name), data, PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT)
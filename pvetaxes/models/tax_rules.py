@@ -0,0 +1,208 @@
+from functools import reduce
+from operator import or_
+from typing import Optional
+
+from django.db import models
+from django.db.models import F, Q
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+from ..caching import VersionedProcessCache
+from .character import ActivityType, SecurityCategory, rate_to_bps
+from .settings import Settings, settings_cache
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+class TaxRate(models.Model):
+    """Tax rate of an activity type in a space category."""
+
+    settings = models.ForeignKey(
+        Settings, related_name="tax_rates", on_delete=models.CASCADE
+    )
+    activity_type = models.PositiveSmallIntegerField(choices=ActivityType.choices)
+    security_category = models.PositiveSmallIntegerField(
+        choices=SecurityCategory.choices,
+        help_text="Unknown also applies to entries without a solar system",
+    )
+    rate = models.FloatField(
+        default=0.0, help_text="Tax rate as decimal, e.g. 0.1 for 10%. 0 disables the tax"
+    )
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["settings", "activity_type", "security_category"],
+                name="pvetaxes_taxrate_unique_activity_category",
+            )
+        ]
+
+    def __str__(self):
+        return (
+            f"{self.get_activity_type_display()} in "
+            f"{self.get_security_category_display()}: {self.rate}"
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        tax_rules_cache.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        tax_rules_cache.invalidate()
+        return result
+
+
+class TaxSystemOverride(models.Model):
+    """Tax rate of a single solar system, e.g. for exempt systems."""
+
+    settings = models.ForeignKey(
+        Settings, related_name="tax_system_overrides", on_delete=models.CASCADE
+    )
+    solar_system_id = models.PositiveIntegerField(help_text="EVE solar system ID")
+    rate = models.FloatField(
+        null=True,
+        blank=True,
+        help_text=(
+            "Tax rate for all activities in this system as decimal, 0 for exempt. "
+            "Leave empty to use the normal rates, e.g. to list a system "
+            "when only listed systems are taxed"
+        ),
+    )
+
+    class Meta:
+        default_permissions = ()
+        constraints = [
+            models.UniqueConstraint(
+                fields=["settings", "solar_system_id"],
+                name="pvetaxes_taxsystemoverride_unique_system",
+            )
+        ]
+
+    def __str__(self):
+        return f"System {self.solar_system_id}: {self.rate}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        tax_rules_cache.invalidate()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        tax_rules_cache.invalidate()
+        return result
+
+
+class TaxRules:
+    """Compiled tax rules: rates in basis points by activity type and
+    space category plus system overrides.
+
+    Use ``TaxRules.current()`` to get the rules,
+    which are cached in process until they are changed.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        rates: dict,
+        overrides: dict,
+        listed_systems_only: bool,
+    ):
+        self.version = version
+        self.rates = rates
+        """Rate in basis points by (activity type, space category)"""
+        self.overrides = overrides
+        """Rate in basis points or None by solar system ID"""
+        self.listed_systems_only = listed_systems_only
+
+    def __repr__(self):
+        return f"{type(self).__name__}(version={self.version})"
+
+    @classmethod
+    def load(cls) -> "TaxRules":
+        """Load the rules from the database."""
+        settings = Settings.load()
+        rules = cls(
+            version=settings.tax_rules_version,
+            rates={
+                (activity_type, category): rate_to_bps(rate)
+                for activity_type, category, rate in settings.tax_rates.values_list(
+                    "activity_type", "security_category", "rate"
+                )
+            },
+            overrides={
+                solar_system_id: None if rate is None else rate_to_bps(rate)
+                for solar_system_id, rate in settings.tax_system_overrides.values_list(
+                    "solar_system_id", "rate"
+                )
+            },
+            listed_systems_only=settings.tax_listed_systems_only,
+        )
+        logger.info("Loaded tax rules version %d", rules.version)
+        return rules
+
+    @staticmethod
+    def current() -> "TaxRules":
+        """Return the current rules."""
+        return tax_rules_cache.get()
+
+    @staticmethod
+    def publish():
+        """Count up the version of the rules after they were changed."""
+        Settings.objects.filter(pk=1).update(
+            tax_rules_version=F("tax_rules_version") + 1
+        )
+        settings_cache.invalidate()
+        tax_rules_cache.invalidate()
+
+    def rate_bps(
+        self, activity_type: int, security_category: int, solar_system_id: Optional[int]
+    ) -> int:
+        """Return the tax rate in basis points for an activity."""
+        if solar_system_id is not None:
+            if solar_system_id in self.overrides:
+                override = self.overrides[solar_system_id]
+                if override is not None:
+                    return override
+            elif self.listed_systems_only:
+                return 0
+        return self.rates.get((activity_type, security_category), 0)
+
+    def rate(
+        self, activity_type: int, security_category: int, solar_system_id: Optional[int]
+    ) -> float:
+        """Return the tax rate as decimal for an activity."""
+        return self.rate_bps(activity_type, security_category, solar_system_id) / 10_000
+
+    def rate_groups(self) -> dict:
+        """Return the matrix rates as filters for journal entries
+        grouped by rate in basis points."""
+        groups = {}
+        for activity_type in ActivityType:
+            for category in SecurityCategory:
+                rate_bps = self.rates.get((activity_type.value, category.value), 0)
+                groups.setdefault(rate_bps, []).append(
+                    Q(activity_type=activity_type, security_category=category)
+                )
+        return {rate_bps: reduce(or_, filters) for rate_bps, filters in groups.items()}
+
+    def fixed_rate_filter(self) -> Q:
+        """Return a filter for journal entries whose rate does not come
+        from the matrix, because of a system override."""
+        fixed = Q(
+            eve_solar_system_id__in=[
+                solar_system_id
+                for solar_system_id, rate_bps in self.overrides.items()
+                if rate_bps is not None
+            ]
+        )
+        if self.listed_systems_only:
+            fixed |= Q(eve_solar_system__isnull=False) & ~Q(
+                eve_solar_system_id__in=list(self.overrides)
+            )
+        return fixed
+
+
+tax_rules_cache = VersionedProcessCache("tax-rules", TaxRules.load)
@@ -0,0 +1,129 @@
+from typing import Optional
+
+from django.core.cache import cache
+from django.db import models
+from django.utils.timezone import now
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from .. import __title__
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+class UpdateRun(models.Model):
+    """Update of all characters or all admin characters.
+
+    Objects are processed in order of their primary key and the progress
+    is saved after each object, so a run stopped by the time limit or
+    a worker restart continues where it stopped on the next start.
+    """
+
+    class Kind(models.TextChoices):
+        CHARACTERS = "characters", "Characters"
+        ADMINS = "admins", "Admin characters"
+
+    kind = models.CharField(max_length=16, choices=Kind.choices)
+
+    total = models.PositiveIntegerField(default=0)
+    """Number of objects to update when the run was started"""
+
+    last_pk = models.BigIntegerField(default=0)
+    """PK of the last processed object"""
+
+    success_count = models.PositiveIntegerField(default=0)
+    failed_count = models.PositiveIntegerField(default=0)
+
+    failures = models.JSONField(default=dict, blank=True)
+    """Error of each failed object by PK"""
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        default_permissions = ()
+        indexes = [models.Index(fields=["kind", "finished_at"])]
+
+    def __str__(self):
+        return f"Update of {self.get_kind_display().lower()} #{self.pk}"
+
+    @classmethod
+    def resume_or_start(cls, kind: str, total: int) -> "UpdateRun":
+        """Return the unfinished run of a kind or start a new one."""
+        run = (
+            cls.objects.filter(kind=kind, finished_at__isnull=True).order_by("pk").last()
+        )
+        if run:
+            logger.info("%s: Resuming after PK %d", run, run.last_pk)
+            return run
+        return cls.objects.create(kind=kind, total=total)
+
+    @classmethod
+    def latest(cls, kind: str) -> Optional["UpdateRun"]:
+        """Return the latest run of a kind."""
+        return cls.objects.filter(kind=kind).order_by("pk").last()
+
+    @staticmethod
+    def _lock_key(kind: str) -> str:
+        return f"pvetaxes-update-run-lock-{kind}"
+
+    @classmethod
+    def acquire(cls, kind: str, timeout: int) -> bool:
+        """Try to lock a kind of run for the current worker.
+
+        Returns:
+            False if another worker is processing a run of this kind
+        """
+        return cache.add(cls._lock_key(kind), True, timeout)
+
+    @classmethod
+    def release(cls, kind: str):
+        """Release the lock of a kind of run."""
+        cache.delete(cls._lock_key(kind))
+
+    def record(self, pk: int, error: Optional[str] = None):
+        """Save the outcome of an object as checkpoint."""
+        self.last_pk = pk
+        if error is None:
+            self.success_count += 1
+        else:
+            self.failed_count += 1
+            self.failures[str(pk)] = error
+        self.save()
+
+    def finish(self):
+        self.finished_at = now()
+        self.save()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.finished_at is not None
+
+    @property
+    def processed_count(self) -> int:
+        return self.success_count + self.failed_count
+
+    @property
+    def progress(self) -> float:
+        """Processed objects in percent."""
+        if not self.total:
+            return 100.0 if self.is_finished else 0.0
+        return min(100.0, 100 * self.processed_count / self.total)
+
+    @property
+    def throughput(self) -> Optional[float]:
+        """Processed objects per minute since the start."""
+        seconds = ((self.finished_at or self.updated_at) - self.started_at).total_seconds()
+        if seconds <= 0:
+            return None
+        return 60 * self.processed_count / seconds
+
+    def summary(self) -> dict:
+        return {
+            "total": self.total,
+            "success": self.success_count,
+            "failed": self.failed_count,
+            "finished": self.is_finished,
+        }
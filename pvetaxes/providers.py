@@ -1,3 +1,84 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterator
+
 from esi.clients import EsiClientProvider
 
+from . import metrics
+
 esi = EsiClientProvider()
+
+_esi_call_count = 0
+
+
+def count_esi_calls(count: int = 1):
+    """Count ESI requests made by this process."""
+    global _esi_call_count
+    _esi_call_count += count
+
+
+def esi_call_count() -> int:
+    """Return the number of ESI requests made by this process."""
+    return _esi_call_count
+
+
+def _fetch_esi_page(operation: Callable, page: int, kwargs: dict) -> tuple:
+    """Fetch one page of a paged ESI endpoint.
+
+    Returns:
+        Data of the page and number of pages
+    """
+    future = operation(page=page, **kwargs)
+    future.request_config.also_return_response = True
+    try:
+        with metrics.esi_request_seconds.time():
+            data, response = future.result()
+    except Exception as ex:
+        metrics.esi_requests.inc(status=getattr(ex, "status_code", None) or "error")
+        raise
+    metrics.esi_requests.inc(status=response.status_code)
+    return data, int(response.headers.get("X-Pages", 1))
+
+
+def iter_esi_pages(operation: Callable, max_workers: int = 1, **kwargs) -> Iterator[list]:
+    """Yield the pages of a paged ESI endpoint as soon as they arrive.
+
+    The first page is fetched alone to read the number of pages from X-Pages.
+    The remaining pages are fetched concurrently by up to ``max_workers``
+    threads, and at most ``max_workers`` fetched pages are held at a time.
+    Pages after the first are yielded in order of arrival.
+
+    Args:
+        operation: ESI client operation,
+            e.g. ``esi.client.Wallet.get_characters_character_id_wallet_journal``
+        max_workers: Max number of pages fetched at the same time
+        kwargs: Parameters of the operation except the page
+    """
+    data, page_count = _fetch_esi_page(operation, 1, kwargs)
+    count_esi_calls()
+    yield data
+    if page_count < 2:
+        return
+
+    next_pages = iter(range(2, page_count + 1))
+    workers = max(1, min(max_workers, page_count - 1))
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pvetaxes-esi")
+    running = set()
+    try:
+        for page in next_pages:
+            running.add(executor.submit(_fetch_esi_page, operation, page, kwargs))
+            if len(running) >= workers:
+                break
+        while running:
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                data, _ = future.result()
+                count_esi_calls()
+                yield data
+                page = next(next_pages, None)
+                if page is not None:
+                    running.add(executor.submit(_fetch_esi_page, operation, page, kwargs))
+    finally:
+        # pages not fetched yet are not needed after an error
+        for future in running:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from esi.models import Token
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+from .models import Character
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+@receiver(post_save, sender=Token)
+def resume_character_updates(sender, instance, created, **kwargs):
+    """Resume paused updates of a character when it gets a new token."""
+    if not created:
+        return
+    resumed = Character.objects.filter(
+        eve_character__character_id=instance.character_id,
+        update_failure_count__gt=0,
+    ).update(update_failure_count=0, update_paused_until=None, update_error="")
+    if resumed:
+        logger.info(
+            "Resumed updates of character %s after a new token", instance.character_id
+        )
@@ -0,0 +1,228 @@
+"""What-if simulation of tax rate schedules"""
+from typing import Optional
+
+import numpy as np
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from allianceauth.services.hooks import get_extension_logger
+from app_utils.logging import LoggerAddTag
+
+from . import __title__
+from .app_settings import PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT
+
+logger = LoggerAddTag(get_extension_logger(__name__), __title__)
+
+
+class TaxSimulator:
+    """Evaluates candidate tax rate schedules against past earnings.
+
+    Earnings are loaded once as monthly aggregates by user,
+    space category and activity type. They are summed into one matrix of
+    users x (activity type, space category), so each schedule, a rate matrix
+    of activity type x space category, is evaluated with one matrix product.
+
+    Only journal entries are covered, so archived months are not included.
+    Entries in systems with a fixed rate from a system override are left out.
+    """
+
+    CACHE_KEY = "pvetaxes-simulator-aggregates"
+
+    def __init__(self, data: dict):
+        from .models import ActivityType, SecurityCategory
+
+        self.activity_types = [activity.label for activity in ActivityType]
+        self.categories = [category.label for category in SecurityCategory]
+        self.user_ids = np.array(data["user_ids"], dtype=np.int64)
+        self.names = data["names"]
+        self.months = np.array(data["months"], dtype=np.int64)
+        self.user_idx = np.array(data["user_idx"], dtype=np.int64)
+        self.activity_idx = np.array(data["activity_idx"], dtype=np.int64)
+        self.category_idx = np.array(data["category_idx"], dtype=np.int64)
+        self.amounts = np.array(data["amounts"], dtype=np.float64)
+        self.taxes = np.array(data["taxes"], dtype=np.float64)
+
+    @classmethod
+    def load(cls, refresh: bool = False) -> "TaxSimulator":
+        """Load the aggregates, from the cache if possible."""
+        data = None if refresh else cache.get(cls.CACHE_KEY)
+        if data is None:
+            data = cls._query()
+            cache.set(cls.CACHE_KEY, data, PVETAXES_TASKS_OBJECT_CACHE_TIMEOUT)
+        return cls(data)
+
+    @staticmethod
+    def _query() -> dict:
+        """Return the aggregates of all journal entries in one grouped query."""
+        from .models import (
+            ActivityType,
+            CharacterWalletJournalEntry,
+            SecurityCategory,
+            TaxRules,
+        )
+
+        ownership = "character__eve_character__character_ownership"
+        rows = (
+            CharacterWalletJournalEntry.objects.filter(
+                character__deleted_at__isnull=True,
+                **{f"{ownership}__isnull": False},
+            )
+            .exclude(TaxRules.current().fixed_rate_filter())
+            .values_list(
+                "period_month",
+                f"{ownership}__user_id",
+                f"{ownership}__user__username",
+                f"{ownership}__user__profile__main_character__character_name",
+                "security_category",
+                "activity_type",
+            )
+            .annotate(total_amount=Sum("amount_cents"), total_tax=Sum("tax_cents"))
+            .order_by()
+        )
+        activity_positions = {activity.value: pos for pos, activity in enumerate(ActivityType)}
+        category_positions = {
+            category.value: pos for pos, category in enumerate(SecurityCategory)
+        }
+        user_positions = {}
+        names = []
+        data = {
+            "months": [],
+            "user_idx": [],
+            "activity_idx": [],
+            "category_idx": [],
+            "amounts": [],
+            "taxes": [],
+        }
+        for month, user_id, username, main_name, category, activity, amount, tax in rows:
+            if user_id not in user_positions:
+                user_positions[user_id] = len(user_positions)
+                names.append(main_name or username)
+            data["months"].append(month)
+            data["user_idx"].append(user_positions[user_id])
+            data["activity_idx"].append(activity_positions[activity])
+            data["category_idx"].append(category_positions[category])
+            data["amounts"].append(amount / 100)
+            data["taxes"].append(tax / 100)
+
+        data["user_ids"] = list(user_positions)
+        data["names"] = names
+        return data
+
+    def current_rates(self) -> np.ndarray:
+        """Return the rate matrix of the current tax rules."""
+        from .models import ActivityType, SecurityCategory, TaxRules
+
+        rules = TaxRules.current()
+        return np.array(
+            [
+                [
+                    rules.rates.get((activity_type.value, category.value), 0) / 10_000
+                    for category in SecurityCategory
+                ]
+                for activity_type in ActivityType
+            ]
+        )
+
+    def rate_matrix(self, schedule: dict) -> np.ndarray:
+        """Return the rate matrix of a schedule.
+
+        Args:
+            schedule: Rates as decimal by space category (e.g. "nullsec")
+                or by activity type and space category (e.g. "bounty.nullsec").
+                Missing rates are taken from the current tax rules.
+
+        Raises:
+            ValueError: If the schedule contains an unknown key
+        """
+        rates = self.current_rates()
+        items = sorted(schedule.items(), key=lambda item: "." in item[0])
+        for key, rate in items:
+            activity, _, category = key.rpartition(".")
+            if category not in self.categories or (
+                activity and activity not in self.activity_types
+            ):
+                raise ValueError(f"Unknown schedule key: {key}")
+            column = self.categories.index(category)
+            if activity:
+                rates[self.activity_types.index(activity), column] = rate
+            else:
+                rates[:, column] = rate
+        return rates
+
+    def evaluate(
+        self,
+        schedules: list,
+        start_month: Optional[int] = None,
+        end_month: Optional[int] = None,
+    ) -> dict:
+        """Evaluate schedules against the earnings of a range of months.
+
+        Args:
+            schedules: Schedules as accepted by ``rate_matrix()``
+            start_month: First month key to include
+            end_month: Last month key to include
+
+        Returns:
+            {"current": current taxes,
+            "users": [{"user_id", "name", "current"}],
+            "schedules": [{"total", "delta", "user_totals", "user_deltas"}]}
+            with the per-user lists aligned with "users"
+        """
+        mask = np.ones(len(self.months), dtype=bool)
+        if start_month:
+            mask &= self.months >= start_month
+        if end_month:
+            mask &= self.months <= end_month
+        user_idx = self.user_idx[mask]
+        user_count = len(self.user_ids)
+        cell_count = len(self.activity_types) * len(self.categories)
+
+        # earnings of each user by activity type and category
+        cells = self.activity_idx[mask] * len(self.categories) + self.category_idx[mask]
+        earnings = np.bincount(
+            user_idx * cell_count + cells,
+            weights=self.amounts[mask],
+            minlength=user_count * cell_count,
+        ).reshape(user_count, cell_count)
+        rates = np.stack([self.rate_matrix(schedule).ravel() for schedule in schedules])
+        user_totals = earnings @ rates.T
+        current = np.bincount(user_idx, weights=self.taxes[mask], minlength=user_count)
+        user_deltas = user_totals - current[:, np.newaxis]
+
+        return {
+            "current": float(current.sum()),
+            "users": [
+                {"user_id": int(user_id), "name": name, "current": float(amount)}
+                for user_id, name, amount in zip(self.user_ids, self.names, current)
+            ],
+            "schedules": [
+                {
+                    "total": float(totals.sum()),
+                    "delta": float(deltas.sum()),
+                    "user_totals": totals.round(2).tolist(),
+                    "user_deltas": deltas.round(2).tolist(),
+                }
+                for totals, deltas in zip(user_totals.T, user_deltas.T)
+            ],
+        }
+
+
+def parse_schedule(value: str) -> dict:
+    """Parse a schedule from text like "nullsec=0.05,bounty.losec=0.1".
+
+    Raises:
+        ValueError: If the text is not a valid schedule
+    """
+    schedule = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        key, separator, rate = item.partition("=")
+        if not separator:
+            raise ValueError(f"Invalid schedule item: {item}")
+        rate = float(rate)
+        if not 0 <= rate <= 1:
+            raise ValueError(f"Rate must be between 0 and 1: {item}")
+        schedule[key.strip()] = rate
+    return schedule
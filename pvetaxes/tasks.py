@@ -1,6 +1,12 @@
+import datetime as dt
+from itertools import islice
+from typing import Callable, Optional
+
 from celery import shared_task
+from celery.exceptions import SoftTimeLimitExceeded
 from django.contrib.auth.models import User
-from django.db import Error
+from django.core.cache import cache
+from django.db import Error, models
 from django.utils import timezone
 from esi.errors import TokenError
 
@@ -8,24 +14,80 @@ from allianceauth.notifications import notify
 from allianceauth.services.hooks import get_extension_logger
 
 from .app_settings import (
+    PVETAXES_DELETE_CHUNK_SIZE,
+    PVETAXES_DELETE_RETRY_MINUTES,
+    PVETAXES_HARVESTER_CHUNK_SIZE,
+    PVETAXES_JOURNAL_RETENTION_MONTHS,
     PVETAXES_PING_CURRENT_MSG,
     PVETAXES_PING_CURRENT_THRESHOLD,
     PVETAXES_PING_FIRST_MSG,
     PVETAXES_PING_INTEREST_APPLIED,
     PVETAXES_PING_SECOND_MSG,
     PVETAXES_PING_THRESHOLD,
+    PVETAXES_REFRESH_LOCK_TIMEOUT,
+    PVETAXES_REFRESH_MIN_INTERVAL,
+    PVETAXES_REFRESH_TASK_PRIORITY,
+    PVETAXES_REPRICE_CHUNK_SIZE,
+    PVETAXES_STATS_UPDATE_DELAY,
     PVETAXES_TASKS_TIME_LIMIT,
+    PVETAXES_UPDATE_ENGINE,
 )
 from .helpers import (
     get_user_discord_id,
+    month_key,
+    shift_month_key,
     send_corp_tax_summary,
     send_discord_dm,
     send_discord_notification,
 )
-from .models import AdminCharacter, Character, CharacterTaxCredits, Settings, Stats
+from .models import (
+    AdminCharacter,
+    Character,
+    CharacterTaxCredits,
+    LiveLeaderboard,
+    RepricingRun,
+    Settings,
+    Stats,
+    UpdateRun,
+)
 
 logger = get_extension_logger(__name__)
 TASK_DEFAULT_KWARGS = {"time_limit": PVETAXES_TASKS_TIME_LIMIT, "max_retries": 3}
+UPDATE_RUN_TASK_KWARGS = {
+    **TASK_DEFAULT_KWARGS,
+    "soft_time_limit": int(PVETAXES_TASKS_TIME_LIMIT * 0.9),
+}
+
+STATS_UPDATE_PENDING_KEY = "pvetaxes-stats-update-pending"
+STATS_UPDATE_LOCK_KEY = "pvetaxes-stats-update-lock"
+
+
+def _refresh_lock_key(character_pk: int) -> str:
+    return f"pvetaxes-character-refresh-lock-{character_pk}"
+
+
+def _refresh_result_key(character_pk: int) -> str:
+    return f"pvetaxes-character-refresh-result-{character_pk}"
+
+
+def acquire_update_lock(character_pk: int) -> bool:
+    """Take the lock for updating a character, which user refreshes,
+    updates of all characters and the async engine share.
+
+    Returns:
+        False if another update of the character holds the lock
+    """
+    return cache.add(
+        _refresh_lock_key(character_pk), True, PVETAXES_REFRESH_LOCK_TIMEOUT
+    )
+
+
+def release_update_lock(character_pk: int):
+    cache.delete(_refresh_lock_key(character_pk))
+
+
+def _delete_retry_key(character_pk: int) -> str:
+    return f"pvetaxes-character-delete-retry-{character_pk}"
 
 
 def calctaxes():
@@ -34,14 +96,47 @@ def calctaxes():
     return s.calctaxes()
 
 
+def request_character_update(character: Character) -> dict:
+    """Queue a high priority update of a character requested by a user.
+
+    Requests are ignored while an update of the character is queued or running.
+    After a recent update the result of that update is returned instead.
+
+    Returns:
+        {"status": "fresh", "last_update", "new_entries"},
+        {"status": "in_progress"} or {"status": "started"}
+    """
+    last_update = character.last_wallet_update
+    if last_update and timezone.now() - last_update < dt.timedelta(
+        seconds=PVETAXES_REFRESH_MIN_INTERVAL
+    ):
+        return {
+            "status": "fresh",
+            "last_update": last_update.isoformat(),
+            "new_entries": cache.get(_refresh_result_key(character.pk)),
+        }
+    
+    if not acquire_update_lock(character.pk):
+        return {"status": "in_progress"}
+    
+    update_character_wallet.apply_async(
+        args=[character.pk], priority=PVETAXES_REFRESH_TASK_PRIORITY
+    )
+    return {"status": "started"}
+
+
 @shared_task(**TASK_DEFAULT_KWARGS)
 def update_character_wallet(character_pk: int):
     """Update wallet journal for a single character."""
     try:
-        character = Character.objects.get(pk=character_pk)
+        character = Character.objects.active().get(pk=character_pk)
         logger.info(f"Updating wallet journal for {character}")
-        character.update_wallet_journal()
-        character.calculate_monthly_totals()
+        new_entries = _update_character(character)
+        cache.set(
+            _refresh_result_key(character_pk),
+            new_entries,
+            PVETAXES_REFRESH_MIN_INTERVAL,
+        )
         logger.info(f"Successfully updated wallet journal for {character}")
         return True
     except Character.DoesNotExist:
@@ -53,36 +148,272 @@ def update_character_wallet(character_pk: int):
     except Exception as e:
         logger.error(f"Error updating character {character_pk}: {e}", exc_info=True)
         return False
+    finally:
+        release_update_lock(character_pk)
+
+
+def _run_update(
+    kind: str,
+    objects: models.QuerySet,
+    update: Optional[Callable] = None,
+    update_chunk: Optional[Callable] = None,
+    chunk_size: int = 1,
+) -> Optional[UpdateRun]:
+    """Update objects in a resumable run, continuing an unfinished run of this kind.
+
+    Args:
+        update: Function updating one object
+        update_chunk: Function updating a list of objects at once
+            and returning the error by PK of each failed object
+        chunk_size: Number of objects passed to ``update_chunk``.
+            Progress is saved after each chunk.
+
+    Returns:
+        The run or None if another worker is processing a run of this kind
+    """
+    if not UpdateRun.acquire(kind, PVETAXES_TASKS_TIME_LIMIT):
+        logger.info(f"Update of {kind} is already running, skipping")
+        return None
+    
+    run = None
+    try:
+        run = UpdateRun.resume_or_start(kind, total=objects.count())
+        remaining = iter(objects.filter(pk__gt=run.last_pk).order_by("pk"))
+        while True:
+            chunk = list(islice(remaining, chunk_size if update_chunk else 1))
+            if not chunk:
+                break
+            if update_chunk:
+                errors = update_chunk(chunk)
+            else:
+                errors = {obj.pk: _update_error(obj, update) for obj in chunk}
+            for obj in chunk:
+                run.record(obj.pk, errors.get(obj.pk))
+        run.finish()
+    except SoftTimeLimitExceeded:
+        logger.warning(f"{run}: Time limit reached, continuing in a new task")
+    finally:
+        UpdateRun.release(kind)
+    return run
+
+
+def _update_error(obj, update) -> Optional[str]:
+    """Update an object and return the error if it failed."""
+    try:
+        update(obj)
+    except SoftTimeLimitExceeded:
+        raise
+    except TokenError as e:
+        logger.warning(f"Token error for {obj}: {e}")
+        return f"Token error: {e}"
+    except Exception as e:
+        logger.error(f"Error updating {obj}: {e}", exc_info=True)
+        return str(e)
+    return None
+
+
+def update_character(character: Character) -> Optional[int]:
+    """Update the wallet journal and monthly totals of a character
+    and pause its updates after token or ESI failures.
+
+    Characters which are already being updated, e.g. by a refresh
+    requested by their user, are skipped.
+
+    Returns:
+        Number of new journal entries or None if the character was skipped
+    """
+    if not acquire_update_lock(character.pk):
+        logger.info(f"{character} is already being updated, skipping")
+        return None
+    try:
+        return _update_character(character)
+    finally:
+        release_update_lock(character.pk)
+
+
+def _update_character(character: Character) -> int:
+    """Update a character while holding its update lock."""
+    try:
+        new_entries = character.update_wallet_journal()
+    except (TokenError, OSError) as e:
+        character.record_update_failure(e)
+        raise
+    character.record_update_success()
+    character.calculate_monthly_totals()
+    return new_entries
+
+
+def update_engine(engine: Optional[str] = None) -> str:
+    """Return the engine for updating all characters.
+
+    Falls back to the sync engine when the async engine is not installed.
+
+    Args:
+        engine: "sync" or "async", defaults to PVETAXES_UPDATE_ENGINE
+    """
+    from .harvester import is_available
+
+    engine = engine or PVETAXES_UPDATE_ENGINE
+    if engine == "async" and not is_available():
+        logger.error(
+            "The async engine needs aiohttp: pip install aiohttp. "
+            "Using the sync engine instead."
+        )
+        return "sync"
+    return engine
+
+
+def harvest_characters(characters: list) -> dict:
+    """Update characters at the same time with the async engine.
+
+    Returns:
+        Error by PK of each failed character
+    """
+    from .harvester import WalletHarvester
+
+    try:
+        results = WalletHarvester().run(characters)
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating {len(characters)} characters: {e}", exc_info=True)
+        return {character.pk: str(e) for character in characters}
+    errors = {}
+    for character_pk, result in results.items():
+        if isinstance(result.error, TokenError):
+            errors[character_pk] = f"Token error: {result.error}"
+        elif result.error:
+            errors[character_pk] = str(result.error)
+    return errors
+
+
+@shared_task(**UPDATE_RUN_TASK_KWARGS)
+def update_all_characters(engine: Optional[str] = None):
+    """Update wallet journals for all registered characters.
+
+    Args:
+        engine: "sync" or "async", defaults to PVETAXES_UPDATE_ENGINE
+    """
+    engine = update_engine(engine)
+    logger.info(f"Starting update for all characters with the {engine} engine")
+    requeue_stale_deletions()
+    
+    characters = Character.objects.active().updatable()
+    if engine == "async":
+        run = _run_update(
+            UpdateRun.Kind.CHARACTERS,
+            characters,
+            update_chunk=harvest_characters,
+            chunk_size=PVETAXES_HARVESTER_CHUNK_SIZE,
+        )
+    else:
+        run = _run_update(UpdateRun.Kind.CHARACTERS, characters, update_character)
+    if run is None:
+        return None
+    if not run.is_finished:
+        update_all_characters.delay(engine)
+        return run.summary()
+    
+    logger.info(
+        f"Update complete: {run.success_count}/{run.total} succeeded, "
+        f"{run.failed_count} failed"
+    )
+    
+    # Update stats after all characters are updated
+    schedule_stats_update()
+    
+    return run.summary()
+
+
+@shared_task(**TASK_DEFAULT_KWARGS)
+def delete_character(character_pk: int):
+    """Delete a removed character and all its data in chunks."""
+    try:
+        character = Character.objects.get(pk=character_pk, deleted_at__isnull=False)
+    except Character.DoesNotExist:
+        logger.warning(f"Removed character {character_pk} not found")
+        return False
+    
+    logger.info(f"Deleting data of {character}")
+    character.delete_data(chunk_size=PVETAXES_DELETE_CHUNK_SIZE)
+    logger.info(f"Deleted character {character_pk}")
+    return True
+
+
+def requeue_deletion(character: Character) -> bool:
+    """Queue the deletion of a removed character again if it is stale,
+    e.g. because its task was lost or failed.
+
+    Returns:
+        True if the deletion was queued
+    """
+    if not character.is_deletion_stale:
+        return False
+    if not cache.add(
+        _delete_retry_key(character.pk), True, PVETAXES_DELETE_RETRY_MINUTES * 60
+    ):
+        return False
+    logger.warning(f"Deletion of {character} is stale, queuing it again")
+    delete_character.delay(character.pk)
+    return True
+
+
+def requeue_stale_deletions() -> int:
+    """Queue the deletion of all removed characters again whose deletion is stale.
+
+    Returns:
+        Number of queued deletions
+    """
+    return sum(
+        requeue_deletion(character)
+        for character in Character.objects.deletion_stale().select_related(
+            "eve_character"
+        )
+    )
 
 
 @shared_task(**TASK_DEFAULT_KWARGS)
-def update_all_characters():
-    """Update wallet journals for all registered characters."""
-    logger.info("Starting update for all characters")
+def archive_journal(retention_months: int = None):
+    """Fold wallet journal entries older than the retention period
+    into monthly rollups and delete them."""
+    if retention_months is None:
+        retention_months = PVETAXES_JOURNAL_RETENTION_MONTHS
+    if retention_months <= 0:
+        logger.info("Journal retention is disabled, skipping archival")
+        return 0
     
-    characters = Character.objects.all()
-    total = characters.count()
-    success = 0
-    failed = 0
+    before_month = shift_month_key(month_key(timezone.now()), -retention_months)
+    logger.info(f"Archiving journal entries before month {before_month}")
     
-    for character in characters:
+    archived = 0
+    for character in Character.objects.active():
         try:
-            character.update_wallet_journal()
-            character.calculate_monthly_totals()
-            success += 1
-        except TokenError as e:
-            logger.warning(f"Token error for {character}: {e}")
-            failed += 1
+            archived += character.archive_journal(
+                before_month, chunk_size=PVETAXES_DELETE_CHUNK_SIZE
+            )
         except Exception as e:
-            logger.error(f"Error updating {character}: {e}", exc_info=True)
-            failed += 1
+            logger.error(f"Error archiving journal of {character}: {e}", exc_info=True)
     
-    logger.info(f"Update complete: {success}/{total} succeeded, {failed} failed")
+    logger.info(f"Archived {archived} journal entries")
+    return archived
+
+
+@shared_task(**TASK_DEFAULT_KWARGS)
+def reprice_journal(run_pk: int):
+    """Run or resume a repricing run and update the stats afterwards."""
+    try:
+        run = RepricingRun.objects.get(pk=run_pk)
+    except RepricingRun.DoesNotExist:
+        logger.error(f"Repricing run {run_pk} not found")
+        return 0
     
-    # Update stats after all characters are updated
-    update_stats.delay()
+    if run.is_finished:
+        logger.info(f"{run} is already finished")
+        return run.repriced_count
     
-    return {"total": total, "success": success, "failed": failed}
+    run.run(chunk_size=PVETAXES_REPRICE_CHUNK_SIZE)
+    schedule_stats_update()
+    return run.repriced_count
 
 
 @shared_task(**TASK_DEFAULT_KWARGS)
@@ -105,44 +436,72 @@ def update_admin_wallet(admin_pk: int):
         return False
 
 
-@shared_task(**TASK_DEFAULT_KWARGS)
+@shared_task(**UPDATE_RUN_TASK_KWARGS)
 def update_all_admins():
     """Update corp wallets for all admin characters."""
     logger.info("Starting update for all admin characters")
     
-    admins = AdminCharacter.objects.all()
-    total = admins.count()
-    success = 0
-    failed = 0
+    run = _run_update(
+        UpdateRun.Kind.ADMINS,
+        AdminCharacter.objects.all(),
+        lambda admin: admin.update_corp_wallet(),
+    )
+    if run is None:
+        return None
+    if not run.is_finished:
+        update_all_admins.delay()
+        return run.summary()
     
-    for admin in admins:
-        try:
-            admin.update_corp_wallet()
-            success += 1
-        except TokenError as e:
-            logger.warning(f"Token error for {admin}: {e}")
-            failed += 1
-        except Exception as e:
-            logger.error(f"Error updating {admin}: {e}", exc_info=True)
-            failed += 1
-    
-    logger.info(f"Admin update complete: {success}/{total} succeeded, {failed} failed")
+    logger.info(
+        f"Admin update complete: {run.success_count}/{run.total} succeeded, "
+        f"{run.failed_count} failed"
+    )
     
-    return {"total": total, "success": success, "failed": failed}
+    return run.summary()
+
+
+def schedule_stats_update():
+    """Schedule an update of the global statistics.
+
+    Requests within ``PVETAXES_STATS_UPDATE_DELAY`` seconds are combined
+    into one update, which runs at the end of that window.
+    """
+    if cache.add(STATS_UPDATE_PENDING_KEY, True, PVETAXES_STATS_UPDATE_DELAY):
+        update_stats.apply_async(countdown=PVETAXES_STATS_UPDATE_DELAY)
+    else:
+        logger.debug("Statistics update already scheduled")
 
 
 @shared_task(**TASK_DEFAULT_KWARGS)
 def update_stats():
-    """Update global statistics."""
+    """Update global statistics.
+
+    Only one update runs at a time. If another update is running,
+    a new update is scheduled to include changes made in the meantime.
+    """
+    cache.delete(STATS_UPDATE_PENDING_KEY)
+    if not cache.add(STATS_UPDATE_LOCK_KEY, True, PVETAXES_TASKS_TIME_LIMIT):
+        logger.info("Statistics are already being updated, scheduling another update")
+        schedule_stats_update()
+        return False
+    
     logger.info("Updating global statistics")
     try:
         stats = Stats.load()
         stats.update_stats()
-        logger.info("Statistics updated successfully")
+        logger.info(f"Statistics updated successfully: {stats.last_changes}")
         return True
     except Exception as e:
         logger.error(f"Error updating stats: {e}", exc_info=True)
         return False
+    finally:
+        cache.delete(STATS_UPDATE_LOCK_KEY)
+
+
+@shared_task(**TASK_DEFAULT_KWARGS)
+def reconcile_live_leaderboards():
+    """Rebuild the live leaderboards of the current month from the database."""
+    LiveLeaderboard.reconcile(month_key(timezone.now()))
 
 
 @shared_task(**{**TASK_DEFAULT_KWARGS, **{"bind": True}})
@@ -219,7 +578,7 @@ def apply_monthly_interest():
         interest_amount = total_owed * settings.interest_rate
         
         # Apply interest to all characters owned by this user
-        characters = Character.objects.filter(
+        characters = Character.objects.active().filter(
             eve_character__character_ownership__user=user
         )
         
@@ -259,7 +618,7 @@ def run_monthly_tasks():
     notify_taxes_due()
     
     # Update stats
-    update_stats()
+    schedule_stats_update()
     
     logger.info("Monthly maintenance tasks complete")
 
@@ -286,7 +645,7 @@ def process_corp_payments():
             
             # Find their PVE Taxes character
             try:
-                character = Character.objects.get(eve_character=eve_char)
+                character = Character.objects.active().get(eve_character=eve_char)
             except Character.DoesNotExist:
                 logger.warning(f"No PVE Taxes character found for {eve_char}")
                 continue
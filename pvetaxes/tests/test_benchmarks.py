@@ -0,0 +1,43 @@
+from unittest.mock import patch
+
+from django.test import TransactionTestCase
+
+from ..loadtesting import benchmarks, data
+from ..models import CharacterTaxCredits, Settings
+
+
+@patch("pvetaxes.tasks.notify")
+class TestRunJob(TransactionTestCase):
+    """Settings saved by the jobs are only reloaded after their commit,
+    so the runs need real transactions."""
+
+    def setUp(self):
+        data.generate(users=5, characters=30, rows=300, months=2)
+
+    def run_job(self, name: str) -> list:
+        """Run a job and return the query counts of its runs."""
+        runs = []
+
+        def run(*args, **kwargs):
+            runs.append(original_run(*args, **kwargs))
+            return runs[-1]
+
+        original_run = benchmarks._run
+        with patch.object(benchmarks, "_run", run):
+            benchmarks.run_job(name, repeat=3)
+        return [run["queries"] for run in runs]
+
+    def test_runs_of_mutating_jobs_work_on_the_same_data(self, notify):
+        credits = CharacterTaxCredits.objects.count()
+        last_interest_applied = Settings.load().last_interest_applied
+
+        for name in ("process_corp_payments", "apply_monthly_interest"):
+            with self.subTest(job=name):
+                queries = self.run_job(name)
+
+                self.assertGreater(queries[0], 1)
+                # the first run also fills the caches
+                self.assertEqual(len(set(queries[1:])), 1, queries)
+                self.assertEqual(CharacterTaxCredits.objects.count(), credits)
+
+        self.assertEqual(Settings.load().last_interest_applied, last_interest_applied)
@@ -0,0 +1,58 @@
+from django.db import transaction
+from django.test import TestCase
+
+from ..caching import VersionedProcessCache
+from ..models import Settings, Stats
+
+
+class TestInvalidateInTransaction(TestCase):
+    def other_process(self, name: str, rows: dict) -> VersionedProcessCache:
+        """Return the cache of another process, which only sees committed rows."""
+        return VersionedProcessCache(name, lambda: rows["committed"])
+
+    def test_settings_saved_in_transaction_are_not_cached_as_old(self):
+        settings = Settings.load()
+        settings.phrase = "old"
+        with self.captureOnCommitCallbacks(execute=True):
+            settings.save()
+        rows = {"committed": "old"}
+        other = self.other_process("settings", rows)
+        self.assertEqual(other.get(), "old")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                settings.phrase = "new"
+                settings.save()
+                # loads the old row while the save is not committed
+                self.assertEqual(other.get(), "old")
+            rows["committed"] = "new"
+
+        self.assertEqual(other.get(), "new")
+        self.assertEqual(Settings.load().phrase, "new")
+
+    def test_stats_saved_in_transaction_are_not_cached_as_old(self):
+        stats = Stats.load()
+        rows = {"committed": "old"}
+        other = self.other_process("stats", rows)
+        self.assertEqual(other.get(), "old")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                stats.save()
+                self.assertEqual(other.get(), "old")
+            rows["committed"] = "new"
+
+        self.assertEqual(other.get(), "new")
+
+    def test_rollback_keeps_version(self):
+        cache = VersionedProcessCache("settings", Settings._load_from_db)
+        version = cache.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Settings.load().save()
+                    raise ValueError()
+            except ValueError:
+                pass
+
+        self.assertEqual(cache.version(), version)
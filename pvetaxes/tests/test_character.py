@@ -0,0 +1,40 @@
+from django.test import TestCase
+from django.utils.timezone import now
+
+from allianceauth.eveonline.models import EveCharacter
+
+from ..models import Character, CharacterTaxCredits, JournalIngest
+
+
+class TestUpdateOfRemovedCharacter(TestCase):
+    def setUp(self):
+        eve_character = EveCharacter.objects.create(
+            character_id=90_000_001,
+            character_name="Test Character",
+            corporation_id=98_000_001,
+            corporation_name="Test Corporation",
+            corporation_ticker="TEST",
+        )
+        self.character = Character.objects.create(eve_character=eve_character)
+        # removed while an update holds the character in memory
+        Character.objects.filter(pk=self.character.pk).update(deleted_at=now())
+
+    def assert_still_removed(self):
+        self.assertIsNotNone(Character.objects.get(pk=self.character.pk).deleted_at)
+
+    def test_finishing_journal_update_keeps_removal(self):
+        JournalIngest(self.character).finish()
+
+        self.assert_still_removed()
+
+    def test_monthly_totals_keep_removal(self):
+        self.character.calculate_monthly_totals()
+
+        self.assert_still_removed()
+
+    def test_credits_keep_removal(self):
+        CharacterTaxCredits.objects.create(
+            character=self.character, amount=100.0, reason="Test"
+        )
+
+        self.assert_still_removed()
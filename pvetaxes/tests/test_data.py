@@ -0,0 +1,39 @@
+from django.test import TestCase
+
+from allianceauth.eveonline.models import EveCharacter
+
+from ..loadtesting import data
+
+
+class TestSyntheticData(TestCase):
+    def create_other_character(self) -> EveCharacter:
+        """Create a character which is not synthetic but has an ID in their range."""
+        return EveCharacter.objects.create(
+            character_id=data.FIRST_CHARACTER_ID + 1_000_000,
+            character_name="Other Character",
+            corporation_id=98_000_001,
+            corporation_name="Other Corporation",
+            corporation_ticker="OTHER",
+        )
+
+    def test_delete_keeps_other_characters(self):
+        data.generate(users=2, characters=4, rows=20, months=1)
+        other = self.create_other_character()
+
+        data.delete()
+
+        self.assertTrue(EveCharacter.objects.filter(pk=other.pk).exists())
+        self.assertFalse(data.synthetic_eve_characters().exists())
+
+    def test_refuses_other_characters_in_synthetic_range(self):
+        self.create_other_character()
+
+        self.assertTrue(data.has_other_characters())
+        with self.assertRaises(ValueError):
+            data.generate(users=2, characters=4, rows=20, months=1)
+
+    def test_synthetic_data_is_not_other(self):
+        data.generate(users=2, characters=4, rows=20, months=1)
+
+        self.assertFalse(data.has_other_characters())
+        self.assertEqual(data.synthetic_characters().count(), 4)
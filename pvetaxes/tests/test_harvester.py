@@ -0,0 +1,39 @@
+from unittest.mock import MagicMock, patch
+
+from django.test import TestCase
+
+from ..harvester import HarvestResult, WalletHarvester
+from ..tasks import acquire_update_lock, release_update_lock
+from .test_tasks import create_character
+
+
+class TestWalletHarvester(TestCase):
+    def test_failed_fetching_fails_each_character(self):
+        characters = [create_character(90_000_001), create_character(90_000_002)]
+        error = RuntimeError("Event loop failed")
+
+        async def harvest(jobs):
+            raise error
+
+        harvester = WalletHarvester()
+        with patch(
+            "pvetaxes.models.Character.fetch_token", return_value=MagicMock()
+        ), patch.object(harvester, "_harvest", harvest):
+            results = harvester.run(characters)
+
+        self.assertEqual(
+            {pk: result.error for pk, result in results.items()},
+            {character.pk: error for character in characters},
+        )
+
+    def test_skips_character_being_updated(self):
+        character = create_character()
+        acquire_update_lock(character.pk)
+        try:
+            with patch("pvetaxes.models.Character.fetch_token") as fetch_token:
+                results = WalletHarvester().run([character])
+        finally:
+            release_update_lock(character.pk)
+
+        fetch_token.assert_not_called()
+        self.assertEqual(results, {character.pk: HarvestResult()})
@@ -0,0 +1,49 @@
+import datetime as dt
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils.timezone import now
+
+from allianceauth.authentication.models import CharacterOwnership
+
+from ..helpers import day_key, month_key
+from ..models import (
+    ActivityType,
+    CharacterWalletJournalEntry,
+    RefType,
+    Stats,
+    StatsDocument,
+)
+from .test_tasks import create_character
+
+
+class TestActivityLedgers(TestCase):
+    def setUp(self):
+        self.character = create_character()
+        user = User.objects.create(username="member")
+        CharacterOwnership.objects.create(
+            user=user, character=self.character.eve_character, owner_hash="member"
+        )
+
+    def create_entry(self, journal_id: int, date: dt.datetime, amount_cents: int):
+        CharacterWalletJournalEntry.objects.create(
+            character=self.character,
+            journal_id=journal_id,
+            date=date,
+            period_month=month_key(date),
+            period_day=day_key(date),
+            amount_cents=amount_cents,
+            ref_type=RefType.BOUNTY_PRIZES,
+            activity_type=ActivityType.BOUNTY,
+        )
+
+    def test_entries_after_today_are_left_out(self):
+        self.create_entry(1, now(), 100_00)
+        self.create_entry(2, now() + dt.timedelta(days=1), 50_00)
+
+        Stats.load().update_activity_ledgers()
+
+        ledger = StatsDocument.get(StatsDocument.Name.ALL_ACTIVITY_LEDGER)
+        bounties = ledger["activity_types"]["bounty"]["amount"]
+        self.assertEqual(bounties[-1], 100.0)
+        self.assertEqual(sum(bounties), 100.0)
@@ -0,0 +1,111 @@
+import datetime as dt
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils.timezone import now
+
+from allianceauth.eveonline.models import EveCharacter
+
+from .. import tasks
+from ..models import Character
+
+
+def create_character(character_id: int = 90_000_001, **kwargs) -> Character:
+    eve_character = EveCharacter.objects.create(
+        character_id=character_id,
+        character_name=f"Test Character {character_id}",
+        corporation_id=98_000_001,
+        corporation_name="Test Corporation",
+        corporation_ticker="TEST",
+    )
+    return Character.objects.create(eve_character=eve_character, **kwargs)
+
+
+@patch("pvetaxes.tasks.delete_character")
+class TestRequeueStaleDeletions(TestCase):
+    def setUp(self):
+        self.stale = create_character(90_000_001, deleted_at=now() - dt.timedelta(days=1))
+        self.recent = create_character(90_000_002, deleted_at=now())
+        create_character(90_000_003)
+        for character in Character.objects.all():
+            cache.delete(tasks._delete_retry_key(character.pk))
+
+    def test_requeues_only_stale_deletions(self, delete_character):
+        self.assertEqual(tasks.requeue_stale_deletions(), 1)
+
+        delete_character.delay.assert_called_once_with(self.stale.pk)
+
+    def test_requeues_once_per_retry_interval(self, delete_character):
+        tasks.requeue_stale_deletions()
+        self.assertEqual(tasks.requeue_stale_deletions(), 0)
+
+        delete_character.delay.assert_called_once_with(self.stale.pk)
+
+    def test_update_of_all_characters_requeues_stale_deletions(self, delete_character):
+        with patch("pvetaxes.tasks._run_update", return_value=None):
+            tasks.update_all_characters("sync")
+
+        delete_character.delay.assert_called_once_with(self.stale.pk)
+
+
+class TestUpdateEngine(TestCase):
+    def test_falls_back_to_sync_engine_without_aiohttp(self):
+        with patch("pvetaxes.harvester.aiohttp", None):
+            self.assertEqual(tasks.update_engine("async"), "sync")
+
+    def test_keeps_async_engine_with_aiohttp(self):
+        self.assertEqual(tasks.update_engine("async"), "async")
+
+
+class TestHarvestCharacters(TestCase):
+    def test_failed_chunk_fails_each_character(self):
+        characters = [create_character(90_000_001), create_character(90_000_002)]
+        with patch(
+            "pvetaxes.harvester.WalletHarvester.run", side_effect=RuntimeError("down")
+        ):
+            errors = tasks.harvest_characters(characters)
+
+        self.assertEqual(errors, {character.pk: "down" for character in characters})
+
+    def test_update_of_all_characters_continues_after_failed_chunk(self):
+        create_character(90_000_001)
+        create_character(90_000_002)
+        with patch(
+            "pvetaxes.harvester.WalletHarvester.run", side_effect=RuntimeError("down")
+        ), patch("pvetaxes.tasks.schedule_stats_update"):
+            summary = tasks.update_all_characters("async")
+
+        self.assertEqual(summary["failed"], 2)
+        self.assertTrue(summary["finished"])
+
+
+class TestUpdateLock(TestCase):
+    def setUp(self):
+        self.character = create_character()
+        tasks.release_update_lock(self.character.pk)
+
+    def tearDown(self):
+        tasks.release_update_lock(self.character.pk)
+
+    def test_update_skips_character_being_refreshed(self):
+        tasks.acquire_update_lock(self.character.pk)
+        with patch.object(Character, "update_wallet_journal") as update_wallet_journal:
+            self.assertIsNone(tasks.update_character(self.character))
+
+        update_wallet_journal.assert_not_called()
+
+    def test_refresh_is_in_progress_during_update(self):
+        statuses = []
+
+        def update_wallet_journal():
+            statuses.append(tasks.request_character_update(self.character)["status"])
+            return 0
+
+        with patch.object(
+            Character, "update_wallet_journal", side_effect=update_wallet_journal
+        ):
+            self.assertEqual(tasks.update_character(self.character), 0)
+
+        self.assertEqual(statuses, ["in_progress"])
+        self.assertTrue(tasks.acquire_update_lock(self.character.pk))
@@ -0,0 +1,49 @@
+import os
+
+from django.test import TestCase
+
+from ..loadtesting import data, view_budgets
+
+USERS = 10
+SMALL_CHARACTERS = 20
+LARGE_CHARACTERS = 100
+ROWS_PER_CHARACTER = 20
+REPEAT = 5
+"""Timed renders of each view, their median latency is checked"""
+LATENCY_FACTOR = float(os.environ.get("PVETAXES_LATENCY_FACTOR", 1.0))
+"""Multiplier of the latency budgets, e.g. for slow CI machines"""
+
+
+class TestViewBudgets(TestCase):
+    def measure_views(self, characters: int) -> tuple:
+        """Render each view on a new synthetic dataset.
+
+        Returns:
+            Number of characters of the user, and queries on top of
+            the baseline view and median latency in seconds by view
+        """
+        data.generate(
+            users=USERS,
+            characters=characters,
+            rows=characters * ROWS_PER_CHARACTER,
+            months=3,
+        )
+        user = view_budgets.prepare()
+        results = view_budgets.measure_views(user, REPEAT)
+        return user.character_ownerships.count(), results
+
+    def test_views_stay_within_budgets(self):
+        small_count, small = self.measure_views(SMALL_CHARACTERS)
+        large_count, large = self.measure_views(LARGE_CHARACTERS)
+        self.assertGreater(large_count, small_count)
+
+        self.assertEqual(view_budgets.check(small, LATENCY_FACTOR), [])
+        self.assertEqual(view_budgets.check(large, LATENCY_FACTOR), [])
+        self.assertEqual(view_budgets.check_scaling(small, large), [])
+        for name in view_budgets.VIEW_BUDGETS:
+            with self.subTest(view=name):
+                self.assertEqual(
+                    large[name]["queries"],
+                    small[name]["queries"],
+                    "Queries change with the number of characters",
+                )
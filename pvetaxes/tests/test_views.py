@@ -0,0 +1,49 @@
+from django.contrib.auth.models import Permission, User
+from django.test import TestCase
+from django.urls import reverse
+
+from allianceauth.authentication.models import CharacterOwnership
+from allianceauth.eveonline.models import EveCharacter
+
+from ..models import ActivityType, SecurityCategory, TaxRules
+
+
+class TestAdminSimulator(TestCase):
+    def setUp(self):
+        self.user = User.objects.create(username="admin")
+        eve_character = EveCharacter.objects.create(
+            character_id=90_000_001,
+            character_name="Admin Character",
+            corporation_id=98_000_001,
+            corporation_name="Test Corporation",
+            corporation_ticker="TEST",
+        )
+        CharacterOwnership.objects.create(
+            user=self.user, character=eve_character, owner_hash="admin"
+        )
+        self.user.profile.main_character = eve_character
+        self.user.profile.save()
+        self.user.user_permissions.add(
+            *Permission.objects.filter(
+                content_type__app_label="pvetaxes",
+                codename__in=["basic_access", "admin_access"],
+            )
+        )
+        self.client.force_login(self.user)
+
+    def test_shows_current_rates_of_each_activity(self):
+        response = self.client.get(reverse("pvetaxes:admin_simulator"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "<td>incursion</td>")
+        rules = TaxRules.current()
+        current_rates = dict(response.context["current_rates"])
+        self.assertEqual(list(current_rates), [activity.label for activity in ActivityType])
+        for activity in ActivityType:
+            self.assertEqual(
+                current_rates[activity.label],
+                [
+                    rules.rates.get((activity.value, category.value), 0) / 10_000
+                    for category in SecurityCategory
+                ],
+            )
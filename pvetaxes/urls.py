@@ -9,6 +9,7 @@ urlpatterns = [
     path("launcher/", views.launcher, name="launcher"),
     path("admin_launcher/", views.admin_launcher, name="admin_launcher"),
     path("admin_tables/", views.admin_tables, name="admin_tables"),
+    path("admin_simulator/", views.admin_simulator, name="admin_simulator"),
     path("user_summary/", views.user_summary, name="user_summary"),
     path("user_ledger/<int:character_id>/", views.user_ledger, name="user_ledger"),
     path("character_viewer/<int:character_id>/", views.character_viewer, name="character_viewer"),
@@ -16,4 +17,9 @@ urlpatterns = [
     path("add_character/", views.add_character, name="add_character"),
     path("remove_character/<int:character_id>/", views.remove_character, name="remove_character"),
     path("api/update_character/<int:character_id>/", views.api_update_character, name="api_update_character"),
+    path("api/character_activity/<int:character_id>/", views.api_character_activity, name="api_character_activity"),
+    path("api/user_activity/", views.api_user_activity, name="api_user_activity"),
+    path("api/user_activity/<int:user_id>/", views.api_user_activity, name="api_user_activity"),
+    path("api/stats/<str:name>/", views.api_stats_document, name="api_stats_document"),
+    path("api/metrics/", views.api_metrics, name="api_metrics"),
 ]
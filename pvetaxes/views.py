@@ -1,16 +1,35 @@
 from django.contrib.auth.decorators import login_required, permission_required
 from django.shortcuts import render, get_object_or_404, redirect
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import models
 from django.contrib import messages
+from django.utils import timezone
 from esi.decorators import token_required
 
 from allianceauth.eveonline.models import EveCharacter
 from allianceauth.authentication.models import CharacterOwnership
 
+from . import metrics
+from .charts import BUCKETS, activity_buckets
 from .decorators import main_character_required
-from .models import Character, Stats, Settings
-from .tasks import update_character_wallet, update_stats
+from .helpers import (
+    month_key,
+    month_key_to_label,
+    parse_month_label,
+)
+from .models import (
+    Character,
+    CharacterMonthlyRollup,
+    CharacterWalletJournalEntry,
+    LiveLeaderboard,
+    MonthlyLeaderboard,
+    Settings,
+    Stats,
+    StatsDocument,
+    UpdateRun,
+)
+from .simulator import TaxSimulator, parse_schedule
+from .tasks import delete_character, request_character_update, requeue_deletion
 
 
 @login_required
@@ -22,7 +41,8 @@ def index(request):
     
     context = {
         "stats": stats,
-        "has_characters": Character.objects.filter(
+        "leaderboard": LiveLeaderboard.current(),
+        "has_characters": Character.objects.active().filter(
             eve_character__character_ownership__user=request.user
         ).exists(),
     }
@@ -35,9 +55,9 @@ def index(request):
 @main_character_required
 def launcher(request):
     """Character launcher page."""
-    characters = Character.objects.filter(
+    characters = Character.objects.active().filter(
         eve_character__character_ownership__user=request.user
-    )
+    ).select_related("eve_character")
     
     context = {
         "characters": characters,
@@ -52,12 +72,18 @@ def admin_launcher(request):
     """Admin launcher page."""
     from .models import AdminCharacter
     
-    admins = AdminCharacter.objects.all()
-    characters = Character.objects.all()
+    admins = AdminCharacter.objects.select_related("eve_character", "corporation")
+    characters = Character.objects.active()
+    
+    update_runs = [UpdateRun.latest(kind) for kind in UpdateRun.Kind]
     
     context = {
         "admins": admins,
         "total_characters": characters.count(),
+        "update_runs": [run for run in update_runs if run],
+        "paused_characters": characters.update_paused()
+        .select_related("eve_character")
+        .order_by("update_paused_until"),
     }
     
     return render(request, "pvetaxes/admin_launcher.html", context)
@@ -69,31 +95,118 @@ def admin_tables(request):
     """Admin tables view."""
     stats = Stats.load()
     
+    current_month = month_key(timezone.now())
+    try:
+        month = parse_month_label(request.GET["month"])
+    except (KeyError, ValueError):
+        month = current_month
+    
+    if month == current_month:
+        leaderboard = LiveLeaderboard.current()
+    else:
+        leaderboard = MonthlyLeaderboard.for_month(month)
+    
+    months = (
+        CharacterMonthlyRollup.objects
+        .values_list("month", flat=True)
+        .distinct()
+        .order_by("-month")
+    )
+    
+    month_labels = [month_key_to_label(key) for key in months]
+    if month_key_to_label(month) not in month_labels:
+        month_labels.insert(0, month_key_to_label(month))
+    
+    # archived months are no longer covered by the journal
+    space_revenue = CharacterWalletJournalEntry.objects.filter(
+        period_month=month
+    ).revenue_by_space()
+    
     context = {
         "stats": stats,
+        "leaderboard": leaderboard,
+        "space_revenue": space_revenue,
+        "month": month_key_to_label(month),
+        "months": month_labels,
     }
     
     return render(request, "pvetaxes/admin_tables.html", context)
 
 
+@login_required
+@permission_required("pvetaxes.admin_access", raise_exception=True)
+def admin_simulator(request):
+    """What-if simulation of tax rate schedules."""
+    simulator = TaxSimulator.load(refresh="refresh" in request.GET)
+    schedule_values = [
+        value.strip() for value in request.GET.getlist("schedule") if value.strip()
+    ]
+    start = request.GET.get("from", "")
+    end = request.GET.get("to", "")
+    
+    result = None
+    users = []
+    error = None
+    if schedule_values:
+        try:
+            result = simulator.evaluate(
+                [parse_schedule(value) for value in schedule_values],
+                parse_month_label(start) if start else None,
+                parse_month_label(end) if end else None,
+            )
+        except ValueError as ex:
+            error = str(ex)
+        else:
+            for pos, user in enumerate(result["users"]):
+                users.append(
+                    {
+                        **user,
+                        "schedules": [
+                            {
+                                "total": schedule["user_totals"][pos],
+                                "delta": schedule["user_deltas"][pos],
+                            }
+                            for schedule in result["schedules"]
+                        ],
+                    }
+                )
+            users.sort(key=lambda user: abs(user["schedules"][0]["delta"]), reverse=True)
+    
+    context = {
+        "categories": simulator.categories,
+        "current_rates": list(
+            zip(simulator.activity_types, simulator.current_rates().tolist())
+        ),
+        "schedule_values": schedule_values or [""],
+        "start": start,
+        "end": end,
+        "schedules": (
+            list(zip(schedule_values, result["schedules"])) if result else []
+        ),
+        "current": result["current"] if result else None,
+        "users": users,
+        "error": error,
+    }
+    
+    return render(request, "pvetaxes/admin_simulator.html", context)
+
+
 @login_required
 @permission_required("pvetaxes.basic_access", raise_exception=True)
 @main_character_required
 def user_summary(request):
     """User's tax summary."""
-    characters = Character.objects.filter(
+    characters = Character.objects.active().filter(
         eve_character__character_ownership__user=request.user
-    )
+    ).select_related("eve_character")
     
-    total_taxes = 0
+    total_taxes = CharacterMonthlyRollup.objects.filter(
+        character__in=characters
+    ).aggregate(total=models.Sum("tax_amount"))["total"] or 0
     total_credits = 0
     total_balance = 0
     
     for char in characters:
-        char_taxes = char.wallet_journal.aggregate(
-            total=models.Sum("tax_amount")
-        )["total"] or 0
-        total_taxes += char_taxes
         total_credits += char.life_credits
     
     total_balance = total_taxes - total_credits
@@ -113,7 +226,12 @@ def user_summary(request):
 def user_ledger(request, character_id):
     """Detailed ledger for a character."""
     try:
-        character = get_object_or_404(Character, pk=character_id)
+        character = get_object_or_404(
+            Character.objects.active().select_related(
+                "eve_character__character_ownership__user"
+            ),
+            pk=character_id,
+        )
         
         # Check permissions
         if not character.user_is_owner(request.user):
@@ -144,7 +262,7 @@ def user_ledger(request, character_id):
 @permission_required("pvetaxes.basic_access", raise_exception=True)
 def character_viewer(request, character_id):
     """Character viewer page."""
-    character = get_object_or_404(Character, pk=character_id)
+    character = get_object_or_404(Character.objects.active(), pk=character_id)
     
     # Check permissions
     if not character.user_is_owner(request.user):
@@ -169,18 +287,79 @@ def faq(request):
 
 
 # API endpoints for AJAX
+@login_required
+@permission_required("pvetaxes.basic_access", raise_exception=True)
+def api_character_activity(request, character_id):
+    """Activity of a character aggregated into daily, weekly or monthly buckets."""
+    character = get_object_or_404(Character.objects.active(), pk=character_id)
+    
+    if not character.user_is_owner(request.user):
+        if not request.user.has_perm("pvetaxes.auditor_access"):
+            return JsonResponse({"error": "Access denied"}, status=403)
+    
+    bucket = request.GET.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return JsonResponse({"error": "Invalid bucket"}, status=400)
+    
+    return JsonResponse(activity_buckets([character.pk], bucket))
+
+
+@login_required
+@permission_required("pvetaxes.basic_access", raise_exception=True)
+def api_user_activity(request, user_id=None):
+    """Activity of all characters of a user aggregated into buckets."""
+    if user_id is None:
+        user_id = request.user.pk
+    elif user_id != request.user.pk and not request.user.has_perm(
+        "pvetaxes.auditor_access"
+    ):
+        return JsonResponse({"error": "Access denied"}, status=403)
+    
+    bucket = request.GET.get("bucket", "day")
+    if bucket not in BUCKETS:
+        return JsonResponse({"error": "Invalid bucket"}, status=400)
+    
+    character_pks = Character.objects.active().filter(
+        eve_character__character_ownership__user__pk=user_id
+    ).values_list("pk", flat=True)
+    
+    return JsonResponse(activity_buckets(list(character_pks), bucket))
+
+
+@login_required
+@permission_required("pvetaxes.basic_access", raise_exception=True)
+def api_stats_document(request, name):
+    """Large statistics payload, fetched by the pages showing it."""
+    if name not in StatsDocument.Name.values:
+        return JsonResponse({"error": "Unknown document"}, status=404)
+    if name != StatsDocument.Name.LEADERGRAPH and not (
+        request.user.has_perm("pvetaxes.admin_access")
+        or request.user.has_perm("pvetaxes.auditor_access")
+    ):
+        return JsonResponse({"error": "Access denied"}, status=403)
+    
+    return JsonResponse(StatsDocument.get(name), safe=False)
+
+
+@login_required
+@permission_required("pvetaxes.admin_access", raise_exception=True)
+def api_metrics(request):
+    """Counters and timings of updates in the Prometheus text format."""
+    return HttpResponse(
+        metrics.export(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @login_required
 @permission_required("pvetaxes.basic_access", raise_exception=True)
 def api_update_character(request, character_id):
     """Trigger character update via AJAX."""
-    character = get_object_or_404(Character, pk=character_id)
+    character = get_object_or_404(Character.objects.active(), pk=character_id)
     
     if not character.user_is_owner(request.user):
         return JsonResponse({"error": "Access denied"}, status=403)
     
-    update_character_wallet.delay(character_id)
-    
-    return JsonResponse({"status": "Update started"})
+    return JsonResponse(request_character_update(character))
 
 
 @login_required
@@ -195,7 +374,15 @@ def add_character(request, token):
         )
         
         # Check if character already exists
-        if Character.objects.filter(eve_character=eve_character).exists():
+        existing = Character.objects.filter(eve_character=eve_character).first()
+        if existing and existing.deleted_at:
+            requeue_deletion(existing)
+            messages.warning(
+                request,
+                f"Character {eve_character.character_name} is still being removed. "
+                f"Please try again in a few minutes."
+            )
+        elif existing:
             messages.warning(
                 request,
                 f"Character {eve_character.character_name} is already registered."
@@ -209,7 +396,7 @@ def add_character(request, token):
                 f"Wallet data will be updated shortly."
             )
             # Trigger initial wallet update
-            update_character_wallet.delay(character.pk)
+            request_character_update(character)
         
         return redirect("pvetaxes:launcher")
     
@@ -228,7 +415,7 @@ def add_character(request, token):
 @permission_required("pvetaxes.basic_access", raise_exception=True)
 def remove_character(request, character_id):
     """Remove a character from PVE Taxes tracking."""
-    character = get_object_or_404(Character, pk=character_id)
+    character = get_object_or_404(Character.objects.active(), pk=character_id)
     
     # Check ownership
     if not character.user_is_owner(request.user):
@@ -236,7 +423,8 @@ def remove_character(request, character_id):
         return redirect("pvetaxes:launcher")
     
     character_name = character.eve_character.character_name
-    character.delete()
+    Character.objects.filter(pk=character.pk).update(deleted_at=timezone.now())
+    delete_character.delay(character.pk)
     
     messages.success(request, f"Successfully removed {character_name}.")
     return redirect("pvetaxes:launcher")
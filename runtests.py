@@ -0,0 +1,15 @@
+#!/usr/bin/env python
+"""Run the tests of pvetaxes, e.g. ``python runtests.py pvetaxes.tests.test_view_budgets``"""
+import os
+import sys
+
+import django
+from django.conf import settings
+from django.test.utils import get_runner
+
+if __name__ == "__main__":
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "testauth.settings")
+    django.setup()
+    TestRunner = get_runner(settings)
+    failures = TestRunner().run_tests(sys.argv[1:] or ["pvetaxes"])
+    sys.exit(bool(failures))
@@ -9,7 +9,7 @@ with open("README.md", encoding="utf-8") as f:
 setup(
     name="aa-pvetaxes",
     version=__version__,
-    packages=find_packages(),
+    packages=find_packages(exclude=["testauth", "testauth.*"]),
     include_package_data=True,
     license="MIT",
     description="Alliance Auth app for tracking PVE activities and charging taxes",
@@ -38,5 +38,9 @@ setup(
     install_requires=[
         "allianceauth>=2.15.0",
         "django-eveuniverse>=1.0.0",
+        "numpy>=1.21",
     ],
+    extras_require={
+        "async": ["aiohttp>=3.8"],
+    },
 )
@@ -0,0 +1,43 @@
+"""Settings for running the tests of pvetaxes"""
+# flake8: noqa
+import os
+
+from allianceauth.project_template.project_name.settings.base import *
+
+SECRET_KEY = "pvetaxes-tests"
+DEBUG = False
+SITE_NAME = "testauth"
+SITE_URL = "http://localhost"
+CSRF_TRUSTED_ORIGINS = [SITE_URL]
+ROOT_URLCONF = "allianceauth.urls"
+INSTALLED_APPS += ["eveuniverse", "pvetaxes"]
+
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": "pvetaxes-tests.sqlite3",
+    }
+}
+
+# Alliance Auth needs Redis
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.environ.get("REDIS_URL", "redis://localhost:6379/1"),
+    }
+}
+
+ESI_SSO_CLIENT_ID = "dummy"
+ESI_SSO_CLIENT_SECRET = "dummy"
+ESI_SSO_CALLBACK_URL = f"{SITE_URL}/sso/callback"
+ESI_USER_CONTACT_EMAIL = "dummy@example.com"
+
+# no collected static files with a manifest
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+PASSWORD_HASHERS = ["django.contrib.auth.hashers.MD5PasswordHasher"]
+LOGGING = {"version": 1, "disable_existing_loggers": False}
+SILENCED_SYSTEM_CHECKS = ["allianceauth.checks.system_package_valkey"]